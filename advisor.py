@@ -0,0 +1,165 @@
+import logging
+import re
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+OVER = re.compile(r"\bOVER\s*\(", re.IGNORECASE)
+PARTITION_BY = re.compile(r"\bPARTITION\s+BY\b(.*?)(?=\bORDER\s+BY\b|$)", re.IGNORECASE | re.DOTALL)
+ORDER_BY = re.compile(r"\bORDER\s+BY\b(.*?)(?=\b(?:ROWS|RANGE|GROUPS)\b|$)", re.IGNORECASE | re.DOTALL)
+TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.IGNORECASE)
+# Table and the name it goes by; the "alias" may also be the next keyword
+TABLE_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+MAX_INDEX_NAME = 64  # MySQL's identifier limit
+
+IndexSuggestion = namedtuple('IndexSuggestion', ['table', 'columns', 'name', 'statement'])
+PlanAdvice = namedtuple('PlanAdvice', ['plan', 'reference_plan', 'suggestions', 'message'])
+
+
+def window_specs(query):
+    # Text between the parentheses of every OVER (...) in `query`
+    specs = []
+    for match in OVER.finditer(query):
+        depth = 1
+        position = match.end()
+        while position < len(query) and depth:
+            if query[position] == '(':
+                depth += 1
+            elif query[position] == ')':
+                depth -= 1
+            position += 1
+        specs.append(query[match.end():position - 1])
+    return specs
+
+
+def _column_list(text):
+    columns = []
+    for item in text.split(','):
+        words = item.split()
+        if not words:
+            continue
+        column = words[0].split('.')[-1].strip('`"').lower()
+        descending = len(words) > 1 and words[1].upper() == 'DESC'
+        columns.append(f"{column} DESC" if descending else column)
+    return columns
+
+
+def window_index_columns(spec):
+    # PARTITION BY columns followed by ORDER BY columns: the order in which
+    # an index would hand rows to the window without a sort
+    partition = PARTITION_BY.search(spec)
+    order = ORDER_BY.search(spec)
+    columns = _column_list(partition.group(1)) if partition else []
+    # Partition columns sort either way; only the ORDER BY direction matters
+    columns = [column.split()[0] for column in columns]
+    return columns + (_column_list(order.group(1)) if order else [])
+
+
+class IndexAdvisor:
+    # Reads the plan of a submitted query, compares it with the reference
+    # query's plan and suggests indexes that would let its windows read
+    # rows in PARTITION BY / ORDER BY order instead of sorting them.
+    def __init__(self, db_manager, catalog):
+        self.db_manager = db_manager
+        self.catalog = catalog
+        # table -> column lists of its known indexes
+        self.indexes = {table.name: [_column_list(', '.join(index.columns)) for index in table.indexes]
+                        for table in catalog.tables.values()}
+        # Names already taken; SQLite and DuckDB share one namespace per schema
+        self.index_names = {index.name.lower() for table in catalog.tables.values() for index in table.indexes}
+
+    def _is_covered(self, table_name, columns):
+        for index in self.indexes.get(table_name, []):
+            if index[:len(columns)] == columns:
+                return True
+        return False
+
+    def _table_for(self, query, columns):
+        names = {column.split()[0] for column in columns}
+        for table_name in TABLE_REFERENCE.findall(query):
+            if table_name in self.catalog.tables and names <= set(self.catalog.column_names(table_name)):
+                return table_name
+        return None
+
+    def suggest(self, query, plan):
+        # Indexes for the windows of `query` that the plan has to sort or scan for
+        if not self.db_manager.backend.sort_indexes or not (plan.sorts or plan.full_scans):
+            return []
+        suggestions = []
+        for spec in window_specs(query):
+            columns = window_index_columns(spec)
+            table_name = self._table_for(query, columns) if columns else None
+            if table_name is None or self._is_covered(table_name, columns):
+                continue
+            if any(suggestion.table == table_name and suggestion.columns == columns for suggestion in suggestions):
+                continue
+            name = self._index_name(table_name, columns, {suggestion.name for suggestion in suggestions})
+            statement = self.db_manager.backend.index_sql(name, table_name, columns)
+            suggestions.append(IndexSuggestion(table_name, columns, name, statement))
+        return suggestions
+
+    def _index_name(self, table_name, columns, taken):
+        # table_column..., with _desc after descending columns and a numeric
+        # suffix when an existing index already has the name
+        parts = [table_name]
+        for column in columns:
+            parts.extend(column.lower().split())
+        base = '_'.join(parts)[:MAX_INDEX_NAME]
+        name = base
+        counter = 2
+        while name.lower() in self.index_names or name in taken:
+            suffix = f"_{counter}"
+            name = base[:MAX_INDEX_NAME - len(suffix)] + suffix
+            counter += 1
+        return name
+
+    def _table_scans(self, plan, query):
+        # Keeps the full scans of catalog tables, named by table rather than
+        # alias; plans also list derived tables such as "windowed"
+        aliases = {alias.lower(): table for table, alias in TABLE_ALIAS.findall(query) if alias}
+        full_scans = []
+        for name in plan.full_scans:
+            if name not in self.catalog.tables:
+                name = aliases.get(name.lower())
+            if name in self.catalog.tables:
+                full_scans.append(name)
+        return plan._replace(full_scans=full_scans)
+
+    def review(self, query, reference_query=None):
+        plan = self.db_manager.explain(query)
+        if isinstance(plan, str):
+            return PlanAdvice(None, None, [], f"Query plan unavailable: {plan}")
+        plan = self._table_scans(plan, query)
+        reference_plan = self.db_manager.explain(reference_query) if reference_query else None
+        if isinstance(reference_plan, str):
+            logger.warning("Reference query plan unavailable: %s", reference_plan)
+            reference_plan = None
+        elif reference_plan is not None:
+            reference_plan = self._table_scans(reference_plan, reference_query)
+        suggestions = self.suggest(query, plan)
+        return PlanAdvice(plan, reference_plan, suggestions, self._describe(plan, reference_plan, suggestions))
+
+    def _describe(self, plan, reference_plan, suggestions):
+        if plan.cost is not None and reference_plan is not None and reference_plan.cost:
+            lines = [f"Estimated cost {plan.cost:.1f}, reference {reference_plan.cost:.1f} "
+                     f"({plan.cost / reference_plan.cost:.1f}x)."]
+        else:
+            lines = [f"Plan: {len(plan.full_scans)} full scan(s), {plan.sorts} sort(s)."]
+            if reference_plan is not None:
+                lines[0] += (f" The reference needs {len(reference_plan.full_scans)} full scan(s), "
+                             f"{reference_plan.sorts} sort(s).")
+        if plan.full_scans:
+            lines.append(f"Full scans of: {', '.join(sorted(set(plan.full_scans)))}.")
+        for suggestion in suggestions:
+            lines.append(f"Suggested index: {suggestion.statement}")
+        return "\n".join(lines)
+
+    def create(self, suggestion):
+        # Returns None on success, or the "Error: ..." string from the server
+        logger.info("Creating index %s on %s", suggestion.name, suggestion.table)
+        result = self.db_manager.execute_query(suggestion.statement)
+        if isinstance(result, str):
+            return result
+        self.indexes.setdefault(suggestion.table, []).append(suggestion.columns)
+        self.index_names.add(suggestion.name.lower())
+        return None
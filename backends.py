@@ -0,0 +1,610 @@
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+# Each backend hides one driver's connection handling, cancellation and the
+# few SQL statements that differ between engines. DatabaseManager only talks
+# to this interface, so the embedded engines can stand in for MySQL.
+
+# What the advisor needs from a query plan: the optimizer's cost estimate
+# (None when the engine has none), the tables read in full, and the number
+# of sorts the plan needs.
+PlanSummary = namedtuple('PlanSummary', ['cost', 'full_scans', 'sorts'])
+
+
+def executemany_rows(cursor, placeholder, table_name, columns, rows, batch_size):
+    placeholders = ", ".join([placeholder] * len(columns))
+    insert_query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+    inserted = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(insert_query, batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(insert_query, batch)
+        inserted += len(batch)
+    return inserted
+
+
+class NamespacedBackend:
+    # View of a backend whose connections are switched into one namespace
+    # (a MySQL database or a DuckDB schema) on checkout and back on release.
+    def __init__(self, backend, namespace, enter, leave, shared_prefix):
+        self.backend = backend
+        self.namespace = namespace
+        self._enter = enter
+        self._leave = leave
+        self.shared_prefix = shared_prefix
+
+    def checkout(self, wait_timeout):
+        connection = self.backend.checkout(wait_timeout)
+        try:
+            self._enter(connection)
+        except self.backend.errors:
+            self.backend.release(connection)
+            raise
+        return connection
+
+    def release(self, connection):
+        try:
+            self._leave(connection)
+        finally:
+            self.backend.release(connection)
+
+    def shared_table(self, table_name):
+        # Tables of the shared (un-namespaced) database, e.g. snapshots
+        return f"{self.shared_prefix}.{table_name}"
+
+    def close(self):
+        pass  # The parent backend owns the connections
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+class MySQLBackend:
+    dialect = 'mysql'
+    placeholder = '%s'
+
+    def __init__(self, host, user, password, database, pool_size=5, **_):
+        import mysql.connector
+        from mysql.connector import pooling
+        self._connector = mysql.connector
+        self._pooling = pooling
+        self.errors = (mysql.connector.Error,)
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+        self.pool_size = pool_size
+        self.pool = None
+
+    def connect(self):
+        self.pool = self._pooling.MySQLConnectionPool(
+            pool_name=f"challenger_{id(self)}",
+            pool_size=self.pool_size,
+            pool_reset_session=True,
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            autocommit=True
+        )
+
+    def checkout(self, wait_timeout):
+        deadline = time.monotonic() + wait_timeout
+        while True:
+            try:
+                connection = self.pool.get_connection()
+                break
+            except self._pooling.PoolError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+        # Health check: reconnect transparently if the server dropped us
+        try:
+            connection.ping(reconnect=True, attempts=3, delay=1)
+        except self.errors:
+            connection.close()
+            raise
+        return connection
+
+    def release(self, connection):
+        connection.close()  # Returns the connection to the pool
+
+    def connection_id(self, connection):
+        return connection.connection_id
+
+    def cursor(self, connection, buffered=True):
+        return connection.cursor(buffered=buffered)
+
+    def set_timeout(self, connection, timeout_ms):
+        cursor = connection.cursor()
+        cursor.execute(f"SET SESSION MAX_EXECUTION_TIME = {int(timeout_ms)}")
+        cursor.close()
+
+    # MAX_EXECUTION_TIME also counts the time spent sending rows to a slow
+    # reader, and cannot be lifted once the statement is running
+    timeout_spans_fetch = True
+
+    def clear_timeout(self, connection):
+        pass
+
+    def begin(self, connection):
+        connection.start_transaction()
+
+    def check_statement(self, query, read_only):
+        # The driver refuses several statements in one execute() itself
+        return None
+
+    def discard_results(self, connection):
+        connection.consume_results()
+
+    def insert_rows(self, cursor, table_name, columns, rows, batch_size):
+        # The driver turns each executemany batch into one multi-row VALUES
+        return executemany_rows(cursor, self.placeholder, table_name, columns, rows, batch_size)
+
+    def cancel(self, connection_id):
+        # KILL QUERY has to come from a different connection than the victim
+        self._run(f"KILL QUERY {int(connection_id)}")
+
+    def statement_stats(self, connection):
+        # Server time (ms) and rows examined for the last statement on this
+        # connection, from the performance schema statement history
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT TIMER_WAIT / 1000000000, ROWS_EXAMINED FROM performance_schema.events_statements_history "
+                "WHERE THREAD_ID = PS_CURRENT_THREAD_ID() ORDER BY EVENT_ID DESC LIMIT 1"
+            )
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if row is None:
+            return None, None
+        return float(row[0]), int(row[1])
+
+    def close(self):
+        if self.pool:
+            self.pool._remove_connections()
+            self.pool = None
+
+    def _run(self, statement):
+        connection = self.checkout(5)
+        try:
+            cursor = connection.cursor()
+            cursor.execute(statement)
+            cursor.close()
+        finally:
+            connection.close()
+
+    def open_namespace(self, namespace):
+        # Each namespace is a database next to the shared one
+        database = f"{self.database}_{namespace}"
+        self._run(f"CREATE DATABASE IF NOT EXISTS {database}")
+
+        def enter(connection):
+            connection.database = database
+
+        def leave(connection):
+            connection.database = self.database
+
+        return NamespacedBackend(self, database, enter, leave, self.database)
+
+    def drop_namespace(self, namespaced):
+        self._run(f"DROP DATABASE IF EXISTS {namespaced.namespace}")
+
+    def table_exists_sql(self, table_name):
+        return ("SELECT COUNT(*) FROM information_schema.tables "
+                f"WHERE table_schema = DATABASE() AND table_name = '{table_name}'")
+
+    def truncate_sql(self, table_name):
+        return f"TRUNCATE TABLE {table_name}"
+
+    def clone_table_sql(self, new_table, source_table):
+        return [f"CREATE TABLE {new_table} LIKE {source_table}",
+                f"INSERT INTO {new_table} SELECT * FROM {source_table}"]
+
+    def rename_table_sql(self, table_name, new_name):
+        # Atomic, and fails when new_name exists
+        return f"RENAME TABLE {table_name} TO {new_name}"
+
+    sort_indexes = True  # Windows and ORDER BY can read rows in index order
+
+    def index_sql(self, name, table_name, columns):
+        return f"CREATE INDEX {name} ON {table_name} ({', '.join(columns)})"
+
+    def explain_sql(self, query):
+        return f"EXPLAIN FORMAT=JSON {query}"
+
+    def summarize_plan(self, rows):
+        cost = None
+        full_scans = []
+        sorts = 0
+        nodes = [json.loads(rows[0][0])]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, list):
+                nodes.extend(node)
+                continue
+            if not isinstance(node, dict):
+                continue
+            if cost is None and 'query_cost' in node.get('cost_info', {}):
+                cost = float(node['cost_info']['query_cost'])
+            if node.get('access_type') == 'ALL':
+                full_scans.append(node.get('table_name'))
+            if node.get('using_filesort') is True:
+                sorts += 1
+            nodes.extend(node.values())
+        return PlanSummary(cost, full_scans, sorts)
+
+
+class EmbeddedBackend:
+    # Small fixed-size pool for in-process engines. Connection ids are Python
+    # object ids, and cancelling a query interrupts that connection directly.
+    def __init__(self, pool_size=5):
+        self.pool_size = pool_size
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._active = {}
+
+    def _new_connection(self):
+        raise NotImplementedError
+
+    def checkout(self, wait_timeout):
+        if not self._slots.acquire(timeout=wait_timeout):
+            raise self.errors[0]("Connection pool exhausted")
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = self._new_connection()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._active[id(connection)] = connection
+        return connection
+
+    def release(self, connection):
+        self.clear_timeout(connection)
+        with self._lock:
+            self._active.pop(id(connection), None)
+            self._idle.append(connection)
+        self._slots.release()
+
+    def connection_id(self, connection):
+        return id(connection)
+
+    def cancel(self, connection_id):
+        with self._lock:
+            connection = self._active.get(connection_id)
+        if connection is not None:
+            connection.interrupt()
+
+    timeout_spans_fetch = False  # clear_timeout() lifts the limit mid-statement
+
+    def clear_timeout(self, connection):
+        pass
+
+    def check_statement(self, query, read_only):
+        # An "Error: ..." string when the engine's parser disagrees with
+        # statements.check() about `query`, otherwise None
+        return None
+
+    def discard_results(self, connection):
+        pass
+
+    def statement_stats(self, connection):
+        # In-process engines have no separate server time to report
+        return None, None
+
+    def insert_rows(self, cursor, table_name, columns, rows, batch_size):
+        return executemany_rows(cursor, self.placeholder, table_name, columns, rows, batch_size)
+
+    def close(self):
+        with self._lock:
+            connections = self._idle + list(self._active.values())
+            self._idle = []
+            self._active = {}
+        for connection in connections:
+            connection.close()
+
+    def truncate_sql(self, table_name):
+        return f"DELETE FROM {table_name}"
+
+    def clone_table_sql(self, new_table, source_table):
+        return [f"CREATE TABLE {new_table} AS SELECT * FROM {source_table}"]
+
+    def rename_table_sql(self, table_name, new_name):
+        return f"ALTER TABLE {table_name} RENAME TO {new_name}"
+
+
+def _is_file_database(database):
+    return os.sep in database or database.endswith(('.db', '.sqlite', '.duckdb'))
+
+
+class SQLiteBackend(EmbeddedBackend):
+    dialect = 'sqlite'
+    placeholder = '?'
+
+    def __init__(self, database, pool_size=5, attach=None, **_):
+        import sqlite3
+        super().__init__(pool_size)
+        self.database = database
+        self.attach = attach  # (alias, uri) of a database attached to every connection
+        self._sqlite3 = sqlite3
+        self.errors = (sqlite3.Error,)
+        self.in_memory = not _is_file_database(database)
+        if self.in_memory:
+            # A named shared-cache memory database is visible to every
+            # connection in this process and needs no file on disk.
+            name = 'challenger' if database == ':memory:' else database
+            self.uri = f"file:{name}?mode=memory&cache=shared"
+        else:
+            self.uri = f"file:{database}"
+        self._anchor = None
+        self._deadlines = {}
+
+    def connect(self):
+        # The anchor connection keeps an in-memory database alive
+        self._anchor = self._new_connection()
+
+    def _new_connection(self):
+        connection = self._sqlite3.connect(self.uri, uri=True, check_same_thread=False, isolation_level=None)
+        if self.in_memory:
+            connection.execute("PRAGMA read_uncommitted = 1")
+        else:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA busy_timeout = 5000")
+        if self.attach:
+            alias, uri = self.attach
+            connection.execute(f"ATTACH DATABASE '{uri}' AS {alias}")
+        return connection
+
+    def cursor(self, connection, buffered=True):
+        # SQLite steps through results lazily, so every cursor streams
+        return connection.cursor()
+
+    def set_timeout(self, connection, timeout_ms):
+        deadline = time.monotonic() + timeout_ms / 1000
+        connection.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+
+    def clear_timeout(self, connection):
+        connection.set_progress_handler(None, 0)
+
+    def begin(self, connection):
+        connection.execute("BEGIN")
+
+    def close(self):
+        super().close()
+        if self._anchor is not None:
+            self._anchor.close()
+            self._anchor = None
+
+    def open_namespace(self, namespace):
+        # A namespace is its own in-memory database; the shared one is
+        # attached as `shared` so snapshots can be copied across.
+        child = SQLiteBackend(f"{self.database}__{namespace}", self.pool_size, attach=('shared', self.uri))
+        child.in_memory = True
+        child.uri = f"file:{self.database}__{namespace}?mode=memory&cache=shared"
+        child.connect()
+        return child
+
+    def drop_namespace(self, namespaced):
+        # The in-memory database disappears with its last connection
+        namespaced.close()
+
+    def shared_table(self, table_name):
+        return f"shared.{table_name}"
+
+    def table_exists_sql(self, table_name):
+        return f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = '{table_name}'"
+
+    sort_indexes = True
+
+    def index_sql(self, name, table_name, columns):
+        return f"CREATE INDEX {name} ON {table_name} ({', '.join(columns)})"
+
+    def explain_sql(self, query):
+        return f"EXPLAIN QUERY PLAN {query}"
+
+    def summarize_plan(self, rows):
+        # Rows are (id, parent, notused, detail); SQLite has no cost estimate
+        full_scans = []
+        sorts = 0
+        for row in rows:
+            detail = row[3]
+            # SCAN CONSTANT ROW reads no table, e.g. SELECT 1 or IN (SELECT 1)
+            match = re.match(r"SCAN (?!CONSTANT ROW)(?:TABLE )?(\w+)", detail)
+            if match and 'INDEX' not in detail:
+                full_scans.append(match.group(1))
+            if detail.startswith('USE TEMP B-TREE'):
+                sorts += 1
+        return PlanSummary(None, full_scans, sorts)
+
+
+class DuckDBCursor:
+    # DuckDB connections double as cursors; closing one would drop the pooled
+    # connection, so close() is a no-op here.
+    def __init__(self, connection):
+        self._connection = connection
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class DuckDBBackend(EmbeddedBackend):
+    dialect = 'duckdb'
+    placeholder = '?'
+    CSV_OPTIONS = ("header = false, auto_detect = false, delim = ',', quote = '\"', escape = '\"', "
+                   "nullstr = '\\N', new_line = '\\n'")
+
+    READ_STATEMENT_TYPES = ('SELECT', 'EXPLAIN')
+
+    def __init__(self, database, pool_size=5, **_):
+        import duckdb
+        super().__init__(pool_size)
+        self._duckdb = duckdb
+        self.errors = (duckdb.Error,)
+        self.path = database if _is_file_database(database) else ':memory:'
+        self._database = None
+        self._spool_dir = None
+        self._timers = {}
+
+    def connect(self):
+        # Learner SQL runs here, so COPY, ATTACH, read_csv and extension
+        # installs may not touch the host; bulk loads spool through one
+        # private directory instead. Neither setting can be undone once set.
+        self._spool_dir = tempfile.mkdtemp(prefix='sqlapp_duckdb_')
+        self._database = self._duckdb.connect(self.path)
+        self._database.execute(f"SET allowed_directories = ['{self._spool_dir}']")
+        self._database.execute("SET enable_external_access = false")
+
+    def check_statement(self, query, read_only):
+        # DuckDB runs every statement passed to one execute()
+        try:
+            statements = self._duckdb.extract_statements(query)
+        except self.errors:
+            return None  # Reported by execute() with the engine's own message
+        if len(statements) != 1:
+            return f"Error: Run one statement at a time ({len(statements)} found)."
+        kind = statements[0].type.name
+        if read_only and kind not in self.READ_STATEMENT_TYPES:
+            return f"Error: {kind} statements are not allowed here; only queries that read the tables."
+        return None
+
+    def _new_connection(self):
+        # Cursors of one DuckDB connection share its database
+        return self._database.cursor()
+
+    def cursor(self, connection, buffered=True):
+        return DuckDBCursor(connection)
+
+    def set_timeout(self, connection, timeout_ms):
+        timer = threading.Timer(timeout_ms / 1000, connection.interrupt)
+        timer.daemon = True
+        self._timers[id(connection)] = timer
+        timer.start()
+
+    def clear_timeout(self, connection):
+        timer = self._timers.pop(id(connection), None)
+        if timer is not None:
+            timer.cancel()
+
+    def begin(self, connection):
+        connection.begin()
+
+    def insert_rows(self, cursor, table_name, columns, rows, batch_size):
+        # DuckDB binds Python parameters slowly; spooling rows to a CSV file
+        # and scanning it with read_csv is two orders of magnitude faster.
+        handle, path = tempfile.mkstemp(suffix='.csv', dir=self._spool_dir)
+        try:
+            inserted = 0
+            with os.fdopen(handle, 'w', newline='') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                for row in rows:
+                    writer.writerow(['\\N' if value is None else value for value in row])
+                    inserted += 1
+            # Every field is read as text and cast by the INSERT itself
+            column_types = ", ".join(f"'{name}': 'VARCHAR'" for name in columns)
+            cursor.execute(
+                f"INSERT INTO {table_name} ({', '.join(columns)}) SELECT * FROM read_csv('{path}', "
+                + self.CSV_OPTIONS + f", columns = {{{column_types}}})"
+            )
+            return inserted
+        finally:
+            os.unlink(path)
+
+    def close(self):
+        super().close()
+        if self._database is not None:
+            self._database.close()
+            self._database = None
+        if self._spool_dir is not None:
+            shutil.rmtree(self._spool_dir, ignore_errors=True)
+            self._spool_dir = None
+
+    def open_namespace(self, namespace):
+        # Namespaces are schemas inside the one DuckDB database
+        connection = self._database.cursor()
+        try:
+            connection.execute(f"CREATE SCHEMA IF NOT EXISTS {namespace}")
+        finally:
+            connection.close()
+
+        def enter(connection):
+            connection.execute(f"SET schema = '{namespace}'")
+
+        def leave(connection):
+            connection.execute("SET schema = 'main'")
+
+        return NamespacedBackend(self, namespace, enter, leave, 'main')
+
+    def drop_namespace(self, namespaced):
+        connection = self._database.cursor()
+        try:
+            connection.execute(f"DROP SCHEMA IF EXISTS {namespaced.namespace} CASCADE")
+        finally:
+            connection.close()
+
+    def table_exists_sql(self, table_name):
+        return ("SELECT COUNT(*) FROM information_schema.tables "
+                f"WHERE table_schema = current_schema() AND table_name = '{table_name}'")
+
+    sort_indexes = False  # ART indexes only serve point lookups
+
+    def index_sql(self, name, table_name, columns):
+        return None
+
+    def explain_sql(self, query):
+        return f"EXPLAIN {query}"
+
+    def summarize_plan(self, rows):
+        # The plan is rendered as a box diagram, one operator per box, with
+        # sibling operators side by side; long table names wrap onto the
+        # following lines of their box
+        plan = "\n".join(row[1] for row in rows)
+        lines = plan.split("\n")
+        full_scans = []
+        for number, line in enumerate(lines):
+            for match in re.finditer(r"Table:", line):
+                left = line.rfind('\u2502', 0, match.start()) + 1
+                right = line.find('\u2502', match.end())
+                right = len(line) if right < 0 else right
+                name = line[match.end():right].strip()
+                for following in lines[number + 1:] if not name else []:
+                    part = following[left:right].strip()
+                    if not part:
+                        break
+                    name += part
+                if name:
+                    full_scans.append(name.split('.')[-1].strip('"'))
+        sorts = len(re.findall(r"\b(?:WINDOW|ORDER_BY|TOP_N)\b", plan))
+        return PlanSummary(None, full_scans, sorts)
+
+
+BACKENDS = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend,
+    'duckdb': DuckDBBackend,
+}
+
+
+def create_backend(name, **params):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown database backend: {name}")
+    return BACKENDS[name](**params)
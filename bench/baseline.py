@@ -0,0 +1,71 @@
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Benchmark results are flat {name: {"ms": median, ...}} maps written as JSON
+# together with a description of the machine and backend that produced them.
+# A later run is compared against such a file name by name.
+
+DEFAULT_THRESHOLD = 0.25  # Slowdown ratio that counts as a regression
+DEFAULT_MIN_MS = 2.0  # Differences below this are timer noise
+
+
+def timed(fn, repeat=3):
+    # Median wall time in ms over `repeat` calls, and the last return value
+    samples = []
+    value = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3), value
+
+
+def environment(**extra):
+    return dict(python=platform.python_version(), implementation=platform.python_implementation(),
+                machine=platform.machine(), system=platform.system(), cpus=os.cpu_count(),
+                timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'), **extra)
+
+
+def save_results(path, results, meta):
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, min_ms=DEFAULT_MIN_MS):
+    # Returns (name, baseline ms, current ms) for every benchmark that got
+    # slower by more than `threshold` and by at least `min_ms`
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None or previous.get('error') or current.get('error'):
+            continue
+        before, after = previous['ms'], current['ms']
+        if after - before >= min_ms and after > before * (1 + threshold):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def report(results, baseline=None, stream=sys.stdout):
+    baseline = baseline or {}
+    for name, current in sorted(results.items()):
+        line = f"{name:<48} "
+        if current.get('error'):
+            line += f"error: {current['error']}"
+        else:
+            line += f"{current['ms']:>12.3f} ms"
+            previous = baseline.get(name)
+            if previous and not previous.get('error') and previous['ms']:
+                line += f"  ({(current['ms'] / previous['ms'] - 1) * 100:+.1f}%)"
+        print(line, file=stream)
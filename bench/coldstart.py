@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from baseline import DEFAULT_MIN_MS, DEFAULT_THRESHOLD, compare, environment, load_results, report, save_results
+
+# Cold-start budget for the desktop app, each sample taken in a fresh
+# interpreter:
+#   coldstart/import_main   cumulative `-X importtime` of `import main`
+#   coldstart/first_paint   script start to the first painted window
+# Modules in DEFERRED must not be loaded before the window paints; they
+# belong to the background connection and seeding. Usage:
+#   python bench/coldstart.py [--runs 5] [--update-baseline]
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+BUDGET_MS = {'coldstart/import_main': 200.0, 'coldstart/first_paint': 600.0}
+DEFERRED = ('faker', 'numpy', 'mysql.connector', 'sqlite3', 'duckdb', 'generator', 'templates')
+
+FIRST_PAINT_PROBE = f"""
+import time
+started = time.perf_counter()
+import json, sys
+sys.path.insert(0, {ROOT!r})
+import main
+app = main.SQLApp()
+app.ui.show()
+app.app.processEvents()
+app.ui.grab()
+painted = (time.perf_counter() - started) * 1000
+print(json.dumps({{'ms': painted, 'loaded': [name for name in {DEFERRED!r} if name in sys.modules]}}))
+sys.stdout.flush()
+import os
+os._exit(0)
+"""
+
+IMPORT_TIME = re.compile(r"import time:\s*\d+ \|\s*(\d+) \| main$", re.MULTILINE)
+
+
+def probe_env():
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    env.setdefault('SQLAPP_BACKEND', 'sqlite')
+    env.setdefault('SQLAPP_DATABASE', 'coldstart')
+    return env
+
+
+def import_main_ms():
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=ROOT,
+                               env=probe_env(), capture_output=True, text=True, check=True)
+    return int(IMPORT_TIME.search(completed.stderr).group(1)) / 1000
+
+
+def first_paint():
+    completed = subprocess.run([sys.executable, '-c', FIRST_PAINT_PROBE], cwd=ROOT, env=probe_env(),
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the desktop app's cold start against its budget.")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'coldstart_results.json'))
+    parser.add_argument('--baseline', default=os.path.join(BENCH_DIR, 'baseline_coldstart.json'))
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--min-ms', type=float, default=DEFAULT_MIN_MS)
+    args = parser.parse_args(argv)
+
+    imports = [import_main_ms() for _ in range(args.runs)]
+    paints = [first_paint() for _ in range(args.runs)]
+    loaded = sorted({name for paint in paints for name in paint['loaded']})
+    results = {
+        'coldstart/import_main': {'ms': round(statistics.median(imports), 3)},
+        'coldstart/first_paint': {'ms': round(statistics.median(paint['ms'] for paint in paints), 3)},
+    }
+
+    meta = environment(runs=args.runs)
+    save_results(args.output, results, meta)
+    previous = load_results(args.baseline)
+    report(results, previous and previous['results'])
+
+    failures = []
+    for name, budget in BUDGET_MS.items():
+        if results[name]['ms'] > budget:
+            failures.append(f"OVER BUDGET {name}: {results[name]['ms']:.1f} ms > {budget:.0f} ms")
+    if loaded:
+        failures.append(f"LOADED BEFORE FIRST PAINT: {', '.join(loaded)}")
+    if args.update_baseline or previous is None:
+        save_results(args.baseline, results, meta)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+    else:
+        for name, before, after in compare(results, previous['results'], args.threshold, args.min_ms):
+            failures.append(f"REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from baseline import (DEFAULT_MIN_MS, DEFAULT_THRESHOLD, compare, environment, load_results, report,
+                      save_results, timed)
+from config import ConfigError, load_config
+from database import DatabaseManager
+from challenge import ChallengeManager
+from catalog import RELATIONAL_SCHEMAS
+from templates import SCHEMA_NAMES, TEMPLATES_BY_SCHEMA, get_template
+
+# Benchmarks the paths that scale with the seeded row count:
+#   refill/<schema>/<rows>          seeding one table with refill_tables
+#   query/<template>/<rows>         each template's reference query
+#   validate_cold/<schema>/<rows>   validate_answer computing the reference answer
+#   validate_warm/<schema>/<rows>   validate_answer with the reference answer cached
+#   grid_first/<schema>/<rows>      building the result model and painting the first page
+#   grid_scroll/<schema>/<rows>     paging the grid through the whole (capped) result
+# Everything runs against an embedded backend by default, so no server or
+# network is involved. Usage:
+#   python bench/run.py --sizes 1000,100000 [--update-baseline]
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SUITES = ('refill', 'query', 'validate', 'grid')
+SEED = 20240101
+
+
+def open_database(backend):
+    # Without the result cache, so repeated queries are measured on the engine
+    config = load_config(backend=backend, pool_size=4, query_timeout_ms=0, result_cache_mb=0)
+    if backend != 'mysql':
+        config['database'] = 'bench'
+    db = DatabaseManager.from_config(config)
+    db.connect()
+    if backend == 'mysql':
+        db = db.scoped('bench')
+    return db
+
+
+def working_template(challenge, schema, row_count):
+    # Seeds `schema` and returns its first template whose reference query
+    # runs on this backend
+    templates = TEMPLATES_BY_SCHEMA[schema]
+    challenge.prepare_challenge(templates[0], seed=SEED, row_count=row_count)
+    for key in templates:
+        _, sql = get_template(key).render()
+        if challenge.db_manager.execute(sql).error is None:
+            return key
+    return None
+
+
+def bench_schema(challenge, schema, row_count, suites, repeat, results, grid):
+    db = challenge.db_manager
+    # Seeds the tables (and their snapshot) once; the timed refills below
+    # regenerate the same rows from the same seed
+    key = working_template(challenge, schema, row_count)
+
+    if 'refill' in suites:
+        ms, _ = timed(lambda: challenge.refill_tables(schema, row_count), repeat)
+        results[f"refill/{schema}/{row_count}"] = {'ms': ms, 'rows_per_s': round(row_count / ms * 1000)}
+
+    if 'query' in suites:
+        for template_key in TEMPLATES_BY_SCHEMA[schema]:
+            _, sql = get_template(template_key).render()
+            ms, result = timed(lambda: db.execute(sql), repeat)
+            name = f"query/{template_key}/{row_count}"
+            if result.error:
+                results[name] = {'ms': ms, 'error': result.error}
+            else:
+                results[name] = {'ms': ms, 'rows': len(result.rows or [])}
+
+    if 'validate' in suites:
+        if key is None:
+            error = "no template runs on this backend"
+            results[f"validate_cold/{schema}/{row_count}"] = {'ms': 0.0, 'error': error}
+            results[f"validate_warm/{schema}/{row_count}"] = {'ms': 0.0, 'error': error}
+        else:
+            challenge.prepare_challenge(key, seed=SEED, row_count=row_count)
+            _, sql = challenge.current_challenge
+
+            def validate_cold():
+                challenge.reference_cache.invalidate(schema)
+                return challenge.validate_answer(sql)
+
+            ms, comparison = timed(validate_cold, repeat)
+            results[f"validate_cold/{schema}/{row_count}"] = {'ms': ms, 'template': key,
+                                                               'rows': comparison.rows_compared}
+            ms, comparison = timed(lambda: challenge.validate_answer(sql), repeat)
+            results[f"validate_warm/{schema}/{row_count}"] = {'ms': ms, 'template': key,
+                                                               'rows': comparison.rows_compared}
+
+    if 'grid' in suites:
+        # Relational schemas list their fact table last
+        table_name = challenge.table_names(schema)[-1]
+        first_ms, scroll_ms, rows = grid(db, f"SELECT * FROM {table_name}", repeat)
+        results[f"grid_first/{schema}/{row_count}"] = {'ms': first_ms}
+        results[f"grid_scroll/{schema}/{row_count}"] = {'ms': scroll_ms, 'rows': rows}
+
+
+def grid_benchmark():
+    # Qt is only needed for the grid suite; render without a display
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication, QTableView
+    from main import SQLApp
+    from results_model import QueryResultModel
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    view = QTableView()
+    view.resize(800, 600)
+
+    def grid(db, query, repeat):
+        models = []
+
+        def first_page():
+            stream = db.stream(query, batch_size=SQLApp.PAGE_SIZE, max_rows=SQLApp.MAX_RESULT_ROWS)
+            model = QueryResultModel(stream)
+            view.setModel(model)
+            header = view.horizontalHeader()
+            for column, width in enumerate(model.estimate_column_widths(view.fontMetrics())):
+                header.resizeSection(column, width)
+            view.grab()
+            models.append(model)
+
+        def scroll():
+            model = models[-1]
+            while model.canFetchMore():
+                model.fetchMore()
+                app.processEvents()
+            view.scrollToBottom()
+            view.grab()
+            return model.rowCount()
+
+        first_ms, _ = timed(first_page, repeat)
+        scroll_ms, rows = timed(scroll, 1)
+        view.setModel(None)
+        for model in models:
+            model.close()
+        return first_ms, scroll_ms, rows
+
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark seeding, template queries, validation and the grid.")
+    parser.add_argument('--backend', default='sqlite', choices=('sqlite', 'duckdb', 'mysql'))
+    parser.add_argument('--sizes', default='1000,100000,1000000', help="comma-separated row counts")
+    parser.add_argument('--schemas', default=','.join(SCHEMA_NAMES + list(RELATIONAL_SCHEMAS)))
+    parser.add_argument('--suites', default=','.join(SUITES))
+    parser.add_argument('--repeat', type=int, default=3, help="runs per measurement; the median is kept")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results.json'))
+    parser.add_argument('--baseline', default=None,
+                        help="baseline file (default: bench/baseline_<backend>.json)")
+    parser.add_argument('--update-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown ratio reported as a regression")
+    parser.add_argument('--min-ms', type=float, default=DEFAULT_MIN_MS)
+    args = parser.parse_args(argv)
+
+    # Failing queries are recorded in the results; keep their log lines out of the report
+    logging.basicConfig(level=logging.CRITICAL)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    schemas = args.schemas.split(',')
+    suites = set(args.suites.split(','))
+    baseline_path = args.baseline or os.path.join(BENCH_DIR, f"baseline_{args.backend}.json")
+    grid = grid_benchmark() if 'grid' in suites else None
+
+    results = {}
+    try:
+        db = open_database(args.backend)
+    except ConfigError as e:
+        parser.error(str(e))
+    try:
+        for row_count in sizes:
+            challenge = ChallengeManager(db, row_count=row_count, seed=SEED)
+            try:
+                for schema in schemas:
+                    print(f"Benchmarking {schema} at {row_count} rows...", file=sys.stderr)
+                    bench_schema(challenge, schema, row_count, suites, args.repeat, results, grid)
+            finally:
+                challenge.snapshots.drop_all()
+    finally:
+        db.close()
+
+    meta = environment(backend=args.backend, sizes=sizes, repeat=args.repeat)
+    save_results(args.output, results, meta)
+    previous = load_results(baseline_path)
+    report(results, previous and previous['results'])
+    if args.update_baseline or previous is None:
+        save_results(baseline_path, results, meta)
+        print(f"Baseline written to {baseline_path}", file=sys.stderr)
+        return 0
+    regressions = compare(results, previous['results'], args.threshold, args.min_ms)
+    for name, before, after in regressions:
+        print(f"REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
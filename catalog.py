@@ -0,0 +1,174 @@
+import functools
+import logging
+import re
+import zlib
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Typed metadata for the challenge tables, parsed once from the MySQL DDL in
+# ChallengeManager.schemas. Row counts and value distributions come from the
+# live tables and are memoized per data version (schema, seed, row count),
+# since seeding is the only thing that changes them.
+
+CREATE_TABLE = re.compile(r"CREATE TABLE\s+(IF NOT EXISTS\s+)?(\w+)\s*\((.*)\)\s*$", re.IGNORECASE | re.DOTALL)
+COLUMN = re.compile(r"(\w+)\s+(\w+)\s*(?:\((.*?)\))?\s*(.*)$", re.DOTALL)
+INDEX = re.compile(r"(?:INDEX|KEY)\s+(\w+)\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+# Multi-table datasets seeded together with consistent foreign keys, in
+# dependency order. They carry join challenges for some window functions.
+RELATIONAL_SCHEMAS = {'retail': ['product', 'customer', 'employee', 'sales']}
+TOP_VALUES = 5  # Most common values kept for low-cardinality columns
+LOW_CARDINALITY = 20
+
+
+class Column(namedtuple('Column', ['name', 'type', 'args', 'primary_key', 'auto_increment', 'enum_values',
+                                   'definition'])):
+    @property
+    def sql_type(self):
+        # Type as written in the DDL, e.g. DECIMAL(10,2) or VARCHAR(255)
+        if self.enum_values:
+            return f"ENUM({', '.join(repr(value) for value in self.enum_values)})"
+        return f"{self.type}({','.join(self.args)})" if self.args else self.type
+
+    @property
+    def is_numeric(self):
+        return self.type in ('INT', 'INTEGER', 'BIGINT', 'SMALLINT', 'DECIMAL', 'NUMERIC', 'FLOAT', 'DOUBLE')
+
+
+Index = namedtuple('Index', ['name', 'columns'])
+Table = namedtuple('Table', ['name', 'columns', 'indexes', 'if_not_exists'])
+ColumnStats = namedtuple('ColumnStats', ['distinct', 'minimum', 'maximum', 'top_values'])
+TableStats = namedtuple('TableStats', ['row_count', 'columns'])
+
+
+def split_definitions(text):
+    # Splits on commas outside parentheses and quotes
+    parts = []
+    current = []
+    depth = 0
+    quote = None
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+
+def _parse_column(definition):
+    name, type_name, args, rest = COLUMN.match(definition).groups()
+    type_name = type_name.upper()
+    enum_values = ()
+    if type_name == 'ENUM':
+        enum_values = tuple(value.strip().strip("'") for value in split_definitions(args))
+        args = None
+    rest = rest.upper()
+    return Column(name, type_name, tuple(arg.strip() for arg in args.split(',')) if args else (),
+                  'PRIMARY KEY' in rest, 'AUTO_INCREMENT' in rest, enum_values, definition)
+
+
+@functools.lru_cache(maxsize=None)
+def parse_table(statement):
+    # Table for one CREATE TABLE statement; the cache makes re-translation free
+    match = CREATE_TABLE.match(statement.strip())
+    if match is None:
+        raise ValueError(f"Not a CREATE TABLE statement: {statement}")
+    if_not_exists, table_name, body = match.groups()
+    columns = []
+    indexes = []
+    for definition in split_definitions(body):
+        index = INDEX.match(definition)
+        if index:
+            indexes.append(Index(index.group(1), tuple(column.strip() for column in index.group(2).split(','))))
+        else:
+            columns.append(_parse_column(definition))
+    return Table(table_name, tuple(columns), tuple(indexes), bool(if_not_exists))
+
+
+def schema_version(schemas):
+    text = "\n".join(f"{name}:{statement}" for name, statements in sorted(schemas.items())
+                     for statement in statements)
+    return zlib.crc32(text.encode())
+
+
+class SchemaCatalog:
+    _catalogs = {}  # schema version -> catalog, shared by every ChallengeManager
+
+    def __init__(self, schemas):
+        self.version = schema_version(schemas)
+        self.tables_by_schema = {name: [parse_table(statement) for statement in statements]
+                                 for name, statements in schemas.items()}
+        self.tables = {table.name: table for tables in self.tables_by_schema.values() for table in tables}
+        self._stats = {}  # (table, data version) -> TableStats
+        self._rendered = {}  # (schema, row counts) -> text
+
+    @classmethod
+    def for_schemas(cls, schemas):
+        version = schema_version(schemas)
+        catalog = cls._catalogs.get(version)
+        if catalog is None:
+            catalog = cls._catalogs[version] = cls(schemas)
+        return catalog
+
+    def table(self, table_name):
+        return self.tables[table_name]
+
+    def column_names(self, table_name):
+        return [column.name for column in self.tables[table_name].columns]
+
+    def stats(self, db_manager, table_name, data_version):
+        key = (table_name, data_version)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = self._collect_stats(db_manager, self.tables[table_name])
+        return stats
+
+    def _collect_stats(self, db_manager, table):
+        columns = [column for column in table.columns if not column.primary_key]
+        aggregates = ["COUNT(*)"] + [f"COUNT(DISTINCT {column.name}), MIN({column.name}), MAX({column.name})"
+                                     for column in columns]
+        rows = db_manager.execute_query(f"SELECT {', '.join(aggregates)} FROM {table.name}")
+        if isinstance(rows, str):
+            logger.warning("Could not collect statistics for %s: %s", table.name, rows)
+            return None
+        values = rows[0]
+        column_stats = {}
+        for position, column in enumerate(columns):
+            distinct, minimum, maximum = values[1 + position * 3:4 + position * 3]
+            top_values = ()
+            if column.enum_values or (not column.is_numeric and distinct <= LOW_CARDINALITY):
+                counts = db_manager.execute_query(
+                    f"SELECT {column.name}, COUNT(*) FROM {table.name} GROUP BY {column.name} "
+                    f"ORDER BY COUNT(*) DESC, {column.name} LIMIT {TOP_VALUES}")
+                if isinstance(counts, list):
+                    top_values = tuple(tuple(row) for row in counts)
+            column_stats[column.name] = ColumnStats(distinct, minimum, maximum, top_values)
+        return TableStats(values[0], column_stats)
+
+    def render(self, schema_name, row_counts=None):
+        # Info panel text for `schema_name`; `row_counts` maps tables to their live row counts
+        row_counts = row_counts or {}
+        key = (schema_name, tuple(sorted(row_counts.items())))
+        text = self._rendered.get(key)
+        if text is None:
+            lines = [f"Schema: {schema_name}"]
+            for table in self.tables_by_schema[schema_name]:
+                rows = row_counts.get(table.name)
+                lines.append(f"Table: {table.name}" + (f" ({rows} rows)" if rows is not None else ""))
+                lines.extend(f"  - {column.definition}" for column in table.columns)
+                lines.extend(f"  * index {index.name} ({', '.join(index.columns)})" for index in table.indexes)
+                lines.append("")
+            text = self._rendered[key] = "\n".join(lines) + "\n"
+        return text
@@ -1,158 +1,299 @@
-from faker import Faker
+import logging
 import random
-from templates import SQLChallengeTemplates
+from collections import namedtuple
+from snapshot import SnapshotCache
+from reference_cache import ReferenceCache
+from advisor import IndexAdvisor
+from catalog import RELATIONAL_SCHEMAS, SchemaCatalog
+from compare import ComparisonResult, ResultComparator, UNORDERED
+
+# The data generator (NumPy, Faker and its locale providers) and the template
+# registry are imported on first use, so importing this module stays cheap
+# for the GUI's cold start.
+
+logger = logging.getLogger(__name__)
+
+# Data seeds drawn for random challenges. Keeping the pool small means each
+# schema is generated at most this many times; after that every challenge
+# restores from a snapshot.
+DATA_SEEDS = 8
+# Snapshots kept beyond one per schema and data seed, for challenges and
+# grader submissions that name a seed outside the pool
+EXTRA_SNAPSHOTS = 16
+
+
+class ChallengeSpec(namedtuple('ChallengeSpec', ['template_key', 'seed', 'row_count'])):
+    # Everything needed to rebuild a challenge and its data exactly. The seed
+    # picks the template and drives every generated row.
+    @classmethod
+    def from_seed(cls, seed, row_count=100, dialect=None):
+        from templates import sample_template
+        return cls(sample_template(random.Random(seed), dialect).key, seed, row_count)
+
+    @classmethod
+    def parse(cls, text):
+        # Inverse of str(): 'rank_product:42:100'
+        parts = text.rsplit(':', 2) if isinstance(text, str) else []
+        if len(parts) != 3:
+            raise ValueError(f"Expected a spec like <template>:<seed>:<rows>, got {text!r}")
+        template_key, seed, row_count = parts
+        return cls(template_key, int(seed), int(row_count))
+
+    def __str__(self):
+        return f"{self.template_key}:{self.seed}:{self.row_count}"
+
 
 class ChallengeManager:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, row_count=100, seed=None, reference_cache_path=None,
+                 comparison_mode=UNORDERED, reference_cache=None):
         self.db_manager = db_manager
+        self.row_count = row_count  # Rows seeded per table on each load
+        # Data seed used when a challenge is prepared without one; snapshots are keyed by it
+        self.seed = seed if seed is not None else random.randrange(DATA_SEEDS)
         self.current_challenge = None
         self.current_schema = None  # Store the current schema name
         self.current_window_function = None  # Store the current window function
+        self.current_template = None
+        self.current_spec = None
         self.schemas = {
             'product': [
-                "CREATE TABLE IF NOT EXISTS product (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), price DECIMAL(10,2), category VARCHAR(255), launch_date DATE)"
+                "CREATE TABLE IF NOT EXISTS product (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), price DECIMAL(10,2), category VARCHAR(255), launch_date DATE, INDEX product_category_price (category, price DESC), INDEX product_category_launch_date (category, launch_date), INDEX product_launch_date (launch_date))"
             ],
             'user': [
-                "CREATE TABLE IF NOT EXISTS user (id INT AUTO_INCREMENT PRIMARY KEY, username VARCHAR(255), email VARCHAR(255), order_count INT, join_date DATE, language ENUM('English', 'Spanish', 'Chinese', 'Russian', 'French', 'Arabic', 'Dutch', 'Japanese'))"
+                "CREATE TABLE IF NOT EXISTS user (id INT AUTO_INCREMENT PRIMARY KEY, username VARCHAR(255), email VARCHAR(255), order_count INT, join_date DATE, language ENUM('English', 'Spanish', 'Chinese', 'Russian', 'French', 'Arabic', 'Dutch', 'Japanese'), INDEX user_language_order_count (language, order_count DESC), INDEX user_language_join_date (language, join_date), INDEX user_join_date (join_date))"
             ],
             'customer': [
-                "CREATE TABLE IF NOT EXISTS customer (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), address VARCHAR(255), loyalty ENUM('bronze', 'silver', 'gold', 'platinum'), last_order DATE, order_total DECIMAL(10, 2))"
+                "CREATE TABLE IF NOT EXISTS customer (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), address VARCHAR(255), loyalty ENUM('bronze', 'silver', 'gold', 'platinum'), last_order DATE, order_total DECIMAL(10, 2), INDEX customer_loyalty_order_total (loyalty, order_total DESC), INDEX customer_loyalty_last_order (loyalty, last_order), INDEX customer_last_order (last_order))"
             ],
             'employee': [
-                "CREATE TABLE IF NOT EXISTS employee (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), position VARCHAR(50), salary DECIMAL(10,2), hire_date DATE)"
+                "CREATE TABLE IF NOT EXISTS employee (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), position VARCHAR(50), salary DECIMAL(10,2), hire_date DATE, INDEX employee_position_salary (position, salary DESC), INDEX employee_position_hire_date (position, hire_date), INDEX employee_hire_date (hire_date))"
             ],
             'sales': [
-                "CREATE TABLE IF NOT EXISTS sales (id INT AUTO_INCREMENT PRIMARY KEY, product_id INT, customer_id INT, sale_amount DECIMAL(10,2), sale_date DATE)"
+                "CREATE TABLE IF NOT EXISTS sales (id INT AUTO_INCREMENT PRIMARY KEY, product_id INT, customer_id INT, employee_id INT, sale_amount DECIMAL(10,2), sale_date DATE, INDEX sales_sale_date (sale_date), INDEX sales_sale_amount (sale_amount DESC), INDEX sales_product_id (product_id), INDEX sales_customer_id (customer_id), INDEX sales_employee_id (employee_id))"
             ]
         }
-        self.faker = Faker()
+        # Relational datasets reuse the single-table definitions. Foreign keys
+        # are kept valid by the generator rather than declared, so snapshot
+        # restores can reload each table on its own; the join keys are indexed.
+        for schema_name, tables in RELATIONAL_SCHEMAS.items():
+            self.schemas[schema_name] = [statement for table in tables for statement in self.schemas[table]]
+        self.generator = None
+        # Room for every pooled data set of every schema, so random
+        # challenges never evict one another
+        self.snapshots = SnapshotCache(db_manager, len(self.schemas) * DATA_SEEDS + EXTRA_SNAPSHOTS)
+        self.reference_cache = reference_cache or ReferenceCache(reference_cache_path)
+        self.comparator = ResultComparator(comparison_mode)
+        self.catalog = SchemaCatalog.for_schemas(self.schemas)
+        self.advisor = IndexAdvisor(db_manager, self.catalog)
 
-    def load_challenge(self):
-        # Randomly select a schema and a window function
-        print("Loading new challenge...")
+    def load_challenge(self, seed=None):
+        # A given seed selects the template (schema and window function) and
+        # the data; without one any template is drawn over one of the
+        # DATA_SEEDS data sets, so its snapshot is likely to exist already
+        logger.info("Loading new challenge")
+        if seed is not None:
+            return self.rebuild(ChallengeSpec.from_seed(seed, self.row_count, self.db_manager.dialect))
+        from templates import sample_template
+        template = sample_template(random, self.db_manager.dialect)
+        return self.rebuild(ChallengeSpec(template.key, random.randrange(DATA_SEEDS), self.row_count))
 
-        self.current_schema = random.choice(list(self.schemas.keys()))
-        print(f"Selected schema: {self.current_schema}")
-        self.current_window_function = random.choice(['SUM() OVER()', 'ROW_NUMBER()', 'AVG() OVER()', 'COUNT() OVER()', 'RANK()', 'LEAD()', 
-                                         'LAG()', 'FIRST_VALUE()', 'LAST_VALUE()', 'NTH_VALUE()', 'PERCENT_RANK()', 'CUME_DIST()', 
-                                         'PERCENTILE_CONT()', 'PERCENTILE_DISC()'])
-        print(f"Selected window function: {self.current_window_function}")
+    def rebuild(self, spec):
+        # Recreates exactly the challenge and rows described by `spec`
+        return self.prepare_challenge(spec.template_key, spec.seed, spec.row_count)
 
-        self.create_tables(self.current_schema)
-        self.refill_tables(self.current_schema)
+    def prepare_challenge(self, template_key, seed=None, row_count=None):
+        # Makes `template_key` the current challenge over data generated from
+        # `seed` (default: this manager's seed), restoring it from a snapshot
+        # when one exists.
+        if seed is not None:
+            self.seed = seed
+        if row_count is not None:
+            self.row_count = row_count
+        from templates import get_template
+        self.current_spec = None  # Set once the tables hold its rows
+        self.current_template = get_template(template_key)
+        self.current_schema = self.current_template.schema
+        logger.info("Selected schema: %s", self.current_schema)
+        self.current_window_function = self.current_template.function
+        logger.info("Selected window function: %s", self.current_window_function)
 
-        challenge_template = SQLChallengeTemplates(self.current_schema)
-        self.current_challenge = challenge_template.generate_challenge(self.current_window_function)
+        self.load_schema(self.current_schema)
+        self.current_spec = ChallengeSpec(template_key, self.seed, self.row_count)
 
-        print(f"Generated challenge: {self.current_challenge}")
+        self.current_challenge = self.current_template.render()
+
+        logger.debug("Generated challenge: %s", self.current_challenge)
         return self.current_challenge
 
+    def load_schema(self, schema_name, seed=None, row_count=None):
+        # Fills the tables of `schema_name` with the rows generated from `seed`,
+        # restoring them from a snapshot when one exists
+        if seed is not None:
+            self.seed = seed
+        if row_count is not None:
+            self.row_count = row_count
+        self.create_tables(schema_name)
+        self.snapshots.restore(schema_name, self.seed, self.row_count, lambda: self.refill_tables(schema_name),
+                               tables=self.table_names(schema_name))
+        # Repeated read-only queries on these rows can now be answered from the result cache
+        self.db_manager.set_data_version((schema_name, self.seed, self.row_count))
+
     def create_tables(self, schema_name):
-        print(f"Creating tables for schema: {schema_name}")
+        logger.info("Creating tables for schema: %s", schema_name)
         queries = self.schemas[schema_name]
         for query in queries:
-            self.db_manager.execute_query(query)
+            for statement in self.db_manager.translate_ddl(query):
+                self.db_manager.execute_query(statement)
 
-    def refill_tables(self, schema_name):
+    def table_names(self, schema_name):
+        return [table.name for table in self.catalog.tables_by_schema[schema_name]]
+
+    def refill_tables(self, schema_name, row_count=None):
+        from generator import DataGenerator, relational_row_counts, schema_seed
+        if row_count is None:
+            row_count = self.row_count
+        # Reference answers computed against the old rows are no longer valid
+        self.reference_cache.invalidate(schema_name)
         # Empty the tables
-        print(f"Emptying existing tables...")
-        self.db_manager.execute_query(f"DELETE FROM {schema_name}")
-        print(f"Refilling tables for schema: {schema_name}")
+        logger.debug("Emptying existing tables")
+        for table_name in reversed(self.table_names(schema_name)):
+            result = self.db_manager.execute_query(f"DELETE FROM {table_name}")
+            if isinstance(result, str):
+                raise RuntimeError(f"Could not empty {table_name}: {result}")
+        logger.info("Refilling tables for schema: %s (%d rows)", schema_name, row_count)
+        # A fresh generator per fill keeps the data a pure function of the seed
+        if schema_name in RELATIONAL_SCHEMAS:
+            row_counts = relational_row_counts(row_count)
+            self.generator = DataGenerator(schema_seed(self.seed, schema_name), dimensions=row_counts)
+            self.fill_relational_tables(schema_name, row_counts)
+            return
+        self.generator = DataGenerator(schema_seed(self.seed, schema_name))
         if schema_name == 'product':
-            self.fill_product_table()
+            self.fill_product_table(row_count)
         elif schema_name == 'user':
-            self.fill_user_table()
+            self.fill_user_table(row_count)
         elif schema_name == 'customer':
-            self.fill_customer_table()
+            self.fill_customer_table(row_count)
         elif schema_name == 'employee':
-            self.fill_employee_table()
+            self.fill_employee_table(row_count)
         elif schema_name == 'sales':
-            self.fill_sales_table()
-
-    def fill_product_table(self):
-        for _ in range(100):
-            product_name = self.faker.catch_phrase()
-            price = round(random.uniform(10, 500), 2)
-            category = random.choice(['Electronics', 'Books', 'Clothing', 'Home'])
-            launch_date = self.faker.date_between(start_date='-12y', end_date='today')
-            insert_query = f"INSERT INTO product (name, price, category, launch_date) VALUES ('{product_name}', {price}, '{category}', '{launch_date}')"
-            self.db_manager.execute_query(insert_query)
-
-    def fill_user_table(self):
-        for _ in range(100):
-            username = self.faker.user_name()
-            email = self.faker.email()
-            join_date = self.faker.date_between(start_date='-10y', end_date='today')
-            order_count = random.uniform(1, 1000)
-            language = random.choice(['English', 'Spanish', 'Chinese', 'Russian', 'French', 'Arabic', 'Dutch', 'Japanese'])
-            insert_query = f"INSERT INTO user (username, email, order_count, join_date) VALUES ('{username}', '{email}', {order_count}, '{join_date}', '{language}')"
-            self.db_manager.execute_query(insert_query)
-
-    def fill_customer_table(self):
-        for _ in range(100):
-            name = self.faker.name()
-            address = self.faker.address()
-            loyalty = random.choice(['bronze', 'silver', 'gold', 'platinum'])
-            last_order = self.faker.date_between(start_date='-3y', end_date='today')
-            order_total = round(random.uniform(20, 25000), 2)
-            insert_query = f"INSERT INTO customer (name, address, loyalty) VALUES ('{name}', '{address}', '{loyalty}', '{last_order}', {order_total})"
-            self.db_manager.execute_query(insert_query)
-
-    def fill_employee_table(self):
-        positions = ['Manager', 'Sales Associate', 'Clerk', 'Supervisor', 'Yoga Instructor']
-        for _ in range(100):
-            name = self.faker.name()
-            position = random.choice(positions)
-            salary = round(random.uniform(30000, 80000), 2)
-            hire_date = self.faker.date_between(start_date='-5y', end_date='today')
-            insert_query = f"INSERT INTO employee (name, position, salary, hire_date) VALUES ('{name}', '{position}', {salary}, '{hire_date}')"
-            self.db_manager.execute_query(insert_query)
-
-    def fill_sales_table(self):
-        for _ in range(100):
-            product_id = random.randint(1, 100)
-            customer_id = random.randint(1, 100)
-            sale_amount = round(random.uniform(20, 1000), 2)
-            sale_date = self.faker.date_between(start_date='-1y', end_date='today')
-            insert_query = f"INSERT INTO sales (product_id, customer_id, sale_amount, sale_date) VALUES ({product_id}, {customer_id}, {sale_amount}, '{sale_date}')"
-            self.db_manager.execute_query(insert_query)
+            self.fill_sales_table(row_count)
+
+    def fill_product_table(self, row_count=100):
+        self._fill_table('product', row_count, with_ids=True)
+
+    def fill_user_table(self, row_count=100):
+        self._fill_table('user', row_count, with_ids=True)
+
+    def fill_customer_table(self, row_count=100):
+        self._fill_table('customer', row_count, with_ids=True)
+
+    def fill_employee_table(self, row_count=100):
+        self._fill_table('employee', row_count, with_ids=True)
+
+    def fill_sales_table(self, row_count=100):
+        self._fill_table('sales', row_count, with_ids=True)
+
+    def fill_relational_tables(self, schema_name, row_counts):
+        # Referenced tables first; explicit ids 1..n keep the foreign keys valid
+        for table_name in self.table_names(schema_name):
+            self._fill_table(table_name, row_counts[table_name], with_ids=True)
+
+    def _fill_table(self, table_name, row_count, with_ids=False):
+        # with_ids numbers the rows 1..n whatever the engine's auto-increment
+        # state after the DELETE, so the same seed always gives the same ids
+        from generator import SCHEMA_COLUMNS
+        columns = (['id'] if with_ids else []) + SCHEMA_COLUMNS[table_name]
+        for rows in self.generator.row_chunks(table_name, row_count, with_ids):
+            # Raising keeps a partly filled table from being saved as a snapshot
+            result = self.db_manager.insert_rows(table_name, columns, rows)
+            if isinstance(result, str):
+                raise RuntimeError(f"Could not fill {table_name}: {result}")
 
     def get_ascii_representation(self, schema_name):
-        ascii_art = f"Schema: {schema_name}\n"
-        for query in self.schemas[schema_name]:
-            table_name = query.split()[5]
-            ascii_art += f"Table: {table_name}\n"
-            columns_str = self._extract_columns_str(query)
-            columns = self._parse_columns(columns_str)
-            for col in columns:
-                ascii_art += f"  - {col.strip()}\n"
-            ascii_art += "\n"
-        return ascii_art
-
-    def _extract_columns_str(self, query):
-        start = query.find('(') + 1
-        end = query.rfind(')')
-        return query[start:end]
-
-    def _parse_columns(self, columns_str):
-        columns = []
-        current_column = ''
-        bracket_level = 0
-        for char in columns_str:
-            if char == ',' and bracket_level == 0:
-                columns.append(current_column.strip())
-                current_column = ''
-            else:
-                current_column += char
-                if char == '(':
-                    bracket_level += 1
-                elif char == ')':
-                    bracket_level -= 1
-        if current_column:
-            columns.append(current_column.strip())
-        return columns
-    
+        # Rendered from the catalog; live row counts are shown for the loaded schema
+        row_counts = None
+        if schema_name == self.current_schema:
+            row_counts = {table: stats.row_count for table, stats in self.table_stats().items() if stats}
+        return self.catalog.render(schema_name, row_counts)
+
+    def table_stats(self, schema_name=None):
+        # TableStats per table of the loaded schema, memoized per data version
+        schema_name = schema_name or self.current_schema
+        data_version = (schema_name, self.seed, self.row_count)
+        return {table.name: self.catalog.stats(self.db_manager, table.name, data_version)
+                for table in self.catalog.tables_by_schema[schema_name]}
+
+    def snapshot_key(self):
+        return (self.current_schema, self.seed, self.row_count)
+
+    def reference_fingerprint(self):
+        # comparator.fingerprint() of the reference result, cached per
+        # template, comparison mode and dataset so no reference rows are
+        # kept; an "Error: ..." string when the reference query fails, and
+        # None in tolerance mode, which compares against the rows themselves
+        cache_key = (self.current_template.key, self.comparator.mode)
+        snapshot_key = self.snapshot_key()
+        fingerprint = self.reference_cache.get(cache_key, snapshot_key)
+        if isinstance(fingerprint, tuple):
+            return fingerprint
+        stream = self._reference_stream()
+        try:
+            fingerprint = self.comparator.fingerprint(stream)
+        finally:
+            stream.close()
+        if stream.error:
+            return stream.error
+        if fingerprint is not None:
+            self.reference_cache.put(cache_key, snapshot_key, fingerprint)
+        return fingerprint
+
+    def _reference_stream(self):
+        _, sql = self.current_challenge
+        return self.db_manager.stream(sql, batch_size=self.comparator.chunk_size)
+
     def validate_answer(self, user_query):
-        user_result = self.db_manager.execute_query(user_query)
-        correct_result = self.db_manager.execute_query(self.current_challenge['sql'])
-        return user_result == correct_result
\ No newline at end of file
+        # The learner's rows are streamed and checked against the reference
+        # fingerprint, so large answers are checked in bounded memory. Both
+        # queries only run again, side by side, to show example rows once
+        # they differ, or on every check in tolerance mode. Statements that
+        # would change the tables are refused before they run.
+        mode = self.comparator.mode
+        expected_print = self.reference_fingerprint()
+        if isinstance(expected_print, str):
+            return ComparisonResult(False, mode, 0, f"Reference query failed: {expected_print}")
+        reference_streams = []
+        user_streams = []
+
+        def open_user_stream():
+            user_streams.append(self.db_manager.stream(user_query, batch_size=self.comparator.chunk_size,
+                                                       read_only=True))
+            return user_streams[-1]
+
+        def open_streams():
+            reference_streams.append(self._reference_stream())
+            return reference_streams[-1], open_user_stream()
+
+        try:
+            if expected_print is None:
+                result = self.comparator.compare(*open_streams())
+            else:
+                user_stream = open_user_stream()
+                if user_stream.error:
+                    return ComparisonResult(False, mode, 0, user_stream.error)
+                result = self.comparator.compare_fingerprint(expected_print, user_stream, open_streams)
+            error = next((stream.error for stream in user_streams if stream.error), None)
+            if error:
+                return ComparisonResult(False, mode, result.rows_compared, error)
+            error = next((stream.error for stream in reference_streams if stream.error), None)
+            if error:
+                return ComparisonResult(False, mode, result.rows_compared, f"Reference query failed: {error}")
+            return result
+        finally:
+            for stream in reference_streams + user_streams:
+                stream.close()
+
+    def review_plan(self, user_query):
+        # Plan feedback for a submission, measured against the reference query
+        _, sql = self.current_challenge
+        return self.advisor.review(user_query, sql)
@@ -0,0 +1,238 @@
+import datetime
+import hashlib
+import math
+from collections import Counter
+from decimal import Decimal
+from itertools import islice, zip_longest
+
+EXACT = 'exact'
+UNORDERED = 'unordered'
+TOLERANCE = 'tolerance'
+MODES = (EXACT, UNORDERED, TOLERANCE)
+
+
+class ComparisonResult:
+    def __init__(self, matched, mode, rows_compared, message='', mismatch_index=None,
+                 expected_row=None, actual_row=None):
+        self.matched = matched
+        self.mode = mode
+        self.rows_compared = rows_compared
+        self.message = message
+        self.mismatch_index = mismatch_index  # 0-based row position, when known
+        self.expected_row = expected_row
+        self.actual_row = actual_row
+
+    def __bool__(self):
+        return self.matched
+
+    def __repr__(self):
+        return (f"ComparisonResult(matched={self.matched}, mode={self.mode!r}, rows={self.rows_compared}, "
+                f"mismatch_index={self.mismatch_index}, message={self.message!r})")
+
+
+def chunked(rows, size):
+    # Turns a flat row iterable into lists of at most `size` rows
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def normalize_value(value, places):
+    # Decimal, float and int compare equal when they denote the same number
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float, Decimal)):
+        if isinstance(value, float) and not math.isfinite(value):
+            return repr(value)
+        number = round(float(value), places)
+        if number.is_integer():
+            return int(number)
+        return number
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode('utf-8', 'replace')
+    return value
+
+
+def is_number(value):
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+class ResultComparator:
+    # Compares two result sets that arrive as iterables of row chunks, so
+    # neither side has to be held in memory in full.
+    def __init__(self, mode=UNORDERED, places=6, rel_tol=1e-9, abs_tol=1e-6, chunk_size=1000,
+                 max_diff_rows=100000):
+        if mode not in MODES:
+            raise ValueError(f"Unknown comparison mode: {mode}")
+        self.mode = mode
+        self.places = places  # Rounding applied before exact/unordered matching
+        self.rel_tol = rel_tol
+        self.abs_tol = abs_tol
+        self.chunk_size = chunk_size
+        self.max_diff_rows = max_diff_rows  # Row budget for locating unordered mismatches
+
+    def normalize_row(self, row):
+        return tuple(normalize_value(value, self.places) for value in row)
+
+    def row_digest(self, row):
+        return hashlib.blake2b(repr(self.normalize_row(row)).encode(), digest_size=8).digest()
+
+    def chunk_digest(self, chunk):
+        digest = hashlib.blake2b(digest_size=16)
+        for row in chunk:
+            digest.update(repr(self.normalize_row(row)).encode())
+        return digest.digest()
+
+    def compare(self, expected_chunks, actual_chunks, rediff=None):
+        # rediff: optional callable returning fresh (expected_chunks,
+        # actual_chunks); unordered results are only read a second time,
+        # to find example rows, once they are known to differ
+        if self.mode == UNORDERED:
+            return self.compare_fingerprint(self.fingerprint(expected_chunks), actual_chunks, rediff)
+        return self._compare_ordered(expected_chunks, actual_chunks)
+
+    def compare_rows(self, expected_rows, actual_rows):
+        expected_rows = list(expected_rows)
+        actual_rows = list(actual_rows)
+
+        def rediff():
+            return chunked(expected_rows, self.chunk_size), chunked(actual_rows, self.chunk_size)
+
+        return self.compare(*rediff(), rediff=rediff)
+
+    def fingerprint(self, chunks):
+        # Summary that a later result can be checked against without keeping
+        # these rows: an order-independent multiset hash in UNORDERED mode,
+        # a digest of the rows in order in EXACT mode. None in TOLERANCE
+        # mode, where near-equal numbers have to be compared one by one.
+        if self.mode == UNORDERED:
+            return self._fingerprint(chunks, None)[0]
+        if self.mode == EXACT:
+            count = 0
+            digest = hashlib.blake2b(digest_size=16)
+            for chunk in chunks:
+                for row in chunk:
+                    digest.update(repr(self.normalize_row(row)).encode())
+                    count += 1
+            return (count, digest.digest())
+        return None
+
+    def compare_fingerprint(self, expected_print, actual_chunks, rediff=None):
+        # Checks a result against the fingerprint() of the expected one
+        if self.mode == TOLERANCE:
+            raise ValueError("Tolerance comparisons need both results row by row")
+        actual_print = self.fingerprint(actual_chunks)
+        if actual_print == expected_print:
+            return ComparisonResult(True, self.mode, actual_print[0], "Results match.")
+        if self.mode == EXACT:
+            if rediff is not None:
+                result = self._compare_ordered(*rediff())
+                if not result.matched:
+                    return result
+            # The second run matched: the query's row order is not deterministic
+            return ComparisonResult(False, self.mode, actual_print[0], "Result rows differ.")
+        if expected_print[3] != actual_print[3] and expected_print[0] and actual_print[0]:
+            message = "Your result has a different number of columns."
+        elif expected_print[0] != actual_print[0]:
+            message = f"Expected {expected_print[0]} rows but got {actual_print[0]}."
+        else:
+            message = "Result rows differ."
+        if rediff is None or max(expected_print[0], actual_print[0]) > self.max_diff_rows:
+            return ComparisonResult(False, self.mode, actual_print[0], message)
+        expected_row, actual_row = self._locate(*rediff())
+        return ComparisonResult(False, self.mode, actual_print[0], message,
+                                expected_row=expected_row, actual_row=actual_row)
+
+    def rows_match(self, expected, actual):
+        if len(expected) != len(actual):
+            return False
+        if self.mode == EXACT:
+            return self.normalize_row(expected) == self.normalize_row(actual)
+        for left, right in zip(expected, actual):
+            if is_number(left) and is_number(right):
+                if not math.isclose(float(left), float(right), rel_tol=self.rel_tol, abs_tol=self.abs_tol):
+                    return False
+            elif normalize_value(left, self.places) != normalize_value(right, self.places):
+                return False
+        return True
+
+    def _compare_ordered(self, expected_chunks, actual_chunks):
+        # Re-chunk both sides on the same boundaries so whole chunks can be
+        # skipped on matching fingerprints before any row-by-row work.
+        expected_rows = (row for chunk in expected_chunks for row in chunk)
+        actual_rows = (row for chunk in actual_chunks for row in chunk)
+        position = 0
+        for expected, actual in zip_longest(chunked(expected_rows, self.chunk_size),
+                                            chunked(actual_rows, self.chunk_size), fillvalue=[]):
+            if self.mode == EXACT and len(expected) == len(actual) and \
+                    self.chunk_digest(expected) == self.chunk_digest(actual):
+                position += len(expected)
+                continue
+            for offset, (expected_row, actual_row) in enumerate(zip(expected, actual)):
+                if not self.rows_match(expected_row, actual_row):
+                    return ComparisonResult(False, self.mode, position + offset,
+                                            f"Row {position + offset + 1} differs.",
+                                            position + offset, expected_row, actual_row)
+            if len(expected) != len(actual):
+                shorter = min(len(expected), len(actual))
+                return self._length_mismatch(position + shorter, expected[shorter:], actual[shorter:])
+            position += len(expected)
+        return ComparisonResult(True, self.mode, position, "Results match.")
+
+    def _length_mismatch(self, index, expected_rest, actual_rest):
+        if actual_rest:
+            message = f"Your result has more rows than expected (first extra row is row {index + 1})."
+        else:
+            message = f"Your result is missing rows (first missing row is row {index + 1})."
+        return ComparisonResult(False, self.mode, index, message, index,
+                                expected_rest[0] if expected_rest else None,
+                                actual_rest[0] if actual_rest else None)
+
+    def _fingerprint(self, chunks, counter):
+        # Order-independent multiset fingerprint: row count plus the sum and
+        # xor of 64-bit row hashes. `counter` collects digests for diagnosis
+        # until the row budget runs out.
+        count = 0
+        total = 0
+        xor = 0
+        width = None
+        for chunk in chunks:
+            for row in chunk:
+                if width is None:
+                    width = len(row)
+                elif width != len(row):
+                    width = -1
+                digest = self.row_digest(row)
+                value = int.from_bytes(digest, 'big')
+                total = (total + value) & 0xFFFFFFFFFFFFFFFF
+                xor ^= value
+                count += 1
+                if counter is not None:
+                    if count > self.max_diff_rows:
+                        counter = None
+                    else:
+                        counter[digest] = counter.get(digest, (0, row))[0] + 1, row
+        return (count, total, xor, width), counter
+
+    def _locate(self, expected_chunks, actual_chunks):
+        # An expected row missing from the actual result and an actual row
+        # that was not expected; None for either when there is none or the
+        # results are larger than max_diff_rows
+        _, expected_counter = self._fingerprint(expected_chunks, {})
+        _, actual_counter = self._fingerprint(actual_chunks, {})
+        if expected_counter is None or actual_counter is None:
+            return None, None
+        expected_counts = Counter({digest: count for digest, (count, _) in expected_counter.items()})
+        actual_counts = Counter({digest: count for digest, (count, _) in actual_counter.items()})
+        unexpected = actual_counts - expected_counts
+        missing = expected_counts - actual_counts
+        actual_row = actual_counter[next(iter(unexpected))][1] if unexpected else None
+        expected_row = expected_counter[next(iter(missing))][1] if missing else None
+        return expected_row, actual_row
@@ -0,0 +1,54 @@
+import configparser
+import logging
+import os
+
+# Connection settings come from sqlapp.ini (section [database]) when present,
+# overridden by SQLAPP_* environment variables, e.g. SQLAPP_BACKEND=sqlite.
+# The MySQL password has no default and must be set in one of the two.
+CONFIG_FILE = os.environ.get('SQLAPP_CONFIG', 'sqlapp.ini')
+
+DEFAULTS = {
+    'backend': 'mysql',
+    'host': 'localhost',
+    'user': 'root',
+    'password': '',
+    'database': 'challenger',
+    'pool_size': '5',
+    'query_timeout_ms': '30000',
+    'prefetch_depth': '2',  # Challenges prepared ahead of the current one
+    'result_cache_mb': '64',  # Memory for results of repeated read-only queries; 0 disables it
+    'log_level': 'WARNING',  # DEBUG also logs every query's text
+    'profile_log': '',  # When set, every query profile is appended here as a JSON line
+    'profile_detailed': '0',  # 1: also ask the server for its timing and rows examined
+}
+
+INT_KEYS = ('pool_size', 'query_timeout_ms', 'profile_detailed', 'prefetch_depth', 'result_cache_mb')
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def load_config(path=None, **overrides):
+    # `overrides` (e.g. a --backend option) win over the file and environment
+    config = dict(DEFAULTS)
+    parser = configparser.ConfigParser()
+    parser.read(path or CONFIG_FILE)
+    if parser.has_section('database'):
+        config.update(parser['database'])
+    for key in DEFAULTS:
+        value = os.environ.get(f"SQLAPP_{key.upper()}")
+        if value is not None:
+            config[key] = value
+    config.update(overrides)
+    for key in INT_KEYS:
+        config[key] = int(config[key])
+    if config['backend'] == 'mysql' and not config['password']:
+        raise ConfigError(f"No MySQL password configured. Set password in the [database] section of "
+                          f"{path or CONFIG_FILE} or the SQLAPP_PASSWORD environment variable.")
+    return config
+
+
+def configure_logging(config):
+    logging.basicConfig(level=config['log_level'].upper(),
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
@@ -1,41 +1,461 @@
-import mysql.connector
-from mysql.connector import Error
+import copy
+import itertools
+import logging
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from backends import create_backend
+from dialect import translate_ddl
+from result_cache import ResultCache, estimate_size
+from sqltokens import normalize
+from statements import check as check_statement
+
+logger = logging.getLogger(__name__)
+
+QueryResult = namedtuple('QueryResult', ['columns', 'rows', 'rowcount', 'error'])
+DATA_VERSIONS = itertools.count(1)  # Makes every data version unique within the process
+
+
+class ResultCursor:
+    # Replays a QueryResult as a driver cursor, for streams served from the
+    # result cache or for statements that were run buffered
+    def __init__(self, result):
+        self.description = [(name,) for name in result.columns] if result.columns else None
+        self.rowcount = result.rowcount
+        self.rows = result.rows or []
+        self.position = 0
+
+    def fetchmany(self, size):
+        rows = self.rows[self.position:self.position + size]
+        self.position += len(rows)
+        return rows
+
+    def close(self):
+        pass
+
+
+class QueryStream:
+    # Pages through a result set on an unbuffered (server-side) cursor so
+    # memory and time-to-first-row do not depend on the result size. The
+    # pooled connection is held until the stream is exhausted or closed.
+    def __init__(self, connection=None, cursor=None, batch_size=500, max_rows=None, error=None,
+                 backend=None, on_release=None, on_close=None, query=None, started=None, execute_ms=0.0):
+        self.query = query
+        self.started = started if started is not None else time.perf_counter()
+        self.execute_ms = execute_ms
+        self.fetch_ms = 0.0
+        self.connection = connection
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.error = error
+        self.backend = backend
+        self.on_release = on_release  # Called with the connection still attached, before it is pooled
+        self.on_close = on_close  # Called once the stream is closed
+        self.server_stats = (None, None)  # Set by on_release
+        self.columns = []
+        self.rowcount = -1
+        self.fetched = 0
+        self.truncated = False  # True when max_rows cut the result short
+        self.complete = False  # True once every row was read without an error
+        self.exhausted = cursor is None
+        self.armed = connection is not None  # The query time limit still applies
+        self.cache_key = None  # Set by DatabaseManager.stream() when the rows may be cached
+        self.captured = None  # Rows kept for the result cache, None once over budget
+        self.captured_bytes = 0
+        self.capture_limit = 0
+        if cursor is not None:
+            if cursor.description is None:
+                self.rowcount = cursor.rowcount
+                self.complete = True
+                self.close()
+            else:
+                self.columns = [description[0] for description in cursor.description]
+
+    def fetch_next(self):
+        if self.exhausted:
+            return []
+        limit = self.batch_size
+        if self.max_rows is not None:
+            limit = min(limit, self.max_rows - self.fetched)
+        fetch_started = time.perf_counter()
+        try:
+            rows = self.cursor.fetchmany(limit)
+        except self.backend.errors as e:
+            self.error = f"Error: {str(e)}"
+            self.close()
+            return []
+        self.fetch_ms += (time.perf_counter() - fetch_started) * 1000
+        self.fetched += len(rows)
+        if self.captured is not None:
+            self.captured.extend(rows)
+            self.captured_bytes += estimate_size(rows)
+            if self.captured_bytes > self.capture_limit:
+                self.captured = None
+        if len(rows) < limit:
+            self.complete = True
+            self.close()
+        elif self.max_rows is not None and self.fetched >= self.max_rows:
+            self.truncated = True
+            self.close()
+        elif self.armed:
+            self._disarm()
+        return rows
+
+    def _disarm(self):
+        # The time limit covers executing the query and reading its first
+        # page; the reader may take as long as they like over the rest
+        self.armed = False
+        self.backend.clear_timeout(self.connection)
+
+    def __iter__(self):
+        while not self.exhausted:
+            rows = self.fetch_next()
+            if not rows:
+                break
+            yield rows
+
+    def _release(self):
+        # Hands the connection back to the pool; the stream may still hold rows
+        try:
+            # Drain what the server still has queued before pooling it again
+            self.backend.discard_results(self.connection)
+        except self.backend.errors:
+            pass
+        try:
+            self.cursor.close()
+        finally:
+            if self.on_release is not None:
+                self.on_release(self)
+            self.connection = None
+
+    def close(self):
+        if self.exhausted:
+            return
+        try:
+            if self.connection is not None:
+                self._release()
+        finally:
+            self.cursor = None
+            self.exhausted = True
+            if self.on_close is not None:
+                self.on_close(self)
+
 
 class DatabaseManager:
-    def __init__(self, host, user, password, database):
+    def __init__(self, host, user, password, database, pool_size=5, batch_size=5000, checkout_timeout=10,
+                 query_timeout_ms=None, backend='mysql'):
         self.host = host
         self.user = user
         self.password = password
         self.database = database
-        self.cursor = None
+        self.pool_size = pool_size
+        self.batch_size = batch_size  # Rows per multi-row INSERT packet
+        self.checkout_timeout = checkout_timeout  # Seconds to wait for a free connection
+        self.query_timeout_ms = query_timeout_ms  # Per-query execution limit for SELECTs
+        self.backend_name = backend
+        self.backend = None
+        self.parent = None  # Set on namespace-scoped views, see scoped()
+        self.profiler = None  # Optional QueryProfiler fed by execute() and stream()
+        self.result_cache = None  # Optional ResultCache shared with scoped views
+        self.data_version = None  # Current state of the tables; results are only cached once it is set
+        self.namespace = None
+        # Connection id -> thread using it, so running queries can be killed
+        self.active_connections = {}
+        self._active_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        db = cls(config['host'], config['user'], config['password'], config['database'],
+                 pool_size=config['pool_size'], query_timeout_ms=config['query_timeout_ms'],
+                 backend=config['backend'])
+        if config.get('result_cache_mb'):
+            db.result_cache = ResultCache(config['result_cache_mb'] * 1024 * 1024)
+        return db
+
+    @property
+    def dialect(self):
+        return self.backend.dialect
+
+    @property
+    def errors(self):
+        return self.backend.errors
 
     def connect(self):
-        print("Establishing database connection...")
-        self.connection = mysql.connector.connect(
-            host=self.host,
-            user=self.user,
-            password=self.password,
-            database=self.database
-        )
-        self.cursor = self.connection.cursor()
-        return self.connection
-
-    def execute_query(self, query):
-        try:
-            print(f"Executing query: {query}")
-            self.cursor.execute(query)
-            if query.strip().lower().startswith("select"):
-                result = self.cursor.fetchall()
-                print(f"Query result: {result}")
+        logger.info("Connecting to %s backend (%d connections)", self.backend_name, self.pool_size)
+        self.backend = create_backend(self.backend_name, host=self.host, user=self.user,
+                                      password=self.password, database=self.database,
+                                      pool_size=self.pool_size)
+        self.backend.connect()
+        # Fail early if the database is unreachable
+        with self.session() as (connection, cursor):
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        return self.backend
+
+    def _checkout(self, timeout_ms=None, timed=True):
+        connection = self.backend.checkout(self.checkout_timeout)
+        timeout_ms = timeout_ms if timeout_ms is not None else self.query_timeout_ms
+        if timed and timeout_ms:
+            try:
+                self.backend.set_timeout(connection, timeout_ms)
+            except self.backend.errors:
+                self.backend.release(connection)
+                raise
+        with self._active_lock:
+            self.active_connections[self.backend.connection_id(connection)] = threading.get_ident()
+        return connection
+
+    def _release(self, connection):
+        with self._active_lock:
+            self.active_connections.pop(self.backend.connection_id(connection), None)
+        self.backend.release(connection)
+
+    def kill_query(self, connection_id):
+        logger.info("Killing query on connection %s", connection_id)
+        try:
+            self.backend.cancel(connection_id)
+        except self.backend.errors as e:
+            logger.error("Could not kill query on connection %s: %s", connection_id, e)
+
+    def cancel_thread_queries(self, thread_id):
+        with self._active_lock:
+            victims = [cid for cid, owner in self.active_connections.items() if owner == thread_id]
+        for connection_id in victims:
+            self.kill_query(connection_id)
+        return len(victims)
+
+    @contextmanager
+    def session(self, buffered=True, timed=True):
+        # Hands out a dedicated connection/cursor pair for one request;
+        # timed=False skips the query time limit (used for bulk loads)
+        connection = self._checkout(timed=timed)
+        cursor = self.backend.cursor(connection, buffered=buffered)
+        try:
+            yield connection, cursor
+        finally:
+            cursor.close()
+            self._release(connection)
+
+    def scoped(self, namespace):
+        # A view of this manager whose tables live in a private namespace
+        # (database, schema or in-memory database depending on the backend).
+        # It shares the connection bookkeeping, so cancellation still works.
+        logger.info("Opening namespace %s", namespace)
+        scoped = copy.copy(self)
+        scoped.parent = self
+        scoped.namespace = namespace
+        scoped.backend = self.backend.open_namespace(namespace)
+        return scoped
+
+    def drop_namespace(self):
+        logger.info("Dropping namespace %s", self.namespace)
+        self.parent.backend.drop_namespace(self.backend)
+
+    def shared_table(self, table_name):
+        # Name under which a table of the shared database is reachable here
+        if self.parent is None:
+            return table_name
+        return self.backend.shared_table(table_name)
+
+    def translate_ddl(self, statement):
+        return translate_ddl(statement, self.backend.dialect)
+
+    def _server_stats(self, connection):
+        if self.profiler is None or not self.profiler.detailed:
+            return None, None
+        try:
+            return self.backend.statement_stats(connection)
+        except self.backend.errors as e:
+            logger.debug("Server statistics unavailable: %s", e)
+            return None, None
+
+    def set_data_version(self, label):
+        # Called once the tables hold a known dataset, e.g. a restored snapshot.
+        # The version is unique even for the same label: tables outside the
+        # restored schema may have changed since it was last used.
+        self.data_version = (label, next(DATA_VERSIONS))
+
+    def _tables_written(self):
+        old_version = self.data_version
+        if old_version is None:
+            return
+        self.data_version = (None, next(DATA_VERSIONS))
+        if self.result_cache is not None:
+            self.result_cache.invalidate(old_version)
+
+    def _cache_key(self, statement):
+        # Result cache key for `statement`, or None when its result must not be
+        # cached. Any statement that is not read-only counts as a write.
+        if not statement.is_read_only:
+            self._tables_written()
+            return None
+        if self.result_cache is None or self.data_version is None:
+            return None
+        return (self.data_version, normalize(statement.text, self.dialect))
+
+    def _check(self, query, read_only):
+        # Statement for `query`, or an "Error: ..." string; the backend gets
+        # a second look with the engine's own parser where it has one
+        statement = check_statement(query, read_only, self.dialect)
+        if isinstance(statement, str):
+            return statement
+        return self.backend.check_statement(query, read_only) or statement
+
+    def execute(self, query, read_only=False):
+        # Runs a single statement on its own pooled connection and returns rows
+        # together with the column names from that cursor. With read_only,
+        # statements that could change the database are refused up front.
+        logger.debug("Executing query: %s", query)
+        statement = self._check(query, read_only)
+        if isinstance(statement, str):
+            logger.info("Refused statement: %s", statement)
+            return QueryResult([], None, -1, statement)
+        cache_key = self._cache_key(statement)
+        if cache_key is not None:
+            result = self.result_cache.get(cache_key)
+            if result is not None:
+                logger.debug("Result served from cache")
                 return result
-            else:
-                print("Query executed successfully.")
-        except Error as e:
-            print(f"Error: {str(e)}")
+        started = time.perf_counter()
+        execute_ms = fetch_ms = 0.0
+        rows_returned = None
+        try:
+            with self.session() as (connection, cursor):
+                cursor.execute(query)
+                execute_ms = (time.perf_counter() - started) * 1000
+                if cursor.description is not None:
+                    columns = [description[0] for description in cursor.description]
+                    fetch_started = time.perf_counter()
+                    rows = cursor.fetchall()
+                    fetch_ms = (time.perf_counter() - fetch_started) * 1000
+                    rows_returned = len(rows)
+                    result = QueryResult(columns, rows, cursor.rowcount, None)
+                else:
+                    result = QueryResult([], None, cursor.rowcount, None)
+                logger.debug("Query returned %s rows (rowcount %s)", rows_returned, cursor.rowcount)
+                if self.profiler is not None:
+                    server_ms, rows_examined = self._server_stats(connection)
+                    self.profiler.record(query, self.backend_name, started, execute_ms, fetch_ms,
+                                         rows_returned, server_ms, rows_examined)
+                if cache_key is not None and result.rows is not None:
+                    self.result_cache.put(cache_key, result)
+                return result
+        except self.backend.errors as e:
+            logger.error("Query failed: %s", e)
+            if self.profiler is not None:
+                self.profiler.record(query, self.backend_name, started, execute_ms, fetch_ms, None, error=str(e))
+            return QueryResult([], None, -1, f"Error: {str(e)}")
+
+    def stream(self, query, batch_size=500, max_rows=None, timeout_ms=None, read_only=False):
+        # Caller owns the returned QueryStream and must exhaust or close it
+        logger.debug("Streaming query: %s", query)
+        statement = self._check(query, read_only)
+        if isinstance(statement, str):
+            logger.info("Refused statement: %s", statement)
+            return QueryStream(error=statement, backend=self.backend, query=query)
+        if not statement.is_read_only:
+            # Nothing to page through; run it buffered instead of holding a connection
+            result = self.execute(query)
+            if result.error:
+                return QueryStream(error=result.error, backend=self.backend, query=query)
+            return QueryStream(cursor=ResultCursor(result), batch_size=batch_size, max_rows=max_rows,
+                               backend=self.backend, query=query)
+        cache_key = self._cache_key(statement)
+        if cache_key is not None:
+            result = self.result_cache.get(cache_key)
+            if result is not None:
+                logger.debug("Result served from cache")
+                return QueryStream(cursor=ResultCursor(result), batch_size=batch_size, max_rows=max_rows,
+                                   backend=self.backend, query=query)
+        started = time.perf_counter()
+        connection = None
+        if timeout_ms is None:
+            timeout_ms = self.query_timeout_ms
+        if max_rows is not None and self.backend.timeout_spans_fetch:
+            # A server limit that keeps counting while rows are paged would
+            # cut off a slow reader; capped streams are read page by page from
+            # the editor, whose own timer kills the query instead
+            timeout_ms = 0
+        try:
+            connection = self._checkout(timeout_ms)
+            cursor = self.backend.cursor(connection, buffered=False)
+            cursor.execute(query)
+            execute_ms = (time.perf_counter() - started) * 1000
+            stream = QueryStream(connection, cursor, batch_size, max_rows, backend=self.backend,
+                                 on_release=self._release_stream, on_close=self._close_stream, query=query,
+                                 started=started, execute_ms=execute_ms)
+            stream.armed = stream.armed and bool(timeout_ms)
+            if cache_key is not None and stream.columns:
+                # Kept only if the caller reads every row, see _close_stream()
+                stream.cache_key = cache_key
+                stream.captured = []
+                stream.capture_limit = self.result_cache.max_bytes
+            return stream
+        except self.backend.errors as e:
+            logger.error("Query failed: %s", e)
+            if connection is not None:
+                self._release(connection)
+            if self.profiler is not None:
+                self.profiler.record(query, self.backend_name, started, 0.0, 0.0, None, error=str(e))
+            return QueryStream(error=f"Error: {str(e)}", backend=self.backend, query=query)
+
+    def _release_stream(self, stream):
+        try:
+            stream.server_stats = self._server_stats(stream.connection)
+        finally:
+            self._release(stream.connection)
+
+    def _close_stream(self, stream):
+        if self.profiler is not None:
+            server_ms, rows_examined = stream.server_stats
+            self.profiler.record(stream.query, self.backend_name, stream.started, stream.execute_ms,
+                                 stream.fetch_ms, stream.fetched if stream.columns else None,
+                                 server_ms, rows_examined, stream.error)
+        if stream.captured is not None and stream.complete and not stream.error:
+            self.result_cache.put(stream.cache_key,
+                                  QueryResult(stream.columns, stream.captured, stream.rowcount, None),
+                                  stream.captured_bytes)
+
+    def execute_query(self, query, read_only=False):
+        result = self.execute(query, read_only)
+        if result.error:
+            return result.error
+        return result.rows
+
+    def explain(self, query):
+        # PlanSummary of `query` without running it, or an "Error: ..." string
+        statement = self._check(query, read_only=True)
+        if isinstance(statement, str):
+            return statement
+        result = self.execute(self.backend.explain_sql(statement.text))
+        if result.error:
+            return result.error
+        return self.backend.summarize_plan(result.rows)
+
+    def insert_rows(self, table_name, columns, rows):
+        # Bulk load in one transaction using the backend's fastest path
+        logger.info("Bulk inserting into %s", table_name)
+        self._tables_written()
+        try:
+            with self.session(timed=False) as (connection, cursor):
+                self.backend.begin(connection)
+                try:
+                    inserted = self.backend.insert_rows(cursor, table_name, columns, rows, self.batch_size)
+                    connection.commit()
+                except self.backend.errors:
+                    connection.rollback()
+                    raise
+            logger.info("Inserted %d rows into %s", inserted, table_name)
+            return inserted
+        except self.backend.errors as e:
+            logger.error("Bulk insert into %s failed: %s", table_name, e)
             return f"Error: {str(e)}"
 
     def close(self):
-        print("Closing database connection...")
-        if self.cursor:
-            self.cursor.close()
-        self.connection.close()
\ No newline at end of file
+        logger.info("Closing database connections")
+        if self.parent is not None:
+            self.drop_namespace()
+        elif self.backend:
+            self.backend.close()
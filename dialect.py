@@ -0,0 +1,39 @@
+from catalog import parse_table
+
+# MySQL is the source dialect for ChallengeManager.schemas; the embedded
+# engines get an equivalent rewrite of each CREATE TABLE statement, rendered
+# from its parsed catalog entry.
+
+
+def _column_sql(column, table_name, dialect, statements):
+    if column.auto_increment and column.primary_key:
+        if dialect == 'sqlite':
+            # An INTEGER PRIMARY KEY is SQLite's auto-assigned rowid alias
+            return f"{column.name} INTEGER PRIMARY KEY"
+        sequence = f"{table_name}_{column.name}_seq"
+        statements.append(f"CREATE SEQUENCE IF NOT EXISTS {sequence}")
+        return f"{column.name} INTEGER PRIMARY KEY DEFAULT nextval('{sequence}')"
+    if column.enum_values:
+        values = ', '.join(f"'{value}'" for value in column.enum_values)
+        return f"{column.name} VARCHAR(255) CHECK ({column.name} IN ({values}))"
+    return column.definition
+
+
+def translate_ddl(statement, dialect):
+    # Returns the list of statements that replace `statement` in `dialect`
+    if dialect == 'mysql':
+        return [statement]
+    if dialect not in ('sqlite', 'duckdb'):
+        raise ValueError(f"Unknown SQL dialect: {dialect}")
+    table = parse_table(statement)
+    statements = []
+    columns = [_column_sql(column, table.name, dialect, statements) for column in table.columns]
+    exists = "IF NOT EXISTS " if table.if_not_exists else ""
+    statements.append(f"CREATE TABLE {exists}{table.name} ({', '.join(columns)})")
+    if dialect == 'sqlite':
+        # Index names are database-wide in SQLite, so they carry the table name
+        for index in table.indexes:
+            statements.append(f"CREATE INDEX IF NOT EXISTS {index.name} ON {table.name} ({', '.join(index.columns)})")
+    # DuckDB sorts windows itself and only uses ART indexes for point
+    # lookups, where they would just slow down the bulk loads
+    return statements
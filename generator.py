@@ -0,0 +1,163 @@
+import zlib
+from datetime import date
+import numpy as np
+from faker import Faker
+
+# Column order used when a schema's rows are written to the database
+SCHEMA_COLUMNS = {
+    'product': ['name', 'price', 'category', 'launch_date'],
+    'user': ['username', 'email', 'order_count', 'join_date', 'language'],
+    'customer': ['name', 'address', 'loyalty', 'last_order', 'order_total'],
+    'employee': ['name', 'position', 'salary', 'hire_date'],
+    'sales': ['product_id', 'customer_id', 'employee_id', 'sale_amount', 'sale_date'],
+}
+
+CATEGORIES = ['Electronics', 'Books', 'Clothing', 'Home']
+LANGUAGES = ['English', 'Spanish', 'Chinese', 'Russian', 'French', 'Arabic', 'Dutch', 'Japanese']
+LOYALTY_LEVELS = ['bronze', 'silver', 'gold', 'platinum']
+POSITIONS = ['Manager', 'Sales Associate', 'Clerk', 'Supervisor', 'Yoga Instructor']
+
+# Dates are generated relative to a fixed day so a seed yields the same rows
+# no matter when the data is rebuilt.
+ANCHOR_DATE = date(2024, 1, 1)
+
+
+def relational_row_counts(row_count):
+    # In the relational dataset `row_count` sizes the sales fact table; the
+    # dimension tables scale with it
+    return {
+        'product': max(20, row_count // 100),
+        'customer': max(50, row_count // 20),
+        'employee': max(10, row_count // 500),
+        'sales': row_count,
+    }
+
+
+def schema_seed(seed, schema_name):
+    # Independent, reproducible stream per (seed, schema)
+    return [seed, zlib.crc32(schema_name.encode())]
+
+
+# Faker is only called to build small vocabulary pools once per generator;
+# whole columns are then produced by indexing those pools with NumPy integer
+# arrays, so the cost per row is a handful of vectorized array operations.
+class DataGenerator:
+    POOL_SIZE = 1000
+    CHUNK_ROWS = 100000  # Rows materialized at a time by row_chunks
+    ZIPF_SKEW = 1.1  # Exponent of the foreign-key popularity distribution
+
+    def __init__(self, seed=None, anchor_date=ANCHOR_DATE, dimensions=None):
+        self.seed = seed
+        # Row counts of the referenced tables in relational mode; foreign keys
+        # are then drawn from their id ranges with a Zipf-like skew
+        self.dimensions = dimensions
+        self._key_distributions = {}
+        self.anchor_date = np.datetime64(anchor_date or date.today(), 'D')
+        self.rng = np.random.default_rng(seed)
+        self.faker = Faker()
+        if seed is not None:
+            self.faker.seed_instance(repr(seed))
+        self._pools = {}
+
+    def _pool(self, name):
+        # Pre-sample a vocabulary once, then reuse it for every row
+        if name not in self._pools:
+            factory = getattr(self.faker, name)
+            self._pools[name] = np.array([factory() for _ in range(self.POOL_SIZE)], dtype=object)
+        return self._pools[name]
+
+    def _sample_pool(self, name, n):
+        pool = self._pool(name)
+        return pool[self.rng.integers(0, len(pool), n)]
+
+    def _choice(self, values, n):
+        return np.array(values, dtype=object)[self.rng.integers(0, len(values), n)]
+
+    def _money(self, low, high, n):
+        return np.round(self.rng.uniform(low, high, n), 2)
+
+    def _foreign_keys(self, table_name, n):
+        # Ids 1..k where a few rows are referenced far more often than the
+        # rest; which ids are popular is itself drawn from the seed
+        k = self.dimensions[table_name]
+        if table_name not in self._key_distributions:
+            weights = 1.0 / np.arange(1, k + 1) ** self.ZIPF_SKEW
+            self._key_distributions[table_name] = (weights / weights.sum(), self.rng.permutation(k) + 1)
+        probabilities, ids = self._key_distributions[table_name]
+        return ids[self.rng.choice(k, n, p=probabilities)]
+
+    def _dates(self, years, n):
+        # Uniform dates between `years` years ago and the anchor date
+        offsets = self.rng.integers(0, years * 365 + 1, n)
+        return self.anchor_date - offsets.astype('timedelta64[D]')
+
+    def product_columns(self, n):
+        return {
+            'name': self._sample_pool('catch_phrase', n),
+            'price': self._money(10, 500, n),
+            'category': self._choice(CATEGORIES, n),
+            'launch_date': self._dates(12, n),
+        }
+
+    def user_columns(self, n):
+        return {
+            'username': self._sample_pool('user_name', n),
+            'email': self._sample_pool('email', n),
+            'order_count': self.rng.integers(1, 1001, n),
+            'join_date': self._dates(10, n),
+            'language': self._choice(LANGUAGES, n),
+        }
+
+    def customer_columns(self, n):
+        return {
+            'name': self._sample_pool('name', n),
+            'address': self._sample_pool('address', n),
+            'loyalty': self._choice(LOYALTY_LEVELS, n),
+            'last_order': self._dates(3, n),
+            'order_total': self._money(20, 25000, n),
+        }
+
+    def employee_columns(self, n):
+        return {
+            'name': self._sample_pool('name', n),
+            'position': self._choice(POSITIONS, n),
+            'salary': self._money(30000, 80000, n),
+            'hire_date': self._dates(5, n),
+        }
+
+    def sales_columns(self, n):
+        if self.dimensions:
+            return {
+                'product_id': self._foreign_keys('product', n),
+                'customer_id': self._foreign_keys('customer', n),
+                'employee_id': self._foreign_keys('employee', n),
+                'sale_amount': self._money(20, 1000, n),
+                'sale_date': self._dates(1, n),
+            }
+        columns = {
+            'product_id': self.rng.integers(1, 101, n),
+            'customer_id': self.rng.integers(1, 101, n),
+            'sale_amount': self._money(20, 1000, n),
+            'sale_date': self._dates(1, n),
+        }
+        # Drawn last so the other columns match data seeded before it existed
+        columns['employee_id'] = self.rng.integers(1, 101, n)
+        return columns
+
+    def columns(self, schema_name, n):
+        return getattr(self, f"{schema_name}_columns")(n)
+
+    def rows(self, schema_name, n, first_id=None):
+        # Convert each column to Python values once, then zip into row tuples.
+        # With `first_id` the rows lead with explicit ids first_id, first_id + 1, ...
+        columns = self.columns(schema_name, n)
+        values = [columns[name].tolist() for name in SCHEMA_COLUMNS[schema_name]]
+        if first_id is not None:
+            values.insert(0, range(first_id, first_id + n))
+        return list(zip(*values))
+
+    def row_chunks(self, schema_name, n, with_ids=False):
+        # rows() in CHUNK_ROWS pieces, so any table size fits in bounded memory.
+        # A table of at most CHUNK_ROWS rows is generated exactly as by rows().
+        for start in range(0, n, self.CHUNK_ROWS):
+            yield self.rows(schema_name, min(self.CHUNK_ROWS, n - start), start + 1 if with_ids else None)
@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import util
+from config import ConfigError, configure_logging, load_config
+from database import DatabaseManager
+from challenge import ChallengeManager, ChallengeSpec
+
+# Headless grading: submissions are {"challenge": <template key>, "seed": <int>,
+# "sql": <query>} objects (plus optional "rows" and "id"), or carry the whole
+# challenge as "spec": "<template key>:<seed>:<rows>". They are graded in parallel by a
+# pool of worker processes that each own a private database: an embedded one,
+# or a private namespace when grading against a shared MySQL server.
+
+EMBEDDED_BACKENDS = ('sqlite', 'duckdb')
+
+_worker_challenge = None
+
+
+def _init_worker(config, row_count):
+    global _worker_challenge
+    # Workers report through their return values; logging goes to stderr
+    configure_logging(config)
+    if config['backend'] in EMBEDDED_BACKENDS:
+        config = dict(config, database=f"grader_{os.getpid()}")
+    db = DatabaseManager.from_config(dict(config, pool_size=2))
+    db.connect()
+    if config['backend'] not in EMBEDDED_BACKENDS:
+        db = db.scoped(f"grader_{os.getpid()}")
+    _worker_challenge = ChallengeManager(db, row_count=row_count)
+    # Runs when the pool shuts the worker down, so its namespace does not
+    # outlive it on a shared server
+    util.Finalize(None, _close_worker, args=(db,), exitpriority=10)
+
+
+def _close_worker(db):
+    if db.parent is not None:
+        db.drop_namespace()
+    (db.parent or db).close()
+
+
+def submission_spec(submission, default_rows):
+    if 'spec' in submission:
+        return ChallengeSpec.parse(submission['spec'])
+    return ChallengeSpec(submission['challenge'], int(submission['seed']),
+                         int(submission.get('rows', default_rows)))
+
+
+def submission_error(submission):
+    # Why `submission` cannot be graded at all, or None. Checked before a
+    # batch is sorted and sent to the workers, so one malformed item only
+    # fails itself.
+    if not isinstance(submission, dict):
+        return "expected a JSON object"
+    if not isinstance(submission.get('sql'), str):
+        return "missing \"sql\" string"
+    try:
+        submission_spec(submission, 0)
+    except KeyError as e:
+        return f"missing {e}"
+    except (TypeError, ValueError) as e:
+        return str(e)
+    return None
+
+
+def rejected_submission(submission, reason):
+    fields = submission if isinstance(submission, dict) else {}
+    return {'id': fields.get('id'), 'challenge': fields.get('challenge', fields.get('spec')),
+            'seed': fields.get('seed'), 'correct': False, 'message': f"Invalid submission: {reason}",
+            'rows': 0, 'elapsed_ms': 0.0}
+
+
+def grade_submission(submission):
+    started = time.perf_counter()
+    result = {'id': submission.get('id'), 'challenge': submission.get('challenge', submission.get('spec')),
+              'seed': submission.get('seed')}
+    try:
+        # Learner SQL runs read-only, so the tables still hold the rows of
+        # the last spec loaded; the batch is sorted so that a restore is
+        # only needed when the spec changes
+        spec = submission_spec(submission, _worker_challenge.row_count)
+        if _worker_challenge.current_spec != spec:
+            _worker_challenge.rebuild(spec)
+        comparison = _worker_challenge.validate_answer(submission['sql'])
+        result.update(correct=comparison.matched, message=comparison.message, rows=comparison.rows_compared)
+        if comparison.actual_row is not None:
+            # The learner's offending row, JSON-safe; the expected row stays hidden
+            result.update(mismatch_index=comparison.mismatch_index,
+                          actual_row=list(_worker_challenge.comparator.normalize_row(comparison.actual_row)))
+    except (KeyError, TypeError, ValueError) as e:
+        result.update(correct=False, message=f"Invalid submission: {str(e)}", rows=0)
+    except RuntimeError as e:
+        result.update(correct=False, message=f"Could not load the challenge: {str(e)}", rows=0)
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+class BatchGrader:
+    def __init__(self, config, workers=None, row_count=100):
+        self.executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                            initializer=_init_worker, initargs=(config, row_count))
+
+    def grade(self, submissions, chunksize=16):
+        results = [None] * len(submissions)
+        valid = []
+        for index, submission in enumerate(submissions):
+            reason = submission_error(submission)
+            if reason is None:
+                valid.append((index, submission))
+            else:
+                results[index] = rejected_submission(submission, reason)
+        # Grouping by challenge and seed lets each worker reuse its snapshots
+        ordered = sorted(valid, key=lambda item: (str(item[1].get('challenge', item[1].get('spec'))),
+                                                  str(item[1].get('seed'))))
+        graded = self.executor.map(grade_submission, [submission for _, submission in ordered],
+                                   chunksize=chunksize)
+        for (index, _), result in zip(ordered, graded):
+            results[index] = result
+        return results
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class GradingRequestHandler(BaseHTTPRequestHandler):
+    grader = None
+
+    def do_POST(self):
+        if self.path != '/grade':
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length <= 0:
+                raise ValueError("Expected a JSON list of submissions")
+            submissions = json.loads(self.rfile.read(length))
+            if not isinstance(submissions, list):
+                raise ValueError("Expected a JSON list of submissions")
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        body = json.dumps(self.grader.grade(submissions)).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def read_submissions(path):
+    stream = sys.stdin if path == '-' else open(path)
+    with stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade SQL challenge submissions without the GUI.")
+    parser.add_argument('--backend', default='sqlite', choices=EMBEDDED_BACKENDS + ('mysql',))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rows', type=int, default=100, help="rows seeded per table")
+    commands = parser.add_subparsers(dest='command', required=True)
+    grade = commands.add_parser('grade', help="grade a JSON-lines file of submissions")
+    grade.add_argument('submissions', help="JSON-lines file, or - for stdin")
+    serve = commands.add_parser('serve', help="serve POST /grade over HTTP")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(backend=args.backend)
+    except ConfigError as e:
+        parser.error(str(e))
+    configure_logging(config)
+    grader = BatchGrader(config, workers=args.workers, row_count=args.rows)
+    try:
+        if args.command == 'grade':
+            for result in grader.grade(read_submissions(args.submissions)):
+                print(json.dumps(result))
+        else:
+            GradingRequestHandler.grader = grader
+            server = ThreadingHTTPServer((args.host, args.port), GradingRequestHandler)
+            print(f"Grading service listening on http://{args.host}:{args.port}/grade", file=sys.stderr)
+            server.serve_forever()
+    finally:
+        grader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,51 +1,278 @@
+import logging
 import sys
+import uuid
 from ui import SQLAppUI
+from config import ConfigError, configure_logging, load_config
 from database import DatabaseManager
-from challenge import ChallengeManager
-from PyQt6.QtWidgets import QApplication, QTableWidgetItem
+from profiler import QueryProfiler
+from sessions import SessionManager
+from prefetch import ChallengePrefetcher
+from results_model import QueryResultModel
+from workers import DatabaseWorker, ProfileSignals
+from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox
+from PyQt6.QtCore import QThreadPool, QTimer
+
+logger = logging.getLogger(__name__)
 
 
 class SQLApp:
+    PAGE_SIZE = 200  # Rows fetched per scroll page
+    MAX_RESULT_ROWS = 100000  # Hard cap on rows pulled for one Run
+    TIMEOUT_GRACE_MS = 2000  # Extra wait before the client cancels on its own
+    IDLE_SWEEP_MS = 5 * 60 * 1000  # How often namespaces of abandoned sessions are dropped
+
     def __init__(self):
         self.app = QApplication(sys.argv)
         self.ui = SQLAppUI()
-        self.db = DatabaseManager('localhost', 'root', 'RowanDaniel1011!', 'challenger')
+        try:
+            self.config = load_config()
+        except ConfigError as e:
+            QMessageBox.critical(None, 'SQL Challenge App', str(e))
+            sys.exit(1)
+        configure_logging(self.config)
+        self.shared_db = DatabaseManager.from_config(self.config)
+        # Set before scoping so the session's view of the database shares it
+        self.profiler = QueryProfiler(max_entries=self.ui.PROFILE_ROWS,
+                                      detailed=bool(self.config['profile_detailed']),
+                                      export_path=self.config['profile_log'] or None)
+        self.shared_db.profiler = self.profiler
+        self.profile_signals = ProfileSignals()
+        self.profile_signals.recorded.connect(self.ui.addProfileEntry)
+        self.profiler.add_listener(self.profile_signals.recorded.emit)
         self.ui.runButtonClicked.connect(self.execute_query)
         self.ui.submitButtonClicked.connect(self.submit_answer)
-        self.db.connect()
-        self.challenge = ChallengeManager(self.db)
+        self.ui.cancelButtonClicked.connect(self.cancel_query)
+        self.ui.exportProfileClicked.connect(self.export_profile)
+        self.ui.clearProfileClicked.connect(self.profiler.clear)
+        self.ui.createIndexesClicked.connect(self.create_indexes)
+        self.ui.nextChallengeClicked.connect(self.next_challenge)
+        self.index_suggestions = []
+        self.result_stream = None
+        self.worker = None
+        self.loader = None
+        self.thread_pool = QThreadPool.globalInstance()
+        self.timeout_timer = QTimer()
+        self.timeout_timer.setSingleShot(True)
+        self.timeout_timer.timeout.connect(self.on_query_timeout)
+        # Each challenge's tables live in their own namespace on the shared
+        # server, prepared ahead of time by the prefetcher
+        self.sessions = SessionManager(self.shared_db)
+        self.prefetcher = ChallengePrefetcher(self.sessions, depth=self.config['prefetch_depth'],
+                                              prefix=uuid.uuid4().hex[:12])
+        self.session = None
+        self.db = None
+        self.challenge = None
+        self.connected = False
+        self.collector = None
+        self.idle_timer = QTimer()
+        self.idle_timer.timeout.connect(self.collect_idle_sessions)
+        self.idle_timer.start(self.IDLE_SWEEP_MS)
         self.ui.parent = self
 
     def execute_query(self):
         query = self.ui.codeEditor.toPlainText()
-        print(f"Executing query: {query}")  # Debugging print
-        result = self.db.execute_query(query)
-        print(f"Query result: {result}")  # Debugging print
-        self.ui.queryResultsTable.setRowCount(0)
-        self.ui.queryResultsTable.setColumnCount(0)
-        if result and isinstance(result, list):
-            headers = [description[0] for description in self.db.cursor.description]
-            self.ui.queryResultsTable.setColumnCount(len(headers))
-            self.ui.queryResultsTable.setHorizontalHeaderLabels(headers)
-            for row_data in result:
-                row = self.ui.queryResultsTable.rowCount()
-                self.ui.queryResultsTable.insertRow(row)
-                for column, data in enumerate(row_data):
-                    item = QTableWidgetItem(str(data))
-                    self.ui.queryResultsTable.setItem(row, column, item)
-        self.ui.queryResultsTable.resizeColumnsToContents()
+        logger.debug("Running query from editor: %s", query)
+
+        def task(worker):
+            worker.report("Running query...")
+            # Challenge mode: the tables are shared with the checker, so only reads run
+            stream = self.db.stream(query, batch_size=self.PAGE_SIZE, max_rows=self.MAX_RESULT_ROWS,
+                                    read_only=True)
+            worker.report("Fetching first rows...")
+            first_rows = stream.fetch_next()
+            return stream, first_rows
+
+        self.start_worker(task, self.on_query_finished)
+
+    def on_query_finished(self, result):
+        self.result_stream, first_rows = result
+        if self.result_stream.error:
+            self.ui.setResultModel(None)
+            self.ui.queryResults.setText(self.result_stream.error)
+            return
+        model = QueryResultModel(self.result_stream, first_rows)
+        model.rowsFetched.connect(self.update_result_status)
+        self.ui.setResultModel(model)
+        self.update_result_status()
+
+    def update_result_status(self, *_):
+        stream = self.result_stream
+        if stream.error:
+            message = stream.error
+        elif stream.truncated:
+            message = f"Showing first {stream.fetched} rows (row limit reached)."
+        elif not stream.exhausted:
+            message = f"Showing {stream.fetched} rows, scroll for more..."
+        elif stream.columns:
+            message = f"{stream.fetched} rows."
+        else:
+            message = f"Query executed successfully ({stream.rowcount} rows affected)."
+        self.ui.queryResults.setText(message)
 
     def submit_answer(self):
         user_query = self.ui.codeEditor.toPlainText()
-        is_correct = self.challenge.validate_answer(user_query)
-        message = "Correct!" if is_correct else "Incorrect. Try again."
-        self.ui.queryResults.setText(message)
 
-    def run(self):
-        challenge_question, _ = self.challenge.load_challenge()  # Load challenge and get the question
+        def task(worker):
+            worker.report("Checking your answer...")
+            comparison = self.challenge.validate_answer(user_query)
+            worker.report("Reading the query plan...")
+            return comparison, self.challenge.review_plan(user_query)
+
+        self.start_worker(task, self.on_answer_checked)
+
+    def on_answer_checked(self, result):
+        comparison, advice = result
+        # Only describe the learner's side; the expected row would give the answer away
+        message = "Correct!" if comparison else f"Incorrect. Try again. {comparison.message}"
+        if not comparison and comparison.actual_row is not None:
+            row = ', '.join('NULL' if value is None else str(value)
+                            for value in self.challenge.comparator.normalize_row(comparison.actual_row))
+            if comparison.mismatch_index is not None:
+                message += f"\nRow {comparison.mismatch_index + 1} of your result: ({row})"
+            else:
+                message += f"\nUnexpected row in your result: ({row})"
+        self.ui.queryResults.setText(f"{message}\n\n{advice.message}")
+        self.index_suggestions = advice.suggestions
+        self.ui.indexButton.setEnabled(bool(self.index_suggestions))
+
+    def create_indexes(self):
+        suggestions, self.index_suggestions = self.index_suggestions, []
+        self.ui.indexButton.setEnabled(False)
+
+        def task(worker):
+            errors = []
+            for suggestion in suggestions:
+                worker.report(f"Creating index {suggestion.name}...")
+                error = self.challenge.advisor.create(suggestion)
+                if error:
+                    errors.append(f"{suggestion.name}: {error}")
+            return errors
+
+        def on_created(errors):
+            if errors:
+                self.ui.queryResults.setText("\n".join(errors))
+            else:
+                self.ui.queryResults.setText(f"Created {len(suggestions)} index(es). Submit again to compare plans.")
+
+        self.start_worker(task, on_created)
+
+    def start_worker(self, task, on_finished):
+        # Only one query runs at a time; the buttons are disabled meanwhile
+        worker = DatabaseWorker(self.db, task)
+        worker.signals.progress.connect(self.ui.queryResults.setText)
+        worker.signals.finished.connect(on_finished)
+        worker.signals.failed.connect(self.ui.queryResults.setText)
+        worker.signals.finished.connect(self.on_worker_done)
+        worker.signals.failed.connect(self.on_worker_done)
+        self.worker = worker
+        self.ui.setBusy(True)
+        # Client-side limit for when the server-side one does not apply, as
+        # for paged results on MySQL (see DatabaseManager.stream())
+        if self.db.query_timeout_ms:
+            self.timeout_timer.start(self.db.query_timeout_ms + self.TIMEOUT_GRACE_MS)
+        self.thread_pool.start(worker)
+
+    def on_worker_done(self, *_):
+        self.timeout_timer.stop()
+        self.worker = None
+        self.ui.setBusy(False)
+
+    def cancel_query(self):
+        if self.worker is None:
+            return
+        killed = self.worker.cancel()
+        logger.info("Cancelled %d running queries", killed)
+        self.ui.queryResults.setText("Cancelling...")
+
+    def on_query_timeout(self):
+        if self.worker is not None:
+            self.cancel_query()
+            self.ui.queryResults.setText("Query timed out and was cancelled.")
+
+    def export_profile(self):
+        path, _ = QFileDialog.getSaveFileName(self.ui, "Export Query Profile", "query_profile.jsonl",
+                                              "JSON Lines (*.jsonl)")
+        if not path:
+            return
+        try:
+            count = self.profiler.export_jsonl(path)
+        except OSError as e:
+            self.ui.queryResults.setText(f"Export failed: {str(e)}")
+            return
+        self.ui.queryResults.setText(f"Exported {count} query profiles to {path}")
+
+    def next_challenge(self):
+        previous = self.session
+        self.session = None
+        self.ui.setResultModel(None)
+        self.ui.setLoading(True)
+        self.ui.infoPanel.setText("Preparing challenge...")
+
+        def task(worker):
+            # The first call also connects, after the window has painted
+            if not self.connected:
+                self.shared_db.connect()
+                self.connected = True
+                self.prefetcher.start()
+            if previous is not None:
+                self.sessions.drop(previous.session_id)
+            return self.prefetcher.next()
+
+        self.loader = DatabaseWorker(self.shared_db, task)
+        self.loader.signals.finished.connect(self.on_challenge_ready)
+        self.loader.signals.failed.connect(self.on_challenge_failed)
+        self.thread_pool.start(self.loader)
+
+    def on_challenge_ready(self, session):
+        self.loader = None
+        self.session = session
+        self.db = session.db
+        self.challenge = session.challenge
+        self.index_suggestions = []
+        challenge_question, _ = self.challenge.current_challenge
         schema_ascii_art = self.challenge.get_ascii_representation(self.challenge.current_schema)
         self.ui.infoPanel.setText('Challenge Question\n\n' + challenge_question + '\n\n' + schema_ascii_art)
+        self.ui.queryResults.setText("")
+        self.ui.setLoading(False)
+
+    def on_challenge_failed(self, message):
+        self.loader = None
+        self.ui.infoPanel.setText(message)
+        self.ui.setLoading(True)
+        self.ui.nextButton.setEnabled(True)  # Let the learner retry
+
+    def collect_idle_sessions(self):
+        # Sessions left behind by failed loads or prefetches; the one on
+        # screen and the prepared ones are kept however long they sat idle
+        if not self.connected or self.collector is not None:
+            return
+        keep = set(self.prefetcher.pending_ids())
+        if self.session is not None:
+            keep.add(self.session.session_id)
+
+        def task(worker):
+            return self.sessions.collect_idle(keep=keep)
+
+        def on_done(*_):
+            self.collector = None
+
+        self.collector = DatabaseWorker(self.shared_db, task)
+        self.collector.signals.finished.connect(on_done)
+        self.collector.signals.failed.connect(on_done)
+        self.thread_pool.start(self.collector)
+
+    def shutdown(self):
+        self.idle_timer.stop()
+        self.prefetcher.close()
+        self.sessions.close()
+        self.shared_db.close()
+
+    def run(self):
+        # Paint the window before touching the database; the connection and
+        # the first challenge are set up in the background
         self.ui.show()
+        self.app.processEvents()
+        self.next_challenge()
         sys.exit(self.app.exec())
 
 
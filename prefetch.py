@@ -0,0 +1,106 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ChallengePrefetcher:
+    # Keeps up to `depth` challenges ready on a background thread. Each one
+    # gets its own session namespace, seeded (from a snapshot when one
+    # exists) with its reference answer already cached, so switching to it
+    # costs nothing. The thread draws connections from the same pool as the
+    # learner's queries.
+    def __init__(self, session_manager, depth=2, prefix='next'):
+        self.session_manager = session_manager
+        self.depth = depth
+        self.prefix = prefix
+        self.ready = queue.Queue(maxsize=depth)
+        self._counter = itertools.count(1)
+        self._stopped = threading.Event()
+        self._thread = None
+        self._preparing = None  # Session id prepare() is loading
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='challenge-prefetch', daemon=True)
+            self._thread.start()
+        return self
+
+    def prepare(self):
+        # Returns a LearnerSession whose challenge is loaded and answered
+        session = self.session_manager.get(f"{self.prefix}_{next(self._counter)}")
+        self._preparing = session.session_id
+        try:
+            session.challenge.load_challenge()
+            session.challenge.reference_fingerprint()
+            session.challenge.table_stats()  # Row counts for the info panel
+        except Exception:
+            self.session_manager.drop(session.session_id)
+            raise
+        finally:
+            self._preparing = None
+        return session
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                item = self.prepare()
+            except Exception as e:
+                logger.exception("Could not prepare a challenge")
+                item = e
+            while not self._stopped.is_set():
+                try:
+                    self.ready.put(item, timeout=0.2)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                self._discard(item)
+            if isinstance(item, Exception):
+                # Back off instead of spinning on a database that is down
+                self._stopped.wait(5)
+
+    def next(self, timeout=None):
+        # Blocks until a prepared session is available. The caller owns it and
+        # drops it through the session manager when done.
+        waited = 0.0
+        while True:
+            if self._stopped.is_set():
+                raise RuntimeError("Challenge prefetching has stopped")
+            try:
+                item = self.ready.get(timeout=0.2)
+                break
+            except queue.Empty:
+                waited += 0.2
+                if timeout is not None and waited >= timeout:
+                    raise
+        if isinstance(item, Exception):
+            raise RuntimeError(f"Could not prepare a challenge: {item}") from item
+        # It may have waited in the queue longer than the idle timeout
+        item.last_access = time.monotonic()
+        return item
+
+    def pending_ids(self):
+        # Sessions being prepared or not yet handed out; idle collection skips them
+        with self.ready.mutex:
+            pending = [item.session_id for item in self.ready.queue if not isinstance(item, Exception)]
+        preparing = self._preparing
+        return pending + [preparing] if preparing is not None else pending
+
+    def _discard(self, item):
+        if not isinstance(item, Exception):
+            self.session_manager.drop(item.session_id)
+
+    def close(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        while True:
+            try:
+                self._discard(self.ready.get_nowait())
+            except queue.Empty:
+                break
@@ -0,0 +1,64 @@
+import json
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+QueryProfile = namedtuple('QueryProfile', ['timestamp', 'query', 'backend', 'wall_ms', 'execute_ms', 'fetch_ms',
+                                           'server_ms', 'rows_returned', 'rows_examined', 'error'])
+
+
+class QueryProfiler:
+    # Collects one QueryProfile per statement run through DatabaseManager.
+    # `detailed` additionally asks the server for its own timing and rows
+    # examined, which costs one extra round trip per query.
+    def __init__(self, max_entries=500, detailed=False, export_path=None):
+        self.entries = deque(maxlen=max_entries)
+        self.detailed = detailed
+        self.export_path = export_path  # Append every profile here as a JSON line
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def record(self, query, backend, started, execute_ms, fetch_ms, rows_returned,
+               server_ms=None, rows_examined=None, error=None):
+        profile = QueryProfile(
+            timestamp=time.time(),
+            query=query,
+            backend=backend,
+            wall_ms=round((time.perf_counter() - started) * 1000, 3),
+            execute_ms=round(execute_ms, 3),
+            fetch_ms=round(fetch_ms, 3),
+            server_ms=None if server_ms is None else round(server_ms, 3),
+            rows_returned=rows_returned,
+            rows_examined=rows_examined,
+            error=error,
+        )
+        with self._lock:
+            self.entries.append(profile)
+            if self.export_path:
+                self._append_jsonl(self.export_path, [profile])
+        logger.debug("Profiled query in %.1f ms (%s rows): %s", profile.wall_ms, rows_returned, query)
+        for listener in list(self.listeners):
+            listener(profile)
+        return profile
+
+    def add_listener(self, listener):
+        # Listeners run on the thread that executed the query
+        self.listeners.append(listener)
+
+    def export_jsonl(self, path):
+        with self._lock:
+            entries = list(self.entries)
+        self._append_jsonl(path, entries, mode='w')
+        return len(entries)
+
+    def _append_jsonl(self, path, profiles, mode='a'):
+        with open(path, mode) as f:
+            for profile in profiles:
+                f.write(json.dumps(profile._asdict()) + "\n")
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
@@ -0,0 +1,47 @@
+import logging
+import os
+import pickle
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceCache:
+    # Fingerprints of reference query results keyed by ((template key,
+    # comparison mode), snapshot key). They only change when a schema is
+    # reseeded, so refill_tables invalidates them.
+    def __init__(self, path=None):
+        self.path = path  # Optional pickle file kept next to the seeded data
+        self.entries = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def get(self, template_key, snapshot_key):
+        return self.entries.get((template_key, snapshot_key))
+
+    def put(self, template_key, snapshot_key, result):
+        self.entries[(template_key, snapshot_key)] = result
+        if self.path:
+            self.save()
+
+    def invalidate(self, schema_name=None):
+        # Snapshot keys start with the schema name
+        if schema_name is None:
+            self.entries.clear()
+        else:
+            self.entries = {key: value for key, value in self.entries.items() if key[1][0] != schema_name}
+        if self.path:
+            self.save()
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                self.entries = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning("Ignoring unreadable reference cache %s: %s", self.path, e)
+            self.entries = {}
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,66 @@
+import logging
+import sys
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(rows):
+    # Approximate memory held by a list of row tuples, in bytes
+    return sys.getsizeof(rows) + sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+                                     for row in rows)
+
+
+class ResultCache:
+    # Results of read-only statements keyed by (data version, normalized SQL),
+    # evicted least recently used first once they exceed `max_bytes`. A data
+    # version names one state of a session's tables; DatabaseManager replaces
+    # it on every write, so stale entries are never looked up again.
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (result, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result, size=None):
+        if size is None:
+            size = estimate_size(result.rows or [])
+        if size > self.max_bytes:
+            logger.debug("Not caching a %d byte result", size)
+            return False
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self.entries[key] = (result, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+        return True
+
+    def invalidate(self, data_version=None):
+        # Keys start with the data version
+        with self._lock:
+            if data_version is None:
+                self.entries.clear()
+                self.size = 0
+                return
+            for key in [key for key in self.entries if key[0] == data_version]:
+                self.size -= self.entries.pop(key)[1]
+
+    def clear(self):
+        self.invalidate()
@@ -0,0 +1,120 @@
+from array import array
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+
+class ResultBuffer:
+    # Column-oriented storage for a result set. Integer and float columns are
+    # packed into typed arrays; anything else stays a plain list.
+    def __init__(self, column_names):
+        self.column_names = list(column_names)
+        self.columns = [None] * len(self.column_names)
+        self.row_count = 0
+
+    def append(self, rows):
+        if not rows:
+            return
+        for index, values in enumerate(zip(*rows)):
+            column = self.columns[index]
+            if column is None:
+                self.columns[index] = self._new_column(values)
+                continue
+            try:
+                column.extend(values)
+            except (TypeError, OverflowError):
+                # A typed column met a value it cannot hold; widen to a list
+                column = list(column)
+                column.extend(values)
+                self.columns[index] = column
+        self.row_count += len(rows)
+
+    def _new_column(self, values):
+        try:
+            if all(type(value) is int for value in values):
+                return array('q', values)
+            if all(type(value) is float for value in values):
+                return array('d', values)
+        except OverflowError:
+            pass
+        return list(values)
+
+    def value(self, row, column):
+        return self.columns[column][row]
+
+    def sample(self, column, limit=50):
+        values = self.columns[column]
+        if values is None:
+            return []
+        return values[:limit]
+
+
+def format_value(value):
+    if value is None:
+        return "NULL"
+    return str(value)
+
+
+class QueryResultModel(QAbstractTableModel):
+    # Read-only table model over a QueryStream. Cells are formatted only when
+    # the view asks for them, and further pages are pulled through Qt's
+    # canFetchMore/fetchMore protocol as the view scrolls.
+    rowsFetched = pyqtSignal(int)
+
+    def __init__(self, stream, first_rows=None, parent=None):
+        super().__init__(parent)
+        self.stream = stream
+        self.buffer = ResultBuffer(stream.columns)
+        self._append(first_rows if first_rows is not None else stream.fetch_next())
+
+    def _append(self, rows):
+        self.buffer.append(rows)
+        self.rowsFetched.emit(self.buffer.row_count)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.buffer.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.buffer.column_names)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return format_value(self.buffer.value(index.row(), index.column()))
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.buffer.column_names[section]
+        return str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.stream.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        rows = self.stream.fetch_next()
+        if not rows:
+            self.rowsFetched.emit(self.buffer.row_count)
+            return
+        first = self.buffer.row_count
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.buffer.append(rows)
+        self.endInsertRows()
+        self.rowsFetched.emit(self.buffer.row_count)
+
+    def estimate_column_widths(self, font_metrics, sample_size=50, padding=24, max_width=320):
+        # Size columns from a small sample instead of measuring every cell
+        widths = []
+        for column, name in enumerate(self.buffer.column_names):
+            texts = [name] + [format_value(value) for value in self.buffer.sample(column, sample_size)]
+            widest = max(font_metrics.horizontalAdvance(text) for text in texts)
+            widths.append(min(widest + padding, max_width))
+        return widths
+
+    def close(self):
+        self.stream.close()
@@ -0,0 +1,119 @@
+import argparse
+import logging
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, as_completed, wait
+from config import ConfigError, configure_logging, load_config
+from database import DatabaseManager
+from sessions import SessionManager
+from templates import REGISTRY, TEMPLATES_BY_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+# Runs every challenge template's reference query against a live backend
+# before it can reach a learner. Each schema is seeded once, in its own
+# namespace, then all templates run concurrently on a shared connection pool.
+# A template fails when its query errors, returns no rows or only NULLs, or
+# takes longer than --max-ms. The first failure cancels the queries still
+# waiting unless --keep-going is given. Usage:
+#   python selfcheck.py --backend duckdb [--rows 1000] [--workers 4] [--max-ms 1000]
+
+TemplateCheck = namedtuple('TemplateCheck', ['key', 'schema', 'status', 'elapsed_ms', 'shape', 'message'])
+OK = 'ok'
+FAILED = 'failed'
+SLOW = 'slow'
+SKIPPED = 'skipped'  # Not supported by this backend's dialect
+
+
+def check_template(session, template, max_ms):
+    _, sql = template.render()
+    started = time.perf_counter()
+    result = session.db.execute(sql)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if result.error:
+        return TemplateCheck(template.key, template.schema, FAILED, elapsed_ms, None, result.error)
+    shape = (len(result.rows), len(result.columns))
+    if not result.rows:
+        return TemplateCheck(template.key, template.schema, FAILED, elapsed_ms, shape, "No rows")
+    if all(value is None for row in result.rows for value in row):
+        return TemplateCheck(template.key, template.schema, FAILED, elapsed_ms, shape, "Only NULLs")
+    if elapsed_ms > max_ms:
+        return TemplateCheck(template.key, template.schema, SLOW, elapsed_ms, shape, f"Over {max_ms:.0f} ms")
+    return TemplateCheck(template.key, template.schema, OK, elapsed_ms, shape, '')
+
+
+def run_checks(sessions, seed, row_count, workers=4, max_ms=1000.0, keep_going=False):
+    # TemplateCheck per template, in registry order; templates cancelled by a
+    # failure are left out
+    dialect = sessions.db_manager.dialect
+    checks = {key: TemplateCheck(key, template.schema, SKIPPED, 0.0, None, f"Not supported on {dialect}")
+              for key, template in REGISTRY.items() if not template.supports(dialect)}
+    schemas = [schema for schema, keys in TEMPLATES_BY_SCHEMA.items() if any(key not in checks for key in keys)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        seeding = {executor.submit(sessions.get(schema).challenge.load_schema, schema, seed, row_count): schema
+                   for schema in schemas}
+        done, _ = wait(seeding, return_when=FIRST_EXCEPTION)
+        for future in done:
+            if future.exception() is not None:
+                raise RuntimeError(f"Could not seed {seeding[future]}: {future.exception()}")
+        futures = [executor.submit(check_template, sessions.get(REGISTRY[key].schema), REGISTRY[key], max_ms)
+                   for key in REGISTRY if key not in checks]
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            check = future.result()
+            checks[check.key] = check
+            if check.status != OK and not keep_going:
+                for pending in futures:
+                    pending.cancel()
+    return [checks[key] for key in REGISTRY if key in checks]
+
+
+def report(checks, out=sys.stdout):
+    for check in checks:
+        shape = f"{check.shape[0]}x{check.shape[1]}" if check.shape else '-'
+        print(f"{check.status.upper():8} {check.key:32} {check.elapsed_ms:9.1f} ms  {shape:>8}  {check.message}",
+              file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run every challenge template against a live backend.")
+    parser.add_argument('--backend', default='sqlite', choices=('sqlite', 'duckdb', 'mysql'))
+    parser.add_argument('--rows', type=int, default=1000, help="rows seeded per table")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--max-ms', type=float, default=1000.0, help="slowest acceptable reference query")
+    parser.add_argument('--keep-going', action='store_true', help="run every template despite failures")
+    args = parser.parse_args(argv)
+
+    # A runaway query is cut off by the server instead of stalling the check
+    try:
+        config = load_config(backend=args.backend, pool_size=args.workers + 1,
+                             query_timeout_ms=int(args.max_ms * 10), result_cache_mb=0)
+    except ConfigError as e:
+        parser.error(str(e))
+    configure_logging(config)
+    if args.backend != 'mysql':
+        config['database'] = 'selfcheck'
+    db = DatabaseManager.from_config(config)
+    db.connect()
+    sessions = SessionManager(db, row_count=args.rows, prefix='check')
+    started = time.perf_counter()
+    try:
+        checks = run_checks(sessions, args.seed, args.rows, args.workers, args.max_ms, args.keep_going)
+    finally:
+        for session in list(sessions.sessions.values()):
+            session.challenge.snapshots.drop_all()
+        sessions.close()
+        db.close()
+    report(checks)
+    failures = [check for check in checks if check.status in (FAILED, SLOW)]
+    ran = sum(1 for check in checks if check.status != SKIPPED)
+    print(f"{ran} templates checked in {time.perf_counter() - started:.1f}s, {len(failures)} failed, "
+          f"{len(REGISTRY) - len(checks)} cancelled", file=sys.stderr)
+    return 1 if failures or len(checks) < len(REGISTRY) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
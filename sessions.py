@@ -0,0 +1,79 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from challenge import ChallengeManager
+from reference_cache import ReferenceCache
+
+logger = logging.getLogger(__name__)
+
+
+class LearnerSession:
+    def __init__(self, session_id, db, challenge):
+        self.session_id = session_id
+        self.db = db  # Namespace-scoped DatabaseManager
+        self.challenge = challenge
+        self.last_access = time.monotonic()
+
+
+class SessionManager:
+    # Gives every learner a private namespace restored from the shared seeded
+    # snapshots, so concurrent sessions never touch each other's tables.
+    # Sessions are kept in LRU order: idle ones are collected after
+    # `idle_timeout` seconds and the least recently used one is dropped when
+    # more than `max_sessions` are open.
+    def __init__(self, db_manager, max_sessions=200, idle_timeout=1800, row_count=100, prefix='s'):
+        self.db_manager = db_manager
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.row_count = row_count
+        self.prefix = prefix
+        self.reference_cache = ReferenceCache()  # Shared: answers depend only on the snapshot
+        self.sessions = OrderedDict()
+        self._lock = threading.RLock()
+
+    def namespace_for(self, session_id):
+        return f"{self.prefix}_{re.sub(r'[^A-Za-z0-9_]', '_', str(session_id))[:48]}"
+
+    def get(self, session_id):
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self._open(session_id)
+                self.sessions[session_id] = session
+                while len(self.sessions) > self.max_sessions:
+                    evicted_id, _ = next(iter(self.sessions.items()))
+                    logger.info("Session budget exceeded, evicting %s", evicted_id)
+                    self.drop(evicted_id)
+            self.sessions.move_to_end(session_id)
+            session.last_access = time.monotonic()
+            return session
+
+    def _open(self, session_id):
+        db = self.db_manager.scoped(self.namespace_for(session_id))
+        challenge = ChallengeManager(db, row_count=self.row_count, reference_cache=self.reference_cache)
+        return LearnerSession(session_id, db, challenge)
+
+    def drop(self, session_id):
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.db.drop_namespace()
+
+    def collect_idle(self, now=None, keep=()):
+        # Drops every session idle for longer than idle_timeout, except those
+        # in `keep` (e.g. the one on screen while its learner is away)
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [sid for sid, session in self.sessions.items()
+                       if now - session.last_access > self.idle_timeout and sid not in keep]
+        for session_id in expired:
+            self.drop(session_id)
+        return len(expired)
+
+    def close(self):
+        with self._lock:
+            session_ids = list(self.sessions)
+        for session_id in session_ids:
+            self.drop(session_id)
@@ -0,0 +1,122 @@
+import logging
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    # Seeded tables are kept server-side as template tables keyed by
+    # (schema, seed, row_count). Restoring is a truncate plus one
+    # INSERT ... SELECT, so it never pays for data generation again.
+    # With a namespace-scoped db_manager the templates live in the shared
+    # database, so every session restores from the same seeded copy. Only
+    # the max_snapshots most recently used are kept; older ones are dropped.
+    PREFIX = '_snap'
+    MAX_SNAPSHOTS = 32
+    _lock = threading.Lock()
+    _registries = weakref.WeakKeyDictionary()  # shared db -> its snapshots, shared by every session
+
+    def __init__(self, db_manager, max_snapshots=None):
+        self.db_manager = db_manager
+        self.shared_db = db_manager.parent or db_manager
+        self.max_snapshots = max_snapshots or self.MAX_SNAPSHOTS
+        with self._lock:
+            # (schema, seed, row_count) -> {table: template table name}, least recently used first
+            self.snapshots = self._registries.setdefault(self.shared_db, OrderedDict())
+
+    def table_name(self, schema_name, seed, row_count, table_name=None):
+        if table_name in (None, schema_name):
+            return f"{self.PREFIX}_{schema_name}_{seed}_{row_count}"
+        return f"{self.PREFIX}_{schema_name}_{table_name}_{seed}_{row_count}"
+
+    def has_snapshot(self, schema_name, seed, row_count, tables=None):
+        key = (schema_name, seed, row_count)
+        with self._lock:
+            if key in self.snapshots:
+                self.snapshots.move_to_end(key)
+                return True
+        snapshot_tables = {table: self.table_name(schema_name, seed, row_count, table)
+                           for table in tables or [schema_name]}
+        for snapshot_table in snapshot_tables.values():
+            result = self.shared_db.execute_query(self.shared_db.backend.table_exists_sql(snapshot_table))
+            if not (isinstance(result, list) and result and result[0][0]):
+                return False
+        self._remember(key, snapshot_tables)
+        return True
+
+    def _remember(self, key, snapshot_tables):
+        with self._lock:
+            self.snapshots[key] = snapshot_tables
+            self.snapshots.move_to_end(key)
+            evicted = []
+            while len(self.snapshots) > self.max_snapshots:
+                evicted.append(self.snapshots.popitem(last=False))
+        for evicted_key, evicted_tables in evicted:
+            logger.info("Evicting snapshot %s", evicted_key)
+            self._drop(evicted_tables)
+
+    def _drop(self, snapshot_tables):
+        for snapshot_table in snapshot_tables.values():
+            self.shared_db.execute_query(f"DROP TABLE IF EXISTS {snapshot_table}")
+
+    def save(self, schema_name, seed, row_count, tables=None):
+        # Each table is copied under a private name and renamed into place,
+        # so other sessions and grader processes never read a half-written
+        # snapshot. When one of them saved the same snapshot first, the
+        # rename fails and our copy is dropped; both hold the same rows.
+        snapshot_tables = {}
+        for table in tables or [schema_name]:
+            snapshot_table = self.table_name(schema_name, seed, row_count, table)
+            logger.info("Saving snapshot %s", snapshot_table)
+            building = f"{snapshot_table}_tmp_{uuid.uuid4().hex[:8]}"
+            for query in self.db_manager.backend.clone_table_sql(self.db_manager.shared_table(building), table):
+                result = self.db_manager.execute_query(query)
+                if isinstance(result, str):
+                    self.shared_db.execute_query(f"DROP TABLE IF EXISTS {building}")
+                    logger.error("Could not save snapshot %s: %s", snapshot_table, result)
+                    return False
+            if isinstance(self.shared_db.execute_query(self.shared_db.backend.rename_table_sql(building,
+                                                                                              snapshot_table)), str):
+                logger.info("Snapshot %s was saved concurrently", snapshot_table)
+                self.shared_db.execute_query(f"DROP TABLE IF EXISTS {building}")
+            snapshot_tables[table] = snapshot_table
+        self._remember((schema_name, seed, row_count), snapshot_tables)
+        return True
+
+    def restore(self, schema_name, seed, row_count, fill, tables=None):
+        # Returns True on a cache hit; on a miss `fill` seeds the live tables
+        # (by default the one named after the schema) and the result is
+        # captured as the template for next time.
+        key = (schema_name, seed, row_count)
+        if self.has_snapshot(schema_name, seed, row_count, tables):
+            if self._copy_back(self.snapshots.get(key, {})):
+                return True
+            # Evicted by another session or process while we were restoring
+            logger.warning("Snapshot %s is gone; seeding it again", key)
+            with self._lock:
+                self.snapshots.pop(key, None)
+        fill()
+        self.save(schema_name, seed, row_count, tables)
+        return False
+
+    def _copy_back(self, snapshot_tables):
+        # False when a snapshot table could not be read
+        if not snapshot_tables:
+            return False
+        for table, snapshot_table in snapshot_tables.items():
+            logger.info("Restoring %s from snapshot %s", table, snapshot_table)
+            self.db_manager.execute_query(self.db_manager.backend.truncate_sql(table))
+            source = self.db_manager.shared_table(snapshot_table)
+            if isinstance(self.db_manager.execute_query(f"INSERT INTO {table} SELECT * FROM {source}"), str):
+                return False
+        return True
+
+    def drop_all(self):
+        with self._lock:
+            snapshots = list(self.snapshots.values())
+            self.snapshots.clear()
+        for snapshot_tables in snapshots:
+            self._drop(snapshot_tables)
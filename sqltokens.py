@@ -0,0 +1,158 @@
+import functools
+import re
+from collections import namedtuple
+
+# A small SQL lexer, enough to canonicalize and classify learner queries
+# without a round-trip. Quoting and comments follow each engine's own rules:
+# a lexer that disagreed with the engine about where a string or comment
+# ends would let a second statement hide inside what it took for a literal.
+
+Token = namedtuple('Token', ['kind', 'text', 'position'])  # position: offset in the source
+
+KEYWORD = 'keyword'
+IDENTIFIER = 'identifier'
+QUOTED = 'quoted'  # Quoted identifier: "name", `name` or [name]
+STRING = 'string'
+NUMBER = 'number'
+OPERATOR = 'operator'
+PUNCTUATION = 'punctuation'
+OTHER = 'other'
+
+# String literals, quoted identifiers and line comments of each dialect.
+# Only MySQL strings take backslash escapes (DuckDB's do with an E prefix),
+# MySQL double quotes delimit strings, and its -- needs a following space.
+DIALECT_RULES = {
+    'mysql': {
+        'string': r"""'(?:[^'\\]|\\.|'')*'?|"(?:[^"\\]|\\.|"")*"?""",
+        'quoted': r"`(?:[^`]|``)*`?",
+        'line_comment': r"--(?:\s[^\n]*|$)|\#[^\n]*",
+    },
+    'sqlite': {
+        'string': r"'(?:[^']|'')*'?",
+        'quoted': r'"(?:[^"]|"")*"?|`(?:[^`]|``)*`?|\[[^\]]*\]?',
+        'line_comment': r"--[^\n]*",
+    },
+    'duckdb': {
+        'string': (r"[eE]'(?:[^'\\]|\\.|'')*'?|'(?:[^']|'')*'?"
+                   r"|\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?(?:\$(?P=tag)\$|\Z)"),
+        'quoted': r'"(?:[^"]|"")*"?',
+        'line_comment': r"--[^\n]*",
+    },
+}
+NESTED_COMMENTS = frozenset(['duckdb'])  # /* a /* b */ c */ is one comment
+# MySQL runs the contents of /*! ... */ and /*!50700 ... */
+EXECUTABLE_COMMENTS = frozenset(['mysql'])
+
+
+def _token_pattern(dialect):
+    # Block comments are matched by their opening only; tokenize() finds
+    # where they end, since they may nest
+    rules = DIALECT_RULES[dialect]
+    code_open = r"/\*!\d*" if dialect in EXECUTABLE_COMMENTS else r"(?!)"
+    return re.compile(rf"""
+        (?P<space>\s+)
+      | (?P<line_comment>{rules['line_comment']})
+      | (?P<code_open>{code_open})
+      | (?P<comment_open>/\*)
+      | (?P<string>{rules['string']})
+      | (?P<quoted>{rules['quoted']})
+      | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)
+      | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+      | (?P<code_close>\*/)
+      | (?P<operator><=>|<>|!=|<=|>=|\|\||::|:=|[-+*/%=<>!~^&|])
+      | (?P<punctuation>[(),;.])
+      | (?P<other>.)
+    """, re.VERBOSE | re.DOTALL)
+
+
+TOKEN_PATTERNS = {dialect: _token_pattern(dialect) for dialect in DIALECT_RULES}
+
+KEYWORDS = frozenset("""
+    ADD ALL ALTER ANALYZE AND ANY AS ASC ATTACH AVG BEGIN BETWEEN BY CALL CASE CAST CHECK COALESCE COMMIT
+    COPY COUNT CREATE CROSS CUME_DIST CURRENT CURRENT_DATE DATABASE DEFAULT DELETE DENSE_RANK DESC DESCRIBE
+    DETACH DISTINCT DO DROP ELSE END ESCAPE EXCEPT EXCLUDE EXECUTE EXISTS EXPLAIN FALSE FETCH FILTER
+    FIRST FIRST_VALUE FOLLOWING FOR FROM FULL GRANT GROUP GROUPS HANDLER HAVING IF IFNULL IMPORT IN INDEX
+    INNER INSERT INTERSECT INTERVAL INTO IS JOIN KILL LAG LAST LAST_VALUE LATERAL LEAD LEFT LIKE LIMIT
+    LOAD LOCK MAX MERGE MIN NATURAL NOT NTH_VALUE NTILE NULL NULLIF NULLS OFFSET ON OR ORDER OTHERS OUTER
+    OVER PARTITION PERCENTILE_CONT PERCENTILE_DISC PERCENT_RANK PRAGMA PRECEDING PREPARE RANGE RANK
+    RECURSIVE REINDEX RELEASE RENAME REPLACE REVOKE RIGHT ROLLBACK ROUND ROW ROWS ROW_NUMBER SAVEPOINT
+    SELECT SET SHARE SHOW SUM TABLE TEMPORARY THEN TIES TRUE TRUNCATE UNBOUNDED UNION UNIQUE UPDATE USE
+    USING VACUUM VALUES VIEW WHEN WHERE WINDOW WITH WITHIN
+""".split())
+
+
+def _comment_end(sql, start, nested):
+    # Offset just past the block comment opening at `start`; an unterminated
+    # comment runs to the end of the text
+    if not nested:
+        end = sql.find('*/', start + 2)
+        return len(sql) if end < 0 else end + 2
+    depth = 0
+    position = start
+    while position < len(sql):
+        if sql.startswith('/*', position):
+            depth += 1
+            position += 2
+        elif sql.startswith('*/', position):
+            depth -= 1
+            position += 2
+            if depth == 0:
+                return position
+        else:
+            position += 1
+    return len(sql)
+
+
+@functools.lru_cache(maxsize=4096)
+def tokenize(sql, dialect='mysql'):
+    # Tokens of `sql` without whitespace and comments, as a tuple so the
+    # cached value cannot be modified by callers
+    pattern = TOKEN_PATTERNS[dialect]
+    tokens = []
+    in_code = False  # Inside a MySQL /*! ... */
+    position = 0
+    while position < len(sql):
+        match = pattern.match(sql, position)
+        kind = match.lastgroup
+        text = match.group()
+        position = match.end()
+        if kind == 'comment_open':
+            position = _comment_end(sql, match.start(), dialect in NESTED_COMMENTS)
+            continue
+        if kind == 'code_open':
+            in_code = True
+            continue
+        if kind == 'code_close':
+            if in_code:
+                in_code = False
+                continue
+            # Otherwise a multiplication; the / may open a comment
+            tokens.append(Token(OPERATOR, '*', match.start()))
+            position = match.start() + 1
+            continue
+        if kind in ('space', 'line_comment'):
+            continue
+        if kind == 'word':
+            upper = text.upper()
+            if upper in KEYWORDS:
+                tokens.append(Token(KEYWORD, upper, match.start()))
+            else:
+                tokens.append(Token(IDENTIFIER, text, match.start()))
+        else:
+            tokens.append(Token(kind, text, match.start()))
+    return tuple(tokens)
+
+
+def strip_terminators(tokens):
+    end = len(tokens)
+    while end and tokens[end - 1].text == ';':
+        end -= 1
+    return tokens[:end]
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize(sql, dialect='mysql'):
+    # Canonical text of `sql`: one space between tokens, keywords upper-cased,
+    # comments and trailing semicolons dropped. Identifiers and literals keep
+    # their spelling, since table names and strings can be case-sensitive.
+    return ' '.join(token.text for token in strip_terminators(tokenize(sql, dialect)))
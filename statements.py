@@ -0,0 +1,94 @@
+import functools
+from collections import namedtuple
+
+from sqltokens import KEYWORD, tokenize
+
+# Splits SQL text into statements and classifies each one before it is sent
+# anywhere, so learner input that would change the tables can be refused
+# without a round-trip and the engine knows which statements return rows.
+
+READ = 'read'  # SELECT, WITH ... SELECT, (SELECT ...) UNION ..., SHOW, EXPLAIN, ...
+DML = 'dml'  # Changes rows
+DDL = 'ddl'  # Changes tables, indexes, databases or privileges
+OTHER = 'other'  # Session and transaction control, PRAGMA, CALL, ...
+
+READ_KEYWORDS = frozenset(['SELECT', 'VALUES', 'TABLE', 'SHOW', 'DESCRIBE', 'DESC', 'EXPLAIN'])
+DML_KEYWORDS = frozenset(['INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'MERGE', 'COPY', 'LOAD', 'IMPORT'])
+DDL_KEYWORDS = frozenset(['CREATE', 'DROP', 'ALTER', 'RENAME', 'TRUNCATE', 'GRANT', 'REVOKE', 'ATTACH', 'DETACH',
+                          'VACUUM', 'REINDEX', 'ANALYZE'])
+# Keywords that may start the statement a WITH clause belongs to
+CTE_BODY_KEYWORDS = frozenset(['SELECT', 'VALUES', 'TABLE']) | DML_KEYWORDS
+
+
+class Statement(namedtuple('Statement', ['text', 'kind', 'keyword'])):
+    # keyword: the verb that decided the kind, e.g. SELECT for WITH ... SELECT
+
+    @property
+    def is_read_only(self):
+        return self.kind == READ
+
+
+def _top_level(tokens):
+    # Tokens outside any parentheses
+    depth = 0
+    for token in tokens:
+        if token.text == '(':
+            depth += 1
+        elif token.text == ')':
+            depth -= 1
+        elif depth == 0:
+            yield token
+
+
+def _classify(tokens):
+    keywords = [token.text for token in _top_level(tokens) if token.kind == KEYWORD]
+    first = next((token for token in tokens if token.text != '('), None)
+    if first is None or first.kind != KEYWORD:
+        return OTHER, first.text.upper() if first is not None else ''
+    keyword = first.text
+    if keyword == 'WITH':
+        # The CTE bodies are parenthesized; the verb after them decides
+        keyword = next((word for word in keywords if word in CTE_BODY_KEYWORDS), 'WITH')
+    elif keyword in ('EXPLAIN', 'DESCRIBE', 'DESC') and keywords[1:2] == ['ANALYZE']:
+        # EXPLAIN ANALYZE runs the statement it explains
+        verb = next((word for word in keywords[2:] if word in DML_KEYWORDS or word in DDL_KEYWORDS), None)
+        if verb is not None:
+            return (DML if verb in DML_KEYWORDS else DDL), verb
+        return READ, keyword
+    if keyword in READ_KEYWORDS or keyword == 'WITH':
+        # SELECT ... INTO writes to a table, file or variable
+        return (DML, 'SELECT ... INTO') if 'INTO' in keywords else (READ, keyword)
+    if keyword in DML_KEYWORDS:
+        return DML, keyword
+    if keyword in DDL_KEYWORDS:
+        return DDL, keyword
+    return OTHER, keyword
+
+
+@functools.lru_cache(maxsize=4096)
+def parse(sql, dialect='mysql'):
+    # Statements of `sql` in order, empty ones (stray semicolons) dropped
+    tokens = tokenize(sql, dialect)
+    statements = []
+    start = 0
+    for end in [index for index, token in enumerate(tokens) if token.text == ';'] + [len(tokens)]:
+        if end > start:
+            first, last = tokens[start], tokens[end - 1]
+            text = sql[first.position:last.position + len(last.text)]
+            statements.append(Statement(text, *_classify(tokens[start:end])))
+        start = end + 1
+    return tuple(statements)
+
+
+def check(sql, read_only=False, dialect='mysql'):
+    # The single statement in `sql`, or an "Error: ..." string when there is
+    # not exactly one or, with read_only, when it could change the database
+    statements = parse(sql, dialect)
+    if not statements:
+        return "Error: No SQL statement to run."
+    if len(statements) > 1:
+        return f"Error: Run one statement at a time ({len(statements)} found)."
+    statement = statements[0]
+    if read_only and not statement.is_read_only:
+        return f"Error: {statement.keyword} statements are not allowed here; only queries that read the tables."
+    return statement
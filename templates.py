@@ -1,368 +1,327 @@
-class SQLChallengeTemplates:
-    def __init__(self, table_name):
-        self.table_name = table_name
-
-    def generate_challenge(self, window_function):
-        method_suffix = window_function.lower().replace('()', '')
-        method_name = f"{method_suffix}_{self.table_name}"
-        print(f"Trying to call method: {method_name}")
-        challenge_method = getattr(self, method_name, None)
-        if challenge_method:
-            return challenge_method()
-        else:
-            raise NotImplementedError(f"Challenge for {window_function} not implemented for {self.table_name}")
-
+import random
+import re
+from collections import namedtuple
+from catalog import RELATIONAL_SCHEMAS
+
+WINDOW_FUNCTIONS = ['SUM() OVER()', 'ROW_NUMBER()', 'AVG() OVER()', 'COUNT() OVER()', 'RANK()', 'LEAD()',
+                    'LAG()', 'FIRST_VALUE()', 'LAST_VALUE()', 'NTH_VALUE()', 'PERCENT_RANK()', 'CUME_DIST()',
+                    'PERCENTILE_CONT()', 'PERCENTILE_DISC()']
+SCHEMA_NAMES = ['product', 'user', 'customer', 'employee', 'sales']
+# Templates only some engines can run. PERCENTILE_CONT is an ordered-set
+# aggregate that MySQL and SQLite lack, and no engine allows it with OVER.
+DIALECTS = {'PERCENTILE_CONT()': ('duckdb',)}
+# Functions whose templates compute them with another window function so
+# every engine can run them: the discrete percentile is the first value
+# whose CUME_DIST() reaches the fraction.
+EMULATED_WITH = {'PERCENTILE_DISC()': 'CUME_DIST()'}
+
+# (window function, schema, question, sql[, default parameters])
+# SQL may contain {placeholders}; their defaults are the optional last field.
+TEMPLATE_TABLE = [
     # Product table templates
-    def sum_over_product(self):
-        question = "What is the total cumulative price of all products by the most recent launch date?"
-        sql = "SELECT MAX(SUM(price) OVER (ORDER BY launch_date)) FROM product"
-        return question, sql
-
-    def row_number_product(self):
-        question = "What is the ranking position of the most expensive product in the entire product table?"
-        sql = "SELECT MAX(ROW_NUMBER() OVER (ORDER BY price DESC)) FROM product"
-        return question, sql
-
-    def avg_over_product(self):
-        question = "What is the overall average price of products considering the latest launch date?"
-        sql = "SELECT MAX(AVG(price) OVER (ORDER BY launch_date)) FROM product"
-        return question, sql
-
-    def count_over_product(self):
-        question = "As of the latest launch date, how many products have been launched in total?"
-        sql = "SELECT MAX(COUNT(*) OVER (ORDER BY launch_date)) FROM product"
-        return question, sql
-
-    def rank_product(self):
-        question = "In the category with the most products, what is the highest rank based on price?"
-        sql = "SELECT MAX(RANK() OVER (PARTITION BY category ORDER BY price DESC)) FROM product"
-        return question, sql
-
-    def lead_product(self):
-        question = "What is the price difference between the most expensive product and the subsequent product launched?"
-        sql = "SELECT MAX(price - LEAD(price) OVER (ORDER BY price DESC, launch_date)) FROM product WHERE price IS NOT NULL"
-        return question, sql
-
-    def lag_product(self):
-        question = "Find the price difference between each product and the product launched immediately before it, ordered by launch date."
-        sql = "SELECT MAX(price - LAG(price) OVER (ORDER BY launch_date)) FROM product WHERE price IS NOT NULL"
-        return question, sql
-
-    def first_value_product(self):
-        question = "What is the highest initial launch price recorded in any product category?"
-        sql = "SELECT MAX(FIRST_VALUE(price) OVER (PARTITION BY category ORDER BY launch_date)) FROM product"
-        return question, sql
-
-    def last_value_product(self):
-        question = "Among the final products launched in each category, what is the lowest launch price?"
-        sql = "SELECT MIN(LAST_VALUE(price) OVER (PARTITION BY category ORDER BY launch_date ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING)) FROM product"
-        return question, sql
-
-    def nth_value_product(self):
-        question = "What is the highest launch price of the third product in any category?"
-        sql = "SELECT MAX(NTH_VALUE(price, 3) OVER (PARTITION BY category ORDER BY launch_date)) FROM product"
-        return question, sql
-
-    def percent_rank_product(self):
-        question = "Within each category, what is the maximum percentile rank based on the price of products?"
-        sql = "SELECT MAX(PERCENT_RANK() OVER (PARTITION BY category ORDER BY price DESC)) FROM product"
-        return question, sql
-
-    def cume_dist_product(self):
-        question = "For the most expensive product in its category, what is its cumulative distribution?"
-        sql = "SELECT MAX(CUME_DIST() OVER (PARTITION BY category ORDER BY price DESC)) FROM product"
-        return question, sql
-
-    def percentile_cont_product(self):
-        question = "Across all categories, what is the highest median price?"
-        sql = "SELECT MAX(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY price) OVER (PARTITION BY category)) FROM product"
-        return question, sql
-
-    def percentile_disc_product(self):
-        question = "What is the maximum discrete median price across all product categories?"
-        sql = "SELECT MAX(PERCENTILE_DISC(0.5) WITHIN GROUP (ORDER BY price) OVER (PARTITION BY category)) FROM product"
-        return question, sql
-    
+    ("SUM() OVER()", "product",
+     "What is the total cumulative price of all products by the most recent launch date?",
+     "SELECT MAX(v) FROM (SELECT SUM(price) OVER (ORDER BY launch_date) AS v FROM product) AS windowed"),
+    ("ROW_NUMBER()", "product",
+     "What is the ranking position of the most expensive product in the entire product table?",
+     "SELECT MAX(v) FROM (SELECT ROW_NUMBER() OVER (ORDER BY price DESC) AS v FROM product) AS windowed"),
+    ("AVG() OVER()", "product",
+     "What is the overall average price of products considering the latest launch date?",
+     "SELECT MAX(v) FROM (SELECT AVG(price) OVER (ORDER BY launch_date) AS v FROM product) AS windowed"),
+    ("COUNT() OVER()", "product",
+     "As of the latest launch date, how many products have been launched in total?",
+     "SELECT MAX(v) FROM (SELECT COUNT(*) OVER (ORDER BY launch_date) AS v FROM product) AS windowed"),
+    ("RANK()", "product",
+     "In the category with the most products, what is the highest rank based on price?",
+     "SELECT MAX(v) FROM (SELECT RANK() OVER (PARTITION BY category ORDER BY price DESC) AS v FROM product) AS windowed"),
+    ("LEAD()", "product",
+     "What is the price difference between the most expensive product and the subsequent product launched?",
+     "SELECT MAX(v) FROM (SELECT price - LEAD(price) OVER (ORDER BY price DESC, launch_date) AS v FROM product WHERE price IS NOT NULL) AS windowed"),
+    ("LAG()", "product",
+     "Find the price difference between each product and the product launched immediately before it, ordered by launch date.",
+     "SELECT MAX(v) FROM (SELECT price - LAG(price) OVER (ORDER BY launch_date) AS v FROM product WHERE price IS NOT NULL) AS windowed"),
+    ("FIRST_VALUE()", "product",
+     "What is the highest initial launch price recorded in any product category?",
+     "SELECT MAX(v) FROM (SELECT FIRST_VALUE(price) OVER (PARTITION BY category ORDER BY launch_date) AS v FROM product) AS windowed"),
+    ("LAST_VALUE()", "product",
+     "Among the final products launched in each category, what is the lowest launch price?",
+     "SELECT MIN(v) FROM (SELECT LAST_VALUE(price) OVER (PARTITION BY category ORDER BY launch_date ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING) AS v FROM product) AS windowed"),
+    ("NTH_VALUE()", "product",
+     "What is the highest launch price of the third product in any category?",
+     "SELECT MAX(v) FROM (SELECT NTH_VALUE(price, {n}) OVER (PARTITION BY category ORDER BY launch_date) AS v FROM product) AS windowed", {"n": 3}),
+    ("PERCENT_RANK()", "product",
+     "Within each category, what is the maximum percentile rank based on the price of products?",
+     "SELECT MAX(v) FROM (SELECT PERCENT_RANK() OVER (PARTITION BY category ORDER BY price DESC) AS v FROM product) AS windowed"),
+    ("CUME_DIST()", "product",
+     "For the most expensive product in its category, what is its cumulative distribution?",
+     "SELECT MAX(v) FROM (SELECT CUME_DIST() OVER (PARTITION BY category ORDER BY price DESC) AS v FROM product) AS windowed"),
+    ("PERCENTILE_CONT()", "product",
+     "Across all categories, what is the highest median price?",
+     "SELECT MAX(m) FROM (SELECT PERCENTILE_CONT({fraction}) WITHIN GROUP (ORDER BY price) AS m FROM product GROUP BY category) AS medians", {"fraction": 0.5}),
+    ("PERCENTILE_DISC()", "product",
+     "What is the maximum discrete median price across all product categories?",
+     "SELECT MAX(m) FROM (SELECT MIN(CASE WHEN cd >= {fraction} THEN price END) AS m FROM (SELECT category, price, CUME_DIST() OVER (PARTITION BY category ORDER BY price) AS cd FROM product WHERE price IS NOT NULL) AS ranked GROUP BY category) AS medians", {"fraction": 0.5}),
     # User table templates
-    def sum_over_user(self):
-        question = "What is the total cumulative order count for all users as of the most recent join date?"
-        sql = "SELECT MAX(SUM(order_count) OVER (ORDER BY join_date)) FROM user"
-        return question, sql
-
-    def row_number_user(self):
-        question = "What is the position of the user with the highest order count?"
-        sql = "SELECT MAX(ROW_NUMBER() OVER (ORDER BY order_count DESC)) FROM user"
-        return question, sql
-
-    def avg_over_user(self):
-        question = "What is the average order count for users as of the most recent join date?"
-        sql = "SELECT MAX(AVG(order_count) OVER (ORDER BY join_date)) FROM user"
-        return question, sql
-
-    def count_over_user(self):
-        question = "How many users have joined up to the most recent join date?"
-        sql = "SELECT MAX(COUNT(*) OVER (ORDER BY join_date)) FROM user"
-        return question, sql
-
-    def rank_user(self):
-        question = "Among all languages, what is the highest rank based on order count?"
-        sql = "SELECT MAX(RANK() OVER (PARTITION BY language ORDER BY order_count DESC)) FROM user"
-        return question, sql
-
-    def lead_user(self):
-        question = "What is the order count difference between the user with the most orders and the next user?"
-        sql = "SELECT MAX(order_count - LEAD(order_count) OVER (ORDER BY order_count DESC)) FROM user WHERE order_count IS NOT NULL"
-        return question, sql
-
-    def lag_user(self):
-        question = "What is the order count difference between a user and the user who joined just before them, sorted by join date?"
-        sql = "SELECT MAX(order_count - LAG(order_count) OVER (ORDER BY join_date)) FROM user WHERE order_count IS NOT NULL"
-        return question, sql
-
-    def first_value_user(self):
-        question = "What is the highest initial order count recorded for any language group?"
-        sql = "SELECT MAX(FIRST_VALUE(order_count) OVER (PARTITION BY language ORDER BY join_date)) FROM user"
-        return question, sql
-
-    def last_value_user(self):
-        question = "What is the lowest order count among the latest users who joined in each language group?"
-        sql = "SELECT MIN(LAST_VALUE(order_count) OVER (PARTITION BY language ORDER BY join_date ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING)) FROM user"
-        return question, sql
-
-    def nth_value_user(self):
-        question = "What is the highest order count of the third user who joined in any language group?"
-        sql = "SELECT MAX(NTH_VALUE(order_count, 3) OVER (PARTITION BY language ORDER BY join_date)) FROM user"
-        return question, sql
-
-    def percent_rank_user(self):
-        question = "What is the maximum percentile rank of users based on order count within each language group?"
-        sql = "SELECT MAX(PERCENT_RANK() OVER (PARTITION BY language ORDER BY order_count DESC)) FROM user"
-        return question, sql
-
-    def cume_dist_user(self):
-        question = "For the user with the highest order count in their language group, what is their cumulative distribution?"
-        sql = "SELECT MAX(CUME_DIST() OVER (PARTITION BY language ORDER BY order_count DESC)) FROM user"
-        return question, sql
-
-    def percentile_cont_user(self):
-        question = "Across all language groups, what is the highest median order count?"
-        sql = "SELECT MAX(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY order_count) OVER (PARTITION BY language)) FROM user"
-        return question, sql
-
-    def percentile_disc_user(self):
-        question = "What is the maximum discrete median order count across all language groups?"
-        sql = "SELECT MAX(PERCENTILE_DISC(0.5) WITHIN GROUP (ORDER BY order_count) OVER (PARTITION BY language)) FROM user"
-        return question, sql
-    
+    ("SUM() OVER()", "user",
+     "What is the total cumulative order count for all users as of the most recent join date?",
+     "SELECT MAX(v) FROM (SELECT SUM(order_count) OVER (ORDER BY join_date) AS v FROM user) AS windowed"),
+    ("ROW_NUMBER()", "user",
+     "What is the position of the user with the highest order count?",
+     "SELECT MAX(v) FROM (SELECT ROW_NUMBER() OVER (ORDER BY order_count DESC) AS v FROM user) AS windowed"),
+    ("AVG() OVER()", "user",
+     "What is the average order count for users as of the most recent join date?",
+     "SELECT MAX(v) FROM (SELECT AVG(order_count) OVER (ORDER BY join_date) AS v FROM user) AS windowed"),
+    ("COUNT() OVER()", "user",
+     "How many users have joined up to the most recent join date?",
+     "SELECT MAX(v) FROM (SELECT COUNT(*) OVER (ORDER BY join_date) AS v FROM user) AS windowed"),
+    ("RANK()", "user",
+     "Among all languages, what is the highest rank based on order count?",
+     "SELECT MAX(v) FROM (SELECT RANK() OVER (PARTITION BY language ORDER BY order_count DESC) AS v FROM user) AS windowed"),
+    ("LEAD()", "user",
+     "What is the order count difference between the user with the most orders and the next user?",
+     "SELECT MAX(v) FROM (SELECT order_count - LEAD(order_count) OVER (ORDER BY order_count DESC) AS v FROM user WHERE order_count IS NOT NULL) AS windowed"),
+    ("LAG()", "user",
+     "What is the order count difference between a user and the user who joined just before them, sorted by join date?",
+     "SELECT MAX(v) FROM (SELECT order_count - LAG(order_count) OVER (ORDER BY join_date) AS v FROM user WHERE order_count IS NOT NULL) AS windowed"),
+    ("FIRST_VALUE()", "user",
+     "What is the highest initial order count recorded for any language group?",
+     "SELECT MAX(v) FROM (SELECT FIRST_VALUE(order_count) OVER (PARTITION BY language ORDER BY join_date) AS v FROM user) AS windowed"),
+    ("LAST_VALUE()", "user",
+     "What is the lowest order count among the latest users who joined in each language group?",
+     "SELECT MIN(v) FROM (SELECT LAST_VALUE(order_count) OVER (PARTITION BY language ORDER BY join_date ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING) AS v FROM user) AS windowed"),
+    ("NTH_VALUE()", "user",
+     "What is the highest order count of the third user who joined in any language group?",
+     "SELECT MAX(v) FROM (SELECT NTH_VALUE(order_count, {n}) OVER (PARTITION BY language ORDER BY join_date) AS v FROM user) AS windowed", {"n": 3}),
+    ("PERCENT_RANK()", "user",
+     "What is the maximum percentile rank of users based on order count within each language group?",
+     "SELECT MAX(v) FROM (SELECT PERCENT_RANK() OVER (PARTITION BY language ORDER BY order_count DESC) AS v FROM user) AS windowed"),
+    ("CUME_DIST()", "user",
+     "For the user with the highest order count in their language group, what is their cumulative distribution?",
+     "SELECT MAX(v) FROM (SELECT CUME_DIST() OVER (PARTITION BY language ORDER BY order_count DESC) AS v FROM user) AS windowed"),
+    ("PERCENTILE_CONT()", "user",
+     "Across all language groups, what is the highest median order count?",
+     "SELECT MAX(m) FROM (SELECT PERCENTILE_CONT({fraction}) WITHIN GROUP (ORDER BY order_count) AS m FROM user GROUP BY language) AS medians", {"fraction": 0.5}),
+    ("PERCENTILE_DISC()", "user",
+     "What is the maximum discrete median order count across all language groups?",
+     "SELECT MAX(m) FROM (SELECT MIN(CASE WHEN cd >= {fraction} THEN order_count END) AS m FROM (SELECT language, order_count, CUME_DIST() OVER (PARTITION BY language ORDER BY order_count) AS cd FROM user WHERE order_count IS NOT NULL) AS ranked GROUP BY language) AS medians", {"fraction": 0.5}),
     # Customer table templates
-    def sum_over_customer(self):
-        question = "What is the total cumulative amount spent by all customers as of the most recent order?"
-        sql = "SELECT MAX(SUM(order_total) OVER (ORDER BY last_order)) FROM customer"
-        return question, sql
-
-    def row_number_customer(self):
-        question = "What is the position of the customer who spent the most in total?"
-        sql = "SELECT MAX(ROW_NUMBER() OVER (ORDER BY order_total DESC)) FROM customer"
-        return question, sql
-
-    def avg_over_customer(self):
-        question = "What is the average amount spent by customers as of the most recent order date?"
-        sql = "SELECT MAX(AVG(order_total) OVER (ORDER BY last_order)) FROM customer"
-        return question, sql
-
-    def count_over_customer(self):
-        question = "How many customers have placed orders up to the most recent order date?"
-        sql = "SELECT MAX(COUNT(*) OVER (ORDER BY last_order)) FROM customer"
-        return question, sql
-
-    def rank_customer(self):
-        question = "What is the highest rank in order total among all loyalty levels?"
-        sql = "SELECT MAX(RANK() OVER (PARTITION BY loyalty ORDER BY order_total DESC)) FROM customer"
-        return question, sql
-
-    def lead_customer(self):
-        question = "What is the difference in total amount spent between the top spender and the next customer?"
-        sql = "SELECT MAX(order_total - LEAD(order_total) OVER (ORDER BY order_total DESC)) FROM customer WHERE order_total IS NOT NULL"
-        return question, sql
-    
-    def lag_customer(self):
-        question = "Determine the maximum difference in order total between each customer and the one whose last order was immediately before them."
-        sql = "SELECT MAX(order_total - LAG(order_total) OVER (ORDER BY last_order)) FROM customer WHERE order_total IS NOT NULL"
-        return question, sql
-
-    def first_value_customer(self):
-        question = "What is the highest initial amount spent by any customer within each loyalty level?"
-        sql = "SELECT MAX(FIRST_VALUE(order_total) OVER (PARTITION BY loyalty ORDER BY last_order)) FROM customer"
-        return question, sql
-
-    def last_value_customer(self):
-        question = "What is the lowest amount spent among the latest customers in each loyalty level?"
-        sql = "SELECT MIN(LAST_VALUE(order_total) OVER (PARTITION BY loyalty ORDER BY last_order ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING)) FROM customer"
-        return question, sql
-
-    def nth_value_customer(self):
-        question = "What is the highest amount spent by the third most recent customer in any loyalty level?"
-        sql = "SELECT MAX(NTH_VALUE(order_total, 3) OVER (PARTITION BY loyalty ORDER BY last_order)) FROM customer"
-        return question, sql
-
-    def percent_rank_customer(self):
-        question = "What is the maximum percentile rank of customers based on total amount spent within each loyalty level?"
-        sql = "SELECT MAX(PERCENT_RANK() OVER (PARTITION BY loyalty ORDER BY order_total DESC)) FROM customer"
-        return question, sql
-
-    def cume_dist_customer(self):
-        question = "For the customer who spent the most within their loyalty level, what is their cumulative distribution?"
-        sql = "SELECT MAX(CUME_DIST() OVER (PARTITION BY loyalty ORDER BY order_total DESC)) FROM customer"
-        return question, sql
-
-    def percentile_cont_customer(self):
-        question = "Across all loyalty levels, what is the highest median amount spent by customers?"
-        sql = "SELECT MAX(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY order_total) OVER (PARTITION BY loyalty)) FROM customer"
-        return question, sql
-
-    def percentile_disc_customer(self):
-        question = "What is the maximum discrete median amount spent across all loyalty levels?"
-        sql = "SELECT MAX(PERCENTILE_DISC(0.5) WITHIN GROUP (ORDER BY order_total) OVER (PARTITION BY loyalty)) FROM customer"
-        return question, sql
-    
+    ("SUM() OVER()", "customer",
+     "What is the total cumulative amount spent by all customers as of the most recent order?",
+     "SELECT MAX(v) FROM (SELECT SUM(order_total) OVER (ORDER BY last_order) AS v FROM customer) AS windowed"),
+    ("ROW_NUMBER()", "customer",
+     "What is the position of the customer who spent the most in total?",
+     "SELECT MAX(v) FROM (SELECT ROW_NUMBER() OVER (ORDER BY order_total DESC) AS v FROM customer) AS windowed"),
+    ("AVG() OVER()", "customer",
+     "What is the average amount spent by customers as of the most recent order date?",
+     "SELECT MAX(v) FROM (SELECT AVG(order_total) OVER (ORDER BY last_order) AS v FROM customer) AS windowed"),
+    ("COUNT() OVER()", "customer",
+     "How many customers have placed orders up to the most recent order date?",
+     "SELECT MAX(v) FROM (SELECT COUNT(*) OVER (ORDER BY last_order) AS v FROM customer) AS windowed"),
+    ("RANK()", "customer",
+     "What is the highest rank in order total among all loyalty levels?",
+     "SELECT MAX(v) FROM (SELECT RANK() OVER (PARTITION BY loyalty ORDER BY order_total DESC) AS v FROM customer) AS windowed"),
+    ("LEAD()", "customer",
+     "What is the difference in total amount spent between the top spender and the next customer?",
+     "SELECT MAX(v) FROM (SELECT order_total - LEAD(order_total) OVER (ORDER BY order_total DESC) AS v FROM customer WHERE order_total IS NOT NULL) AS windowed"),
+    ("LAG()", "customer",
+     "Determine the maximum difference in order total between each customer and the one whose last order was immediately before them.",
+     "SELECT MAX(v) FROM (SELECT order_total - LAG(order_total) OVER (ORDER BY last_order) AS v FROM customer WHERE order_total IS NOT NULL) AS windowed"),
+    ("FIRST_VALUE()", "customer",
+     "What is the highest initial amount spent by any customer within each loyalty level?",
+     "SELECT MAX(v) FROM (SELECT FIRST_VALUE(order_total) OVER (PARTITION BY loyalty ORDER BY last_order) AS v FROM customer) AS windowed"),
+    ("LAST_VALUE()", "customer",
+     "What is the lowest amount spent among the latest customers in each loyalty level?",
+     "SELECT MIN(v) FROM (SELECT LAST_VALUE(order_total) OVER (PARTITION BY loyalty ORDER BY last_order ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING) AS v FROM customer) AS windowed"),
+    ("NTH_VALUE()", "customer",
+     "What is the highest amount spent by the third most recent customer in any loyalty level?",
+     "SELECT MAX(v) FROM (SELECT NTH_VALUE(order_total, {n}) OVER (PARTITION BY loyalty ORDER BY last_order) AS v FROM customer) AS windowed", {"n": 3}),
+    ("PERCENT_RANK()", "customer",
+     "What is the maximum percentile rank of customers based on total amount spent within each loyalty level?",
+     "SELECT MAX(v) FROM (SELECT PERCENT_RANK() OVER (PARTITION BY loyalty ORDER BY order_total DESC) AS v FROM customer) AS windowed"),
+    ("CUME_DIST()", "customer",
+     "For the customer who spent the most within their loyalty level, what is their cumulative distribution?",
+     "SELECT MAX(v) FROM (SELECT CUME_DIST() OVER (PARTITION BY loyalty ORDER BY order_total DESC) AS v FROM customer) AS windowed"),
+    ("PERCENTILE_CONT()", "customer",
+     "Across all loyalty levels, what is the highest median amount spent by customers?",
+     "SELECT MAX(m) FROM (SELECT PERCENTILE_CONT({fraction}) WITHIN GROUP (ORDER BY order_total) AS m FROM customer GROUP BY loyalty) AS medians", {"fraction": 0.5}),
+    ("PERCENTILE_DISC()", "customer",
+     "What is the maximum discrete median amount spent across all loyalty levels?",
+     "SELECT MAX(m) FROM (SELECT MIN(CASE WHEN cd >= {fraction} THEN order_total END) AS m FROM (SELECT loyalty, order_total, CUME_DIST() OVER (PARTITION BY loyalty ORDER BY order_total) AS cd FROM customer WHERE order_total IS NOT NULL) AS ranked GROUP BY loyalty) AS medians", {"fraction": 0.5}),
     # Employee table templates
-    def sum_over_employee(self):
-        question = "What is the total cumulative salary paid to employees as of the most recent hire date?"
-        sql = "SELECT MAX(SUM(salary) OVER (ORDER BY hire_date)) FROM employee"
-        return question, sql
-
-    def row_number_employee(self):
-        question = "What is the position of the highest-paid employee?"
-        sql = "SELECT MAX(ROW_NUMBER() OVER (ORDER BY salary DESC)) FROM employee"
-        return question, sql
-
-    def avg_over_employee(self):
-        question = "What is the average salary of employees as of the most recent hire date?"
-        sql = "SELECT MAX(AVG(salary) OVER (ORDER BY hire_date)) FROM employee"
-        return question, sql
-
-    def count_over_employee(self):
-        question = "How many employees have been hired up to the most recent hire date?"
-        sql = "SELECT MAX(COUNT(*) OVER (ORDER BY hire_date)) FROM employee"
-        return question, sql
-
-    def rank_employee(self):
-        question = "Among all positions, what is the highest salary rank?"
-        sql = "SELECT MAX(RANK() OVER (PARTITION BY position ORDER BY salary DESC)) FROM employee"
-        return question, sql
-
-    def lead_employee(self):
-        question = "What is the salary difference between the top earner and the next highest-paid employee?"
-        sql = "SELECT MAX(salary - LEAD(salary) OVER (ORDER BY salary DESC)) FROM employee WHERE salary IS NOT NULL"
-        return question, sql
-    
-    def lag_employee(self):
-        question = "Calculate the maximum salary difference between each employee and the one who was hired just before them."
-        sql = "SELECT MAX(salary - LAG(salary) OVER (ORDER BY hire_date)) FROM employee WHERE salary IS NOT NULL"
-        return question, sql
-
-    def first_value_employee(self):
-        question = "What is the highest starting salary among all positions?"
-        sql = "SELECT MAX(FIRST_VALUE(salary) OVER (PARTITION BY position ORDER BY hire_date)) FROM employee"
-        return question, sql
-
-    def last_value_employee(self):
-        question = "What is the lowest salary among the most recently hired employees in each position?"
-        sql = "SELECT MIN(LAST_VALUE(salary) OVER (PARTITION BY position ORDER BY hire_date ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING)) FROM employee"
-        return question, sql
-
-    def nth_value_employee(self):
-        question = "What is the highest salary of the third most recently hired employee in any position?"
-        sql = "SELECT MAX(NTH_VALUE(salary, 3) OVER (PARTITION BY position ORDER BY hire_date)) FROM employee"
-        return question, sql
-
-    def percent_rank_employee(self):
-        question = "What is the maximum percentile rank of employees based on salary within each position?"
-        sql = "SELECT MAX(PERCENT_RANK() OVER (PARTITION BY position ORDER BY salary DESC)) FROM employee"
-        return question, sql
-
-    def cume_dist_employee(self):
-        question = "For the highest-paid employee in their position, what is their cumulative distribution?"
-        sql = "SELECT MAX(CUME_DIST() OVER (PARTITION BY position ORDER BY salary DESC)) FROM employee"
-        return question, sql
-
-    def percentile_cont_employee(self):
-        question = "Across all positions, what is the highest median salary?"
-        sql = "SELECT MAX(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salary) OVER (PARTITION BY position)) FROM employee"
-        return question, sql
-
-    def percentile_disc_employee(self):
-        question = "What is the maximum discrete median salary across all positions?"
-        sql = "SELECT MAX(PERCENTILE_DISC(0.5) WITHIN GROUP (ORDER BY salary) OVER (PARTITION BY position)) FROM employee"
-        return question, sql
-    
+    ("SUM() OVER()", "employee",
+     "What is the total cumulative salary paid to employees as of the most recent hire date?",
+     "SELECT MAX(v) FROM (SELECT SUM(salary) OVER (ORDER BY hire_date) AS v FROM employee) AS windowed"),
+    ("ROW_NUMBER()", "employee",
+     "What is the position of the highest-paid employee?",
+     "SELECT MAX(v) FROM (SELECT ROW_NUMBER() OVER (ORDER BY salary DESC) AS v FROM employee) AS windowed"),
+    ("AVG() OVER()", "employee",
+     "What is the average salary of employees as of the most recent hire date?",
+     "SELECT MAX(v) FROM (SELECT AVG(salary) OVER (ORDER BY hire_date) AS v FROM employee) AS windowed"),
+    ("COUNT() OVER()", "employee",
+     "How many employees have been hired up to the most recent hire date?",
+     "SELECT MAX(v) FROM (SELECT COUNT(*) OVER (ORDER BY hire_date) AS v FROM employee) AS windowed"),
+    ("RANK()", "employee",
+     "Among all positions, what is the highest salary rank?",
+     "SELECT MAX(v) FROM (SELECT RANK() OVER (PARTITION BY position ORDER BY salary DESC) AS v FROM employee) AS windowed"),
+    ("LEAD()", "employee",
+     "What is the salary difference between the top earner and the next highest-paid employee?",
+     "SELECT MAX(v) FROM (SELECT salary - LEAD(salary) OVER (ORDER BY salary DESC) AS v FROM employee WHERE salary IS NOT NULL) AS windowed"),
+    ("LAG()", "employee",
+     "Calculate the maximum salary difference between each employee and the one who was hired just before them.",
+     "SELECT MAX(v) FROM (SELECT salary - LAG(salary) OVER (ORDER BY hire_date) AS v FROM employee WHERE salary IS NOT NULL) AS windowed"),
+    ("FIRST_VALUE()", "employee",
+     "What is the highest starting salary among all positions?",
+     "SELECT MAX(v) FROM (SELECT FIRST_VALUE(salary) OVER (PARTITION BY position ORDER BY hire_date) AS v FROM employee) AS windowed"),
+    ("LAST_VALUE()", "employee",
+     "What is the lowest salary among the most recently hired employees in each position?",
+     "SELECT MIN(v) FROM (SELECT LAST_VALUE(salary) OVER (PARTITION BY position ORDER BY hire_date ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING) AS v FROM employee) AS windowed"),
+    ("NTH_VALUE()", "employee",
+     "What is the highest salary of the third most recently hired employee in any position?",
+     "SELECT MAX(v) FROM (SELECT NTH_VALUE(salary, {n}) OVER (PARTITION BY position ORDER BY hire_date) AS v FROM employee) AS windowed", {"n": 3}),
+    ("PERCENT_RANK()", "employee",
+     "What is the maximum percentile rank of employees based on salary within each position?",
+     "SELECT MAX(v) FROM (SELECT PERCENT_RANK() OVER (PARTITION BY position ORDER BY salary DESC) AS v FROM employee) AS windowed"),
+    ("CUME_DIST()", "employee",
+     "For the highest-paid employee in their position, what is their cumulative distribution?",
+     "SELECT MAX(v) FROM (SELECT CUME_DIST() OVER (PARTITION BY position ORDER BY salary DESC) AS v FROM employee) AS windowed"),
+    ("PERCENTILE_CONT()", "employee",
+     "Across all positions, what is the highest median salary?",
+     "SELECT MAX(m) FROM (SELECT PERCENTILE_CONT({fraction}) WITHIN GROUP (ORDER BY salary) AS m FROM employee GROUP BY position) AS medians", {"fraction": 0.5}),
+    ("PERCENTILE_DISC()", "employee",
+     "What is the maximum discrete median salary across all positions?",
+     "SELECT MAX(m) FROM (SELECT MIN(CASE WHEN cd >= {fraction} THEN salary END) AS m FROM (SELECT position, salary, CUME_DIST() OVER (PARTITION BY position ORDER BY salary) AS cd FROM employee WHERE salary IS NOT NULL) AS ranked GROUP BY position) AS medians", {"fraction": 0.5}),
     # Sales table templates
-    def sum_over_sales(self):
-        question = "What is the total cumulative sale amount up to the most recent sale date?"
-        sql = "SELECT MAX(SUM(sale_amount) OVER (ORDER BY sale_date)) FROM sales"
-        return question, sql
-
-    def row_number_sales(self):
-        question = "What is the position of the sale with the highest amount?"
-        sql = "SELECT MAX(ROW_NUMBER() OVER (ORDER BY sale_amount DESC)) FROM sales"
-        return question, sql
-
-    def avg_over_sales(self):
-        question = "What is the average sale amount up to the most recent sale date?"
-        sql = "SELECT MAX(AVG(sale_amount) OVER (ORDER BY sale_date)) FROM sales"
-        return question, sql
-
-    def count_over_sales(self):
-        question = "How many sales have been made up to the most recent sale date?"
-        sql = "SELECT MAX(COUNT(*) OVER (ORDER BY sale_date)) FROM sales"
-        return question, sql
-
-    def rank_sales(self):
-        question = "What is the highest rank of sales based on the sale amount?"
-        sql = "SELECT MAX(RANK() OVER (ORDER BY sale_amount DESC)) FROM sales"
-        return question, sql
-
-    def lead_sales(self):
-        question = "What is the difference in sale amount between the largest sale and the following sale?"
-        sql = "SELECT MAX(sale_amount - LEAD(sale_amount) OVER (ORDER BY sale_amount DESC)) FROM sales WHERE sale_amount IS NOT NULL"
-        return question, sql
-
-    def lag_sales(self):
-        question = "What is the sale amount difference between each sale and the sale that occurred just before it, sorted by sale date?"
-        sql = "SELECT MAX(sale_amount - LAG(sale_amount) OVER (ORDER BY sale_date)) FROM sales WHERE sale_amount IS NOT NULL"
-        return question, sql
+    ("SUM() OVER()", "sales",
+     "What is the total cumulative sale amount up to the most recent sale date?",
+     "SELECT MAX(v) FROM (SELECT SUM(sale_amount) OVER (ORDER BY sale_date) AS v FROM sales) AS windowed"),
+    ("ROW_NUMBER()", "sales",
+     "What is the position of the sale with the highest amount?",
+     "SELECT MAX(v) FROM (SELECT ROW_NUMBER() OVER (ORDER BY sale_amount DESC) AS v FROM sales) AS windowed"),
+    ("AVG() OVER()", "sales",
+     "What is the average sale amount up to the most recent sale date?",
+     "SELECT MAX(v) FROM (SELECT AVG(sale_amount) OVER (ORDER BY sale_date) AS v FROM sales) AS windowed"),
+    ("COUNT() OVER()", "sales",
+     "How many sales have been made up to the most recent sale date?",
+     "SELECT MAX(v) FROM (SELECT COUNT(*) OVER (ORDER BY sale_date) AS v FROM sales) AS windowed"),
+    ("RANK()", "sales",
+     "What is the highest rank of sales based on the sale amount?",
+     "SELECT MAX(v) FROM (SELECT RANK() OVER (ORDER BY sale_amount DESC) AS v FROM sales) AS windowed"),
+    ("LEAD()", "sales",
+     "What is the difference in sale amount between the largest sale and the following sale?",
+     "SELECT MAX(v) FROM (SELECT sale_amount - LEAD(sale_amount) OVER (ORDER BY sale_amount DESC) AS v FROM sales WHERE sale_amount IS NOT NULL) AS windowed"),
+    ("LAG()", "sales",
+     "What is the sale amount difference between each sale and the sale that occurred just before it, sorted by sale date?",
+     "SELECT MAX(v) FROM (SELECT sale_amount - LAG(sale_amount) OVER (ORDER BY sale_date) AS v FROM sales WHERE sale_amount IS NOT NULL) AS windowed"),
+    ("FIRST_VALUE()", "sales",
+     "What is the initial highest sale amount recorded?",
+     "SELECT MAX(v) FROM (SELECT FIRST_VALUE(sale_amount) OVER (ORDER BY sale_date) AS v FROM sales) AS windowed"),
+    ("LAST_VALUE()", "sales",
+     "What is the lowest sale amount among the most recent sales?",
+     "SELECT MIN(v) FROM (SELECT LAST_VALUE(sale_amount) OVER (ORDER BY sale_date ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING) AS v FROM sales) AS windowed"),
+    ("NTH_VALUE()", "sales",
+     "What is the sale amount of the third most recent sale?",
+     "SELECT MAX(v) FROM (SELECT NTH_VALUE(sale_amount, {n}) OVER (ORDER BY sale_date) AS v FROM sales) AS windowed", {"n": 3}),
+    ("PERCENT_RANK()", "sales",
+     "What is the maximum percentile rank of sales based on the sale amount?",
+     "SELECT MAX(v) FROM (SELECT PERCENT_RANK() OVER (ORDER BY sale_amount DESC) AS v FROM sales) AS windowed"),
+    ("CUME_DIST()", "sales",
+     "For the largest sale, what is its cumulative distribution?",
+     "SELECT MAX(v) FROM (SELECT CUME_DIST() OVER (ORDER BY sale_amount DESC) AS v FROM sales) AS windowed"),
+    ("PERCENTILE_CONT()", "sales",
+     "What is the highest median sale amount?",
+     "SELECT PERCENTILE_CONT({fraction}) WITHIN GROUP (ORDER BY sale_amount) FROM sales", {"fraction": 0.5}),
+    ("PERCENTILE_DISC()", "sales",
+     "What is the maximum discrete median sale amount?",
+     "SELECT MIN(CASE WHEN cd >= {fraction} THEN sale_amount END) FROM (SELECT sale_amount, CUME_DIST() OVER (ORDER BY sale_amount) AS cd FROM sales WHERE sale_amount IS NOT NULL) AS ranked", {"fraction": 0.5}),
+
+    # Retail (sales joined to product, customer and employee) templates
+    ("SUM() OVER()", "retail",
+     "For each product category, what is its total sales revenue and its share of all revenue (rounded to 4 places)?",
+     "SELECT p.category, SUM(s.sale_amount) AS revenue, ROUND(SUM(s.sale_amount) / SUM(SUM(s.sale_amount)) OVER (), 4) AS share "
+     "FROM sales s JOIN product p ON p.id = s.product_id GROUP BY p.category"),
+    ("ROW_NUMBER()", "retail",
+     "For each loyalty tier, which customer made the single largest purchase, and how large was it?",
+     "SELECT loyalty, name, sale_amount FROM (SELECT c.loyalty, c.name, s.sale_amount, "
+     "ROW_NUMBER() OVER (PARTITION BY c.loyalty ORDER BY s.sale_amount DESC, s.id) AS position "
+     "FROM sales s JOIN customer c ON c.id = s.customer_id) AS ranked WHERE position = 1"),
+    ("RANK()", "retail",
+     "Which employee(s) rank first by total sales amount?",
+     "SELECT name FROM (SELECT e.name, RANK() OVER (ORDER BY SUM(s.sale_amount) DESC) AS sales_rank "
+     "FROM sales s JOIN employee e ON e.id = s.employee_id GROUP BY e.id, e.name) AS ranked WHERE sales_rank = 1"),
+]
+
+
+class ChallengeTemplate(namedtuple('ChallengeTemplate', ['key', 'function', 'schema', 'question', 'sql', 'defaults',
+                                                         'dialects'])):
+    def supports(self, dialect):
+        return self.dialects is None or dialect in self.dialects
+
+    def render(self, **params):
+        values = dict(self.defaults, **params)
+        return self.question.format(**values), self.sql.format(**values)
+
+
+def template_key(window_function, schema_name):
+    # 'SUM() OVER()' + 'product' -> 'sum_over_product'
+    slug = re.sub(r'[^a-z]+', '_', window_function.lower()).strip('_')
+    return f"{slug}_{schema_name}"
+
+
+def _function_name(window_function):
+    return window_function.split('(')[0]
+
+
+def build_registry(table):
+    # Validated once at import so a missing or malformed template fails at
+    # startup instead of when a learner draws it.
+    registry = {}
+    for entry in table:
+        function, schema, question, sql = entry[:4]
+        defaults = entry[4] if len(entry) > 4 else {}
+        key = template_key(function, schema)
+        if key in registry:
+            raise ValueError(f"Duplicate challenge template: {key}")
+        if function not in WINDOW_FUNCTIONS or (schema not in SCHEMA_NAMES and schema not in RELATIONAL_SCHEMAS):
+            raise ValueError(f"Unknown window function or schema in template {key}")
+        template = ChallengeTemplate(key, function, schema, question, sql, defaults, DIALECTS.get(function))
+        try:
+            _, rendered = template.render()
+        except (KeyError, IndexError) as e:
+            raise ValueError(f"Template {key} has no default for placeholder {e}")
+        tables = '|'.join(RELATIONAL_SCHEMAS.get(schema, [schema]))
+        used = _function_name(EMULATED_WITH.get(function, function))
+        if f"{used}(" not in rendered or not re.search(rf"\bFROM (?:{tables})\b", rendered):
+            raise ValueError(f"Template {key} does not use {function} on {schema}")
+        registry[key] = template
+    missing = [template_key(f, s) for s in SCHEMA_NAMES for f in WINDOW_FUNCTIONS
+               if template_key(f, s) not in registry]
+    if missing:
+        raise ValueError(f"Missing challenge templates: {', '.join(missing)}")
+    return registry
+
+
+REGISTRY = build_registry(TEMPLATE_TABLE)
+TEMPLATE_KEYS = list(REGISTRY)
+TEMPLATES_BY_SCHEMA = {schema: [key for key in TEMPLATE_KEYS if REGISTRY[key].schema == schema]
+                       for schema in SCHEMA_NAMES + list(RELATIONAL_SCHEMAS)}
+
+
+def get_template(key):
+    return REGISTRY[key]
+
+
+def sample_template(rng=random, dialect=None):
+    # With a dialect, only templates that engine can answer are drawn
+    keys = TEMPLATE_KEYS if dialect is None else [key for key in TEMPLATE_KEYS if REGISTRY[key].supports(dialect)]
+    return REGISTRY[rng.choice(keys)]
 
-    def first_value_sales(self):
-        question = "What is the initial highest sale amount recorded?"
-        sql = "SELECT MAX(FIRST_VALUE(sale_amount) OVER (ORDER BY sale_date)) FROM sales"
-        return question, sql
 
-    def last_value_sales(self):
-        question = "What is the lowest sale amount among the most recent sales?"
-        sql = "SELECT MIN(LAST_VALUE(sale_amount) OVER (ORDER BY sale_date ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING)) FROM sales"
-        return question, sql
-
-    def nth_value_sales(self):
-        question = "What is the sale amount of the third most recent sale?"
-        sql = "SELECT MAX(NTH_VALUE(sale_amount, 3) OVER (ORDER BY sale_date)) FROM sales"
-        return question, sql
-
-    def percent_rank_sales(self):
-        question = "What is the maximum percentile rank of sales based on the sale amount?"
-        sql = "SELECT MAX(PERCENT_RANK() OVER (ORDER BY sale_amount DESC)) FROM sales"
-        return question, sql
-
-    def cume_dist_sales(self):
-        question = "For the largest sale, what is its cumulative distribution?"
-        sql = "SELECT MAX(CUME_DIST() OVER (ORDER BY sale_amount DESC)) FROM sales"
-        return question, sql
-
-    def percentile_cont_sales(self):
-        question = "What is the highest median sale amount?"
-        sql = "SELECT MAX(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY sale_amount) OVER ()) FROM sales"
-        return question, sql
+class SQLChallengeTemplates:
+    def __init__(self, table_name):
+        self.table_name = table_name
 
-    def percentile_disc_sales(self):
-        question = "What is the maximum discrete median sale amount?"
-        sql = "SELECT MAX(PERCENTILE_DISC(0.5) WITHIN GROUP (ORDER BY sale_amount) OVER ()) FROM sales"
-        return question, sql
\ No newline at end of file
+    def generate_challenge(self, window_function, **params):
+        template = REGISTRY.get(template_key(window_function, self.table_name))
+        if template is None:
+            raise NotImplementedError(f"Challenge for {window_function} not implemented for {self.table_name}")
+        return template.render(**params)
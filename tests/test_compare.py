@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+import pytest
+
+from compare import EXACT, TOLERANCE, UNORDERED, ResultComparator, chunked
+
+EXPECTED = [(1, 'a', Decimal('1.50')), (2, 'b', Decimal('2.25')), (3, 'c', None)]
+
+
+def test_unordered_ignores_order_and_numeric_type():
+    actual = [(3, 'c', None), (2.0, 'b', 2.25), (1, 'a', 1.5)]
+    assert ResultComparator(UNORDERED).compare_rows(EXPECTED, actual)
+
+
+def test_unordered_wrong_row_is_located():
+    actual = [(1, 'a', 1.5), (2, 'b', 9.0), (3, 'c', None)]
+    result = ResultComparator(UNORDERED).compare_rows(EXPECTED, actual)
+    assert not result
+    assert result.message == "Result rows differ."
+    assert result.expected_row == (2, 'b', Decimal('2.25'))
+    assert result.actual_row == (2, 'b', 9.0)
+    assert result.mismatch_index is None
+
+
+def test_exact_reports_first_out_of_order_row():
+    actual = [EXPECTED[0], EXPECTED[2], EXPECTED[1]]
+    result = ResultComparator(EXACT).compare_rows(EXPECTED, actual)
+    assert not result
+    assert result.mismatch_index == 1
+    assert result.message == "Row 2 differs."
+    assert result.actual_row == EXPECTED[2]
+
+
+def test_exact_skips_matching_chunks():
+    rows = [(i, i * 2) for i in range(2500)]
+    actual = rows[:2100] + [(2100, -1)] + rows[2101:]
+    result = ResultComparator(EXACT, chunk_size=1000).compare_rows(rows, actual)
+    assert result.mismatch_index == 2100
+    assert ResultComparator(EXACT, chunk_size=1000).compare_rows(rows, list(rows))
+
+
+def test_tolerance_accepts_near_equal_numbers():
+    comparator = ResultComparator(TOLERANCE, rel_tol=1e-6, abs_tol=1e-9)
+    assert comparator.compare_rows([(1, 1000000.0)], [(1, 1000000.5)])
+    result = comparator.compare_rows([(1, 1000000.0)], [(1, 1000010.0)])
+    assert not result and result.mismatch_index == 0
+
+
+@pytest.mark.parametrize('mode', [EXACT, TOLERANCE])
+def test_ordered_missing_and_extra_rows(mode):
+    comparator = ResultComparator(mode)
+    missing = comparator.compare_rows(EXPECTED, EXPECTED[:2])
+    assert not missing and missing.mismatch_index == 2
+    assert missing.message.startswith("Your result is missing rows")
+    extra = comparator.compare_rows(EXPECTED, EXPECTED + [(4, 'd', 0)])
+    assert not extra and extra.mismatch_index == 3 and extra.actual_row == (4, 'd', 0)
+    assert extra.message.startswith("Your result has more rows")
+
+
+def test_unordered_row_count_and_width():
+    comparator = ResultComparator(UNORDERED)
+    result = comparator.compare_rows(EXPECTED, EXPECTED[:2])
+    assert result.message == "Expected 3 rows but got 2."
+    assert result.expected_row == EXPECTED[2] and result.actual_row is None
+    result = comparator.compare_rows(EXPECTED, [row[:2] for row in EXPECTED])
+    assert result.message == "Your result has a different number of columns."
+
+
+@pytest.mark.parametrize('mode', [EXACT, UNORDERED])
+@pytest.mark.parametrize('actual', [
+    [(1, 'a', 1.5), (2, 'b', 2.25), (3, 'c', None)],
+    [(2, 'b', 2.25), (1, 'a', 1.5), (3, 'c', None)],
+    [(1, 'a', 1.5), (2, 'b', 2.25)],
+    [(1, 'a', 1.5), (2, 'b', 2.5), (3, 'c', None)],
+])
+def test_fingerprint_agrees_with_compare(mode, actual):
+    comparator = ResultComparator(mode, chunk_size=2)
+    expected_print = comparator.fingerprint(chunked(EXPECTED, 2))
+    by_print = comparator.compare_fingerprint(expected_print, chunked(actual, 2))
+    assert bool(by_print) == bool(comparator.compare_rows(EXPECTED, actual))
+
+
+def test_fingerprint_rediff_locates_rows():
+    comparator = ResultComparator(EXACT)
+    actual = [EXPECTED[1], EXPECTED[0], EXPECTED[2]]
+    result = comparator.compare_fingerprint(comparator.fingerprint([EXPECTED]), [actual],
+                                            rediff=lambda: ([EXPECTED], [actual]))
+    assert result.mismatch_index == 0 and result.actual_row == EXPECTED[1]
+
+
+def test_tolerance_has_no_fingerprint():
+    comparator = ResultComparator(TOLERANCE)
+    assert comparator.fingerprint([EXPECTED]) is None
+    with pytest.raises(ValueError):
+        comparator.compare_fingerprint(None, [EXPECTED])
@@ -0,0 +1,71 @@
+import pytest
+
+from database import DatabaseManager, QueryResult
+from result_cache import ResultCache
+from sqltokens import normalize
+
+
+def result(rows):
+    return QueryResult(['v'], rows, len(rows), None)
+
+
+@pytest.mark.parametrize('dialect', ['mysql', 'sqlite', 'duckdb'])
+def test_normalize_ignores_spacing_case_and_comments(dialect):
+    canonical = normalize("SELECT v FROM t WHERE v > 1", dialect)
+    assert canonical == "SELECT v FROM t WHERE v > 1"
+    assert normalize("select  v\n from t -- note\n where v>1;;", dialect) == canonical
+    assert normalize("SELECT /* c */ v FROM t WHERE v > 1 ;", dialect) == canonical
+
+
+def test_normalize_keeps_identifiers_and_literals():
+    assert normalize("select Name from T where s = 'AbC'", 'sqlite') == "SELECT Name FROM T WHERE s = 'AbC'"
+    assert normalize("SELECT 'a  b'", 'sqlite') != normalize("SELECT 'a b'", 'sqlite')
+    assert normalize("SELECT name FROM t") != normalize("SELECT Name FROM t")
+
+
+def test_evicts_least_recently_used_over_budget():
+    cache = ResultCache(max_bytes=300)
+    for key in 'abc':
+        assert cache.put(key, result([(key,)]), size=100)
+    assert cache.get('a') is not None  # Now the most recently used
+    cache.put('d', result([('d',)]), size=100)
+    assert list(cache.entries) == ['c', 'a', 'd']
+    assert cache.size == 300
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_refuses_results_over_budget_and_replaces_keys():
+    cache = ResultCache(max_bytes=300)
+    assert not cache.put('big', result([]), size=301)
+    cache.put('a', result([(1,)]), size=100)
+    cache.put('a', result([(2,)]), size=50)
+    assert cache.size == 50 and cache.get('a').rows == [(2,)]
+
+
+def test_invalidate_drops_one_data_version():
+    cache = ResultCache()
+    cache.put((1, 'SELECT 1'), result([(1,)]), size=10)
+    cache.put((2, 'SELECT 1'), result([(1,)]), size=10)
+    cache.invalidate(1)
+    assert list(cache.entries) == [(2, 'SELECT 1')] and cache.size == 10
+    cache.clear()
+    assert not cache.entries and cache.size == 0
+
+
+def test_manager_serves_respelled_queries_until_a_write():
+    db = DatabaseManager(None, None, None, 'test', pool_size=2, backend='sqlite')
+    db.connect()
+    try:
+        db.result_cache = ResultCache()
+        db.execute("CREATE TABLE t (v INTEGER)")
+        db.execute("INSERT INTO t VALUES (1)")
+        db.set_data_version('seeded')
+        assert db.execute("SELECT v FROM t").rows == [(1,)]
+        assert db.execute("select v  from t;").rows == [(1,)]
+        assert db.result_cache.hits == 1
+        db.execute("INSERT INTO t VALUES (2)")
+        assert not db.result_cache.entries
+        assert db.execute("SELECT COUNT(*) FROM t").rows == [(2,)]
+    finally:
+        db.close()
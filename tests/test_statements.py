@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from database import DatabaseManager
+from statements import READ, check, parse
+
+# Inputs that hide a second statement from a lexer that quotes or comments
+# differently from the engine. Each must be refused, never run.
+
+BACKSLASH_DROP = "SELECT '\\'; DROP TABLE product; --'"
+BACKSLASH_COPY = "SELECT '\\'; COPY (SELECT 42) TO '{path}'; --'"
+DOLLAR_DROP = "SELECT $$a$$; DROP TABLE product; SELECT $$b$$"
+TAGGED_DOLLAR_DROP = "SELECT $x$ ' $x$; DROP TABLE product; --'"
+NESTED_COMMENT_DROP = "SELECT 1 /* a /* b */ ; DROP TABLE product; */"
+
+
+@pytest.mark.parametrize('dialect', ['sqlite', 'duckdb'])
+@pytest.mark.parametrize('sql', [BACKSLASH_DROP, BACKSLASH_COPY.format(path='/tmp/x'), DOLLAR_DROP])
+def test_standard_quoting_splits_hidden_statements(dialect, sql):
+    assert isinstance(check(sql, read_only=True, dialect=dialect), str)
+
+
+def test_mysql_backslash_escape_stays_inside_string():
+    statement = check("SELECT 'it\\'s; DROP TABLE product'", read_only=True, dialect='mysql')
+    assert statement.kind == READ
+
+
+def test_mysql_backslash_before_closing_quote():
+    assert isinstance(check("SELECT '\\\\'; DROP TABLE product; --'", read_only=True, dialect='mysql'), str)
+
+
+def test_mysql_executable_comment_is_code():
+    statements = parse("SELECT 1 /*! ; DROP TABLE product */", 'mysql')
+    assert [statement.keyword for statement in statements] == ['SELECT', 'DROP']
+    assert isinstance(check("/*!50700 DROP TABLE product */", read_only=True, dialect='mysql'), str)
+    assert check("SELECT 2 */*c*/ 3", dialect='mysql').kind == READ
+
+
+def test_mysql_dash_dash_needs_space():
+    assert isinstance(check("SELECT 1 --1\n; DROP TABLE product", dialect='mysql'), str)
+
+
+def test_duckdb_dollar_and_nested_comments():
+    assert isinstance(check(TAGGED_DOLLAR_DROP, read_only=True, dialect='duckdb'), str)
+    assert len(parse(NESTED_COMMENT_DROP, 'duckdb')) == 1
+    assert check("SELECT E'\\'; x' AS s", read_only=True, dialect='duckdb').kind == READ
+
+
+def test_sqlite_bracket_identifiers():
+    assert check("SELECT [a;b] FROM t", read_only=True, dialect='sqlite').kind == READ
+
+
+@pytest.fixture
+def duckdb_manager():
+    pytest.importorskip('duckdb')
+    db = DatabaseManager(None, None, None, 'test', pool_size=2, backend='duckdb')
+    db.connect()
+    db.execute("CREATE TABLE product (id INTEGER)")
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize('sql', [BACKSLASH_DROP, DOLLAR_DROP, TAGGED_DOLLAR_DROP])
+def test_duckdb_payloads_do_not_run(duckdb_manager, sql):
+    assert duckdb_manager.execute(sql, read_only=True).error
+    assert duckdb_manager.execute("SELECT COUNT(*) FROM product").rows == [(0,)]
+
+
+def test_duckdb_cannot_write_host_files(duckdb_manager, tmp_path):
+    path = str(tmp_path / 'x.csv')
+    assert duckdb_manager.execute(BACKSLASH_COPY.format(path=path), read_only=True).error
+    assert duckdb_manager.execute(f"COPY (SELECT 42) TO '{path}'").error
+    assert not os.path.exists(path)
+    assert duckdb_manager.execute("SELECT * FROM read_csv('/etc/hostname')").error
+
+
+def test_duckdb_bulk_load_still_works(duckdb_manager):
+    assert duckdb_manager.insert_rows('product', ['id'], [(1,), (2,)]) == 2
+    assert duckdb_manager.execute("SELECT COUNT(*) FROM product").rows == [(2,)]
+
+
+def test_sqlite_payload_does_not_run():
+    db = DatabaseManager(None, None, None, 'test', pool_size=2, backend='sqlite')
+    db.connect()
+    try:
+        db.execute("CREATE TABLE product (id INTEGER)")
+        assert db.execute(BACKSLASH_DROP, read_only=True).error
+        assert db.execute("SELECT COUNT(*) FROM product").rows == [(0,)]
+    finally:
+        db.close()
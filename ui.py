@@ -1,9 +1,17 @@
-from PyQt6.QtWidgets import QApplication, QMainWindow, QTextEdit, QPushButton, QVBoxLayout, QWidget, QSplitter, QLabel, QTableWidget, QTableWidgetItem
+from PyQt6.QtWidgets import QApplication, QMainWindow, QTextEdit, QPushButton, QVBoxLayout, QHBoxLayout, QWidget, QSplitter, QLabel, QTableView, QTableWidget, QTableWidgetItem, QToolButton
 from PyQt6.QtCore import pyqtSignal, Qt
 
 class SQLAppUI(QMainWindow):
     runButtonClicked = pyqtSignal(str)
     submitButtonClicked = pyqtSignal(str)
+    cancelButtonClicked = pyqtSignal()
+    exportProfileClicked = pyqtSignal()
+    clearProfileClicked = pyqtSignal()
+    createIndexesClicked = pyqtSignal()
+    nextChallengeClicked = pyqtSignal()
+
+    PROFILE_COLUMNS = ['Query', 'Wall ms', 'Exec ms', 'Fetch ms', 'Server ms', 'Rows', 'Examined']
+    PROFILE_ROWS = 200  # Most recent profiles kept in the panel (and by the profiler)
 
     def __init__(self):
         super().__init__()
@@ -41,15 +49,50 @@ class SQLAppUI(QMainWindow):
 
         # Query Results with Label
         queryResultsLabel = QLabel("Query Results")
-        self.queryResultsTable = QTableWidget()
+        self.queryResultsTable = QTableView()
+        self.queryResults = QLabel("")
         rightSideLayout.addWidget(queryResultsLabel)
         rightSideLayout.addWidget(self.queryResultsTable)
+        rightSideLayout.addWidget(self.queryResults)
 
         # Run and Submit Buttons
         self.runButton = QPushButton('Run')
         self.submitButton = QPushButton('Submit')
+        self.cancelButton = QPushButton('Cancel')
+        self.cancelButton.setEnabled(False)
+        self.indexButton = QPushButton('Create Suggested Indexes')
+        self.indexButton.setEnabled(False)
+        self.nextButton = QPushButton('Next Challenge')
         rightSideLayout.addWidget(self.runButton)
         rightSideLayout.addWidget(self.submitButton)
+        rightSideLayout.addWidget(self.cancelButton)
+        rightSideLayout.addWidget(self.indexButton)
+        rightSideLayout.addWidget(self.nextButton)
+
+        # Collapsible Query Profile panel
+        self.profileToggle = QToolButton()
+        self.profileToggle.setText("Query Profile")
+        self.profileToggle.setCheckable(True)
+        self.profileToggle.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextBesideIcon)
+        self.profileToggle.setArrowType(Qt.ArrowType.RightArrow)
+        self.profilePanel = QWidget()
+        profileLayout = QVBoxLayout()
+        profileLayout.setContentsMargins(0, 0, 0, 0)
+        self.profileTable = QTableWidget(0, len(self.PROFILE_COLUMNS))
+        self.profileTable.setHorizontalHeaderLabels(self.PROFILE_COLUMNS)
+        self.profileTable.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.profileTable.horizontalHeader().setStretchLastSection(True)
+        profileButtons = QHBoxLayout()
+        self.exportProfileButton = QPushButton('Export JSON Lines...')
+        self.clearProfileButton = QPushButton('Clear')
+        profileButtons.addWidget(self.exportProfileButton)
+        profileButtons.addWidget(self.clearProfileButton)
+        profileLayout.addWidget(self.profileTable)
+        profileLayout.addLayout(profileButtons)
+        self.profilePanel.setLayout(profileLayout)
+        self.profilePanel.setVisible(False)
+        rightSideLayout.addWidget(self.profileToggle)
+        rightSideLayout.addWidget(self.profilePanel)
 
         rightSideContainer.setLayout(rightSideLayout)
         splitter.addWidget(rightSideContainer)
@@ -63,15 +106,74 @@ class SQLAppUI(QMainWindow):
         # Connect button signals
         self.runButton.clicked.connect(self.onRunClicked)
         self.submitButton.clicked.connect(self.onSubmitClicked)
+        self.cancelButton.clicked.connect(self.cancelButtonClicked.emit)
+        self.profileToggle.toggled.connect(self.setProfileVisible)
+        self.exportProfileButton.clicked.connect(self.exportProfileClicked.emit)
+        self.indexButton.clicked.connect(self.createIndexesClicked.emit)
+        self.nextButton.clicked.connect(self.nextChallengeClicked.emit)
+        self.clearProfileButton.clicked.connect(self.onClearProfileClicked)
+
+    def setResultModel(self, model):
+        previous = self.queryResultsTable.model()
+        self.queryResultsTable.setModel(model)
+        if previous is not None:
+            previous.close()
+            previous.deleteLater()
+        if model is None:
+            return
+        header = self.queryResultsTable.horizontalHeader()
+        for column, width in enumerate(model.estimate_column_widths(self.queryResultsTable.fontMetrics())):
+            header.resizeSection(column, width)
+
+    def setProfileVisible(self, visible):
+        self.profilePanel.setVisible(visible)
+        self.profileToggle.setArrowType(Qt.ArrowType.DownArrow if visible else Qt.ArrowType.RightArrow)
+
+    def addProfileEntry(self, profile):
+        # Newest first; one line of query text, the full text as a tooltip
+        if self.profileTable.rowCount() >= self.PROFILE_ROWS:
+            self.profileTable.removeRow(self.profileTable.rowCount() - 1)
+        self.profileTable.insertRow(0)
+        query = ' '.join((profile.query or '').split())
+        if profile.error:
+            query = f"{query} ({profile.error})"
+        values = [query, profile.wall_ms, profile.execute_ms,
+                  profile.fetch_ms, profile.server_ms, profile.rows_returned, profile.rows_examined]
+        for column, value in enumerate(values):
+            item = QTableWidgetItem('' if value is None else str(value))
+            if column == 0:
+                item.setToolTip(profile.query)
+            else:
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            self.profileTable.setItem(0, column, item)
+
+    def setBusy(self, busy):
+        self.runButton.setEnabled(not busy)
+        self.submitButton.setEnabled(not busy)
+        self.nextButton.setEnabled(not busy)
+        self.cancelButton.setEnabled(busy)
+
+    def setLoading(self, loading):
+        # While a challenge is being switched in there is nothing to run or cancel
+        self.setBusy(loading)
+        self.cancelButton.setEnabled(False)
+        if loading:
+            self.indexButton.setEnabled(False)
 
     def onRunClicked(self):
         query = self.codeEditor.toPlainText()
         self.runButtonClicked.emit(query)  # Emit the signal with the query
 
+    def onClearProfileClicked(self):
+        self.profileTable.setRowCount(0)
+        self.clearProfileClicked.emit()  # The profiler drops its entries too, so Export matches
+
     def onSubmitClicked(self):
         user_query = self.codeEditor.toPlainText()
         self.submitButtonClicked.emit(user_query)  # Emit the signal with the query
     
     def closeEvent(self, event):
-        self.parent.db.close()
+        if self.queryResultsTable.model() is not None:
+            self.queryResultsTable.model().close()
+        self.parent.shutdown()
         super().closeEvent(event)
\ No newline at end of file
@@ -0,0 +1,270 @@
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+import zlib
+from collections import namedtuple
+from catalog import LOW_CARDINALITY
+from compare import ResultComparator, normalize_value
+from config import ConfigError, configure_logging, load_config
+from database import DatabaseManager
+from challenge import ChallengeManager
+from templates import SCHEMA_NAMES, template_key
+
+logger = logging.getLogger(__name__)
+
+# Offline generator for a bank of challenge variants. Each single-table schema
+# is swept over window functions and their parameters (offsets, N, percentile
+# fractions), frames, partition columns, orderings and filters, all derived
+# from the catalog and the live column statistics. Variants that share a
+# filter, partitioning and ordering are answered together by one query with
+# a named WINDOW, so the engine sorts each partitioning once for all of them.
+# Usage:
+#   python variants.py --backend sqlite --seeds 20 --rows 1000 --output bank.jsonl [--verify 0.01]
+
+# One window function to sweep. `expression` uses {value}, {window} and the
+# swept parameter; `outer` reduces its per-row values to the answer. `order`
+# is 'value' for functions only defined over the value sorted ascending.
+# `ties` keeps equal sort keys as peers instead of breaking them by id.
+VariantFunction = namedtuple('VariantFunction', ['function', 'expression', 'phrase', 'outer', 'parameter',
+                                                 'values', 'frames', 'order', 'ties', 'dialects'])
+Variant = namedtuple('Variant', ['key', 'function', 'schema', 'question', 'sql', 'group', 'expression', 'outer'])
+WindowGroup = namedtuple('WindowGroup', ['filter', 'partition', 'order'])
+
+WHOLE_PARTITION = 'ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING'
+# The default frame equals ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+# once ties are broken by id, so that one is not swept separately
+FRAMES = (None, 'ROWS BETWEEN 2 PRECEDING AND CURRENT ROW', 'ROWS BETWEEN 1 PRECEDING AND 1 FOLLOWING',
+          'ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING', WHOLE_PARTITION)
+FRACTIONS = (0.25, 0.5, 0.75, 0.9)
+OUTER = {
+    'MAX': ("MAX({column})", "highest"),
+    'MIN': ("MIN({column})", "lowest"),
+    'AVG': ("ROUND(AVG({column}), 4)", "average (rounded to 4 places)"),
+}
+
+FUNCTIONS = [
+    VariantFunction('SUM() OVER()', "SUM({value}) OVER {window}", "windowed total of {value}", 'MAX',
+                    None, (None,), FRAMES, 'any', False, None),
+    VariantFunction('AVG() OVER()', "AVG({value}) OVER {window}", "windowed average of {value}", 'MAX',
+                    None, (None,), FRAMES, 'any', False, None),
+    VariantFunction('COUNT() OVER()', "COUNT(*) OVER {window}", "windowed row count", 'MAX',
+                    None, (None,), FRAMES[1:], 'any', False, None),
+    VariantFunction('ROW_NUMBER()', "ROW_NUMBER() OVER {window}", "row number", 'MAX',
+                    None, (None,), (None,), 'any', False, None),
+    VariantFunction('RANK()', "RANK() OVER {window}", "rank", 'AVG',
+                    None, (None,), (None,), 'any', True, None),
+    VariantFunction('LEAD()', "{value} - LEAD({value}, {offset}) OVER {window}",
+                    "difference between {value} and the {value} {offset} row(s) later", 'MAX',
+                    'offset', (1, 2, 3), (None,), 'any', False, None),
+    VariantFunction('LAG()', "{value} - LAG({value}, {offset}) OVER {window}",
+                    "difference between {value} and the {value} {offset} row(s) earlier", 'MAX',
+                    'offset', (1, 2, 3), (None,), 'any', False, None),
+    VariantFunction('FIRST_VALUE()', "FIRST_VALUE({value}) OVER {window}", "first {value} in the window frame",
+                    'MAX', None, (None,), FRAMES, 'any', False, None),
+    VariantFunction('LAST_VALUE()', "LAST_VALUE({value}) OVER {window}", "last {value} in the window frame",
+                    'MIN', None, (None,), FRAMES[1:], 'any', False, None),
+    VariantFunction('NTH_VALUE()', "NTH_VALUE({value}, {n}) OVER {window}", "value number {n} of {value} in the "
+                    "window frame", 'MAX', 'n', (2, 3, 5), FRAMES, 'any', False, None),
+    VariantFunction('PERCENT_RANK()', "PERCENT_RANK() OVER {window}", "percent rank", 'AVG',
+                    None, (None,), (None,), 'any', True, None),
+    VariantFunction('CUME_DIST()', "CUME_DIST() OVER {window}", "cumulative distribution", 'AVG',
+                    None, (None,), (None,), 'any', True, None),
+    # The first value whose cumulative distribution reaches the fraction; the
+    # outer MIN picks the lowest of the per-partition percentiles
+    VariantFunction('PERCENTILE_DISC()', "CASE WHEN CUME_DIST() OVER {window} >= {fraction} THEN {value} END",
+                    "discrete {percent}th percentile of {value}", 'MIN',
+                    'fraction', FRACTIONS, (None,), 'value', True, None),
+    # Only DuckDB has an interpolating percentile usable as a window function
+    VariantFunction('PERCENTILE_CONT()', "QUANTILE_CONT({value}, {fraction}) OVER {window}",
+                    "continuous (interpolated) {percent}th percentile of {value}", 'MAX',
+                    'fraction', FRACTIONS, (WHOLE_PARTITION,), 'value', False, ('duckdb',)),
+]
+
+
+def _sql_literal(value):
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def sweep_axes(table, stats):
+    # (value columns, partition columns, orderings, filters) for one table
+    numeric = [column.name for column in table.columns
+               if column.is_numeric and not column.primary_key and not column.name.endswith('_id')]
+    dates = [column.name for column in table.columns if column.type == 'DATE']
+    categories = [name for name, column_stats in stats.columns.items()
+                  if name not in dates and column_stats.top_values and column_stats.distinct <= LOW_CARDINALITY]
+    value = numeric[0]
+    orders = [f"{name} ASC" for name in dates] + [f"{value} ASC", f"{value} DESC"]
+    filters = [None]
+    value_stats = stats.columns[value]
+    if value_stats.minimum is not None:
+        midpoint = round((float(value_stats.minimum) + float(value_stats.maximum)) / 2, 2)
+        filters.append(f"{value} >= {midpoint}")
+    for name in categories[:1]:
+        filters.append(f"{name} <> {_sql_literal(stats.columns[name].top_values[0][0])}")
+    return value, [None] + categories, orders, filters
+
+
+def _window_spec(partition, order, ties, frame=None):
+    parts = [f"PARTITION BY {partition}"] if partition else []
+    parts.append(f"ORDER BY {order}" if ties else f"ORDER BY {order}, id")
+    if frame:
+        parts.append(frame)
+    return ' '.join(parts)
+
+
+def _where(value, row_filter):
+    conditions = [f"{value} IS NOT NULL"] + ([row_filter] if row_filter else [])
+    return ' AND '.join(conditions)
+
+
+def _question(spec, schema_name, value, group, frame, parameter):
+    words = {'value': value, spec.parameter: parameter}
+    if spec.parameter == 'fraction':
+        words['percent'] = round(parameter * 100)
+    phrase = spec.phrase.format(**words)
+    scope = f" within each {group.partition}" if group.partition else ""
+    rows = f"{schema_name} rows with {value} not null" + (f" and {group.filter}" if group.filter else "")
+    order = group.order if spec.ties else f"{group.order} (ties broken by id)"
+    framing = f", using {frame}" if frame else ""
+    return (f"Over {rows}{scope}, ordered by {order}{framing}, what is the {OUTER[spec.outer][1]} "
+            f"{phrase}?")
+
+
+def sweep(table, stats, dialect):
+    # Every variant of `table` this dialect can answer
+    value, partitions, orders, filters = sweep_axes(table, stats)
+    variants = []
+    for row_filter in filters:
+        for partition in partitions:
+            for order in orders:
+                group = WindowGroup(row_filter, partition, order)
+                for spec in FUNCTIONS:
+                    if spec.dialects and dialect not in spec.dialects:
+                        continue
+                    if spec.order == 'value' and order != f"{value} ASC":
+                        continue
+                    for parameter in spec.values:
+                        for frame in spec.frames:
+                            variants.append(_variant(spec, table.name, value, group, frame, parameter))
+    return variants
+
+
+def _variant(spec, schema_name, value, group, frame, parameter):
+    words = {'value': value}
+    if spec.parameter:
+        words[spec.parameter] = parameter
+    # Batched form over the named windows of the group query, see group_sql()
+    batched_window = 't' if spec.ties else 'w'
+    expression = spec.expression.format(window=f"({batched_window} {frame})" if frame else batched_window,
+                                        **words)
+    standalone = spec.expression.format(window=f"({_window_spec(group.partition, group.order, spec.ties, frame)})",
+                                        **words)
+    sql = (f"SELECT {OUTER[spec.outer][0].format(column='v')} FROM (SELECT {standalone} AS v "
+           f"FROM {schema_name} WHERE {_where(value, group.filter)}) AS windowed")
+    key = f"{template_key(spec.function, schema_name)}_{zlib.crc32(sql.encode()):08x}"
+    return Variant(key, spec.function, schema_name, _question(spec, schema_name, value, group, frame, parameter),
+                   sql, group, expression, spec.outer)
+
+
+def group_sql(table_name, value, group, variants):
+    # One query answering every variant of `group`, one column each
+    columns = ', '.join(OUTER[variant.outer][0].format(column=f"v{index}") for index, variant in enumerate(variants))
+    expressions = ', '.join(f"{variant.expression} AS v{index}" for index, variant in enumerate(variants))
+    return (f"SELECT {columns} FROM (SELECT {expressions} FROM {table_name} WHERE {_where(value, group.filter)} "
+            f"WINDOW w AS ({_window_spec(group.partition, group.order, False)}), "
+            f"t AS ({_window_spec(group.partition, group.order, True)})) AS windowed")
+
+
+def answer_variants(db_manager, table, value, variants):
+    # Yields (variant, answer rows) for every variant with a non-NULL answer
+    groups = {}
+    for variant in variants:
+        groups.setdefault(variant.group, []).append(variant)
+    for group, members in groups.items():
+        rows = db_manager.execute_query(group_sql(table.name, value, group, members))
+        if isinstance(rows, str):
+            logger.warning("Skipping %d variants of %s %s: %s", len(members), table.name, group, rows)
+            continue
+        for variant, answer in zip(members, rows[0]):
+            if answer is not None:
+                yield variant, [[normalize_value(answer, 6)]]
+
+
+def build_bank(challenge, output, schemas, seeds, row_count, verify=0.0, rng=None):
+    # Writes one JSON line per answered variant; returns (written, verification failures)
+    rng = rng or random.Random(0)
+    comparator = ResultComparator()
+    dialect = challenge.db_manager.dialect
+    written = failures = 0
+    for seed in seeds:
+        for schema_name in schemas:
+            started = time.perf_counter()
+            challenge.load_schema(schema_name, seed, row_count)
+            table = challenge.catalog.table(schema_name)
+            stats = challenge.table_stats(schema_name)[schema_name]
+            value = sweep_axes(table, stats)[0]
+            count = 0
+            for variant, answer in answer_variants(challenge.db_manager, table, value, sweep(table, stats, dialect)):
+                if verify and rng.random() < verify:
+                    # Spot-check the batched answer against the variant's own query
+                    actual = challenge.db_manager.execute_query(variant.sql)
+                    if isinstance(actual, str) or not comparator.compare_rows(answer, actual):
+                        failures += 1
+                        logger.error("Variant %s: batched answer %s, standalone %s", variant.key, answer, actual)
+                        continue
+                record = {'key': variant.key, 'function': variant.function, 'schema': schema_name, 'seed': seed,
+                          'rows': row_count, 'backend': dialect, 'question': variant.question, 'sql': variant.sql,
+                          'answer': answer}
+                output.write(json.dumps(record) + '\n')
+                count += 1
+            written += count
+            logger.info("Seed %d, %s: %d variants in %.2fs", seed, schema_name, count, time.perf_counter() - started)
+    return written, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a bank of challenge variants with precomputed answers.")
+    parser.add_argument('--backend', default='sqlite', choices=('sqlite', 'duckdb', 'mysql'))
+    parser.add_argument('--schemas', default=','.join(SCHEMA_NAMES), help="comma-separated single-table schemas")
+    parser.add_argument('--seeds', type=int, default=1, help="datasets per schema, seeded from --first-seed on")
+    parser.add_argument('--first-seed', type=int, default=1)
+    parser.add_argument('--rows', type=int, default=1000, help="rows seeded per table")
+    parser.add_argument('--verify', type=float, default=0.0,
+                        help="fraction of variants also run on their own and compared")
+    parser.add_argument('--output', default='-', help="JSON-lines file, or - for stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(backend=args.backend, result_cache_mb=0)
+    except ConfigError as e:
+        parser.error(str(e))
+    configure_logging(config)
+    if args.backend != 'mysql':
+        config['database'] = 'variants'
+    db = DatabaseManager.from_config(config)
+    db.connect()
+    if args.backend == 'mysql':
+        db = db.scoped('variants')
+    challenge = ChallengeManager(db, row_count=args.rows)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    started = time.perf_counter()
+    try:
+        written, failures = build_bank(challenge, output, args.schemas.split(','),
+                                       range(args.first_seed, args.first_seed + args.seeds), args.rows, args.verify)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        challenge.snapshots.drop_all()
+        db.close()
+    print(f"{written} variants in {time.perf_counter() - started:.1f}s, {failures} failed verification",
+          file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
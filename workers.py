@@ -0,0 +1,54 @@
+import logging
+import threading
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerSignals(QObject):
+    started = pyqtSignal()
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class ProfileSignals(QObject):
+    # Profiles are recorded on worker threads; emitting through a signal
+    # queues them onto the GUI thread.
+    recorded = pyqtSignal(object)
+
+
+class DatabaseWorker(QRunnable):
+    # Runs `task(worker)` on a QThreadPool thread. The task can report
+    # progress through worker.report(); cancel() kills whatever queries the
+    # worker's thread currently has running on the server.
+    def __init__(self, db_manager, task):
+        super().__init__()
+        self.setAutoDelete(False)  # SQLApp keeps a reference for cancel()
+        self.db_manager = db_manager
+        self.task = task
+        self.signals = WorkerSignals()
+        self.thread_id = None
+        self.cancelled = False
+        self._ready = threading.Event()
+
+    def report(self, message):
+        self.signals.progress.emit(message)
+
+    def cancel(self):
+        self.cancelled = True
+        if self._ready.is_set():
+            return self.db_manager.cancel_thread_queries(self.thread_id)
+        return 0
+
+    def run(self):
+        self.thread_id = threading.get_ident()
+        self._ready.set()
+        self.signals.started.emit()
+        try:
+            result = self.task(self)
+        except Exception as e:
+            logger.exception("Background task failed")
+            self.signals.failed.emit(f"Error: {str(e)}")
+            return
+        self.signals.finished.emit(result)